@@ -0,0 +1,179 @@
+"""
+Login latency benchmark of the custom auth challenge triggers.
+
+Replays the trigger sequence Cognito runs for one login, in process:
+
+    Define (SRP_A) -> Define (PASSWORD_VERIFIER) -> Create (question)
+    -> Verify (answer) -> Define -> Create (Caesar) -> Verify (answer)
+    -> Define (issue tokens)
+
+against in-memory stand-ins for the DALScooterUsers1 and auth failure
+counters clients with a simulated round trip and transfer time, so the
+cost of what the triggers read and log shows up. No failures are
+recorded, so Define's counter check never blocks. Trigger output goes to a buffer, as it would go to
+CloudWatch rather than a terminal.
+
+    python backend/benchmarks/auth_challenge_benchmark.py --logins 2000
+
+Reports p50/p95/p99 per trigger step and for the whole login, plus the
+bytes read from the users table per login. The Cognito service's own time
+between triggers is not included.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ca-central-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'cognito', 'lambda'))
+
+import CreateAuthChallengeLambda  # noqa: E402
+import DefineAuthChallengeLambda  # noqa: E402
+import VerifyAuthChallengeResponseLambda  # noqa: E402
+
+class InMemoryUsersClient:
+    """get_item() of the users table, honouring ProjectionExpression"""
+
+    def __init__(self, users, rtt_ms, bandwidth_mb_s):
+        self.users = users
+        self.rtt = rtt_ms / 1000
+        self.bandwidth = bandwidth_mb_s * 1024 * 1024
+        self.bytes_read = 0
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None):
+        item = self.users.get(Key['userId']['S'])
+        if item is not None and ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            wanted = [names.get(name.strip(), name.strip()) for name in ProjectionExpression.split(',')]
+            item = {name: item[name] for name in wanted if name in item}
+        size = len(json.dumps(item)) if item else 0
+        self.bytes_read += size
+        time.sleep(self.rtt + size / self.bandwidth)
+        return {'Item': item} if item else {}
+
+class InMemoryCountersClient:
+    """batch_get_item() of the auth failure counters table, with no failures recorded"""
+
+    def __init__(self, rtt_ms):
+        self.rtt = rtt_ms / 1000
+
+    def batch_get_item(self, RequestItems):
+        time.sleep(self.rtt)
+        return {'Responses': {table: [] for table in RequestItems}, 'UnprocessedKeys': {}}
+
+def synthetic_user(i, profile_bytes):
+    email = f'rider{i}@example.com'
+    return {
+        'userId': {'S': email},
+        'email': {'S': email},
+        'userType': {'S': 'customer'},
+        'questions': {'M': {
+            'q1': {'S': 'What was the name of your first pet?'}, 'a1': {'S': f'pet{i}'},
+            'q2': {'S': 'In which city were you born?'}, 'a2': {'S': f'city{i}'},
+            'q3': {'S': 'What is your favourite colour?'}, 'a3': {'S': f'colour{i}'}
+        }},
+        # Stands in for whatever else accumulates on a user item
+        'profile': {'S': 'x' * profile_bytes},
+        'createdAt': {'S': '2025-01-01T00:00:00'}
+    }
+
+def trigger_event(email, session, **request):
+    return {
+        'userName': f'sub-{email}',
+        'request': dict({'userAttributes': {'email': email}, 'session': session}, **request),
+        'response': {}
+    }
+
+def login(email, answers, timings):
+    """Run one login through the triggers, recording each trigger's duration"""
+    def timed(name, handler, event):
+        start = time.perf_counter()
+        result = handler(event, None)
+        timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+    session = [{'challengeName': 'SRP_A', 'challengeResult': True}]
+    timed('define', DefineAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+    session.append({'challengeName': 'PASSWORD_VERIFIER', 'challengeResult': True})
+    timed('define', DefineAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+
+    created = timed('create question', CreateAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+    question = created['response']['publicChallengeParameters']['question']
+    verified = timed('verify', VerifyAuthChallengeResponseLambda.lambda_handler, trigger_event(
+        email, list(session),
+        challengeAnswer=answers[question],
+        privateChallengeParameters=created['response']['privateChallengeParameters']
+    ))
+    session.append({'challengeName': 'CUSTOM_CHALLENGE', 'challengeResult': verified['response']['answerCorrect']})
+    timed('define', DefineAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+
+    created = timed('create caesar', CreateAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+    private = created['response']['privateChallengeParameters']
+    verified = timed('verify', VerifyAuthChallengeResponseLambda.lambda_handler, trigger_event(
+        email, list(session),
+        challengeAnswer=private['answer'],
+        privateChallengeParameters=private
+    ))
+    session.append({'challengeName': 'CUSTOM_CHALLENGE', 'challengeResult': verified['response']['answerCorrect']})
+    defined = timed('define', DefineAuthChallengeLambda.lambda_handler, trigger_event(email, list(session)))
+    return defined['response'].get('issueTokens', False)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--rtt-ms', type=float, default=4.0, help='simulated DynamoDB round trip')
+    parser.add_argument('--dynamodb-mb-per-second', type=float, default=20.0)
+    parser.add_argument('--profile-bytes', type=int, default=8192, help='size of the non-question attributes of a user item')
+    parser.add_argument('--log-sample-rate', type=float, default=None, help='override LOG_SAMPLE_RATE of the triggers')
+    args = parser.parse_args()
+
+    users = {}
+    answers = {}
+    for i in range(args.users):
+        user = synthetic_user(i, args.profile_bytes)
+        users[user['userId']['S']] = user
+        questions = user['questions']['M']
+        answers[user['userId']['S']] = {questions[f'q{n}']['S']: questions[f'a{n}']['S'] for n in (1, 2, 3)}
+
+    client = InMemoryUsersClient(users, args.rtt_ms, args.dynamodb_mb_per_second)
+    # Takes the place of the client get_dynamodb() would build
+    CreateAuthChallengeLambda.dynamodb = client
+    DefineAuthChallengeLambda.dynamodb = InMemoryCountersClient(args.rtt_ms)
+    if args.log_sample_rate is not None:
+        CreateAuthChallengeLambda.LOG_SAMPLE_RATE = args.log_sample_rate
+        DefineAuthChallengeLambda.LOG_SAMPLE_RATE = args.log_sample_rate
+        VerifyAuthChallengeResponseLambda.LOG_SAMPLE_RATE = args.log_sample_rate
+
+    timings = {}
+    totals = []
+    failures = 0
+    emails = list(users)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for n in range(args.logins):
+            email = emails[n % len(emails)]
+            start = time.perf_counter()
+            if not login(email, answers[email], timings):
+                failures += 1
+            totals.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.logins} logins, {args.users} users, simulated round trip {args.rtt_ms} ms, "
+          f"{args.profile_bytes} B of other attributes per user")
+    print(f"{'step':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, samples in list(timings.items()) + [('login', totals)]:
+        print(f"{name:<18}{percentile(samples, 50):>10.2f}{percentile(samples, 95):>10.2f}{percentile(samples, 99):>10.2f}")
+    print(f"Users table bytes read per login: {client.bytes_read / args.logins:.0f}")
+    print(f"Log output per login: {len(output.getvalue().encode()) / args.logins:.0f} bytes")
+    if failures:
+        print(f"{failures} logins did not get tokens")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Latency benchmark of the bike catalog: table scan vs. catalog snapshot.
+
+Runs get_all_bikes against in-memory stand-ins for the bikes table, the
+rating rollups and the snapshot object, with the same paging rules as
+DynamoDB (1 MB scan pages, 100 keys per BatchGetItem) and a simulated
+round trip per request. Read units are counted as DynamoDB would bill them
+(eventually consistent, 0.5 per 4 KB).
+
+    python backend/benchmarks/bike_catalog_benchmark.py --bikes 10000
+
+Compares a scan (no snapshot), a cold container loading the snapshot, a
+warm container serving it from memory, and a revalidation answered with
+a 304. Also times applying one bike change to the snapshot.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ca-central-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_functions', 'bikes'))
+
+import catalog_snapshot  # noqa: E402
+import get_all_bikes  # noqa: E402
+
+BIKE_TYPES = ['ebike', 'gyroscooter', 'segway']
+SCAN_PAGE_BYTES = 1024 * 1024
+
+def item_size(item):
+    return len(json.dumps(item, default=str))
+
+def read_units(size):
+    return math.ceil(size / 4096) * 0.5
+
+class Counters:
+    def __init__(self, rtt_ms):
+        self.rtt = rtt_ms / 1000
+        self.requests = 0
+        self.read_units = 0.0
+
+    def round_trip(self):
+        self.requests += 1
+        time.sleep(self.rtt)
+
+class InMemoryBikesTable:
+    """scan() of the bikes table with DynamoDB's 1 MB page limit"""
+
+    def __init__(self, bikes, counters):
+        self.bikes = sorted(bikes, key=lambda bike: bike['bikeId'])
+        self.positions = {bike['bikeId']: i for i, bike in enumerate(self.bikes)}
+        self.counters = counters
+
+    def scan(self, **kwargs):
+        self.counters.round_trip()
+        start = 0
+        if 'ExclusiveStartKey' in kwargs:
+            start = self.positions[kwargs['ExclusiveStartKey']['bikeId']] + 1
+        items = []
+        page_bytes = 0
+        for bike in self.bikes[start:]:
+            items.append(dict(bike))
+            page_bytes += item_size(bike)
+            if page_bytes >= SCAN_PAGE_BYTES:
+                break
+        # Scans are billed on the bytes read, not per item
+        self.counters.read_units += page_bytes / 4096 * 0.5
+        result = {'Items': items}
+        if start + len(items) < len(self.bikes):
+            result['LastEvaluatedKey'] = {'bikeId': items[-1]['bikeId']}
+        return result
+
+class InMemoryDynamoDB:
+    """batch_get_item() of the rating rollups"""
+
+    def __init__(self, rollups, counters):
+        self.rollups = rollups
+        self.counters = counters
+
+    def batch_get_item(self, RequestItems):
+        self.counters.round_trip()
+        responses = {}
+        for table_name, request in RequestItems.items():
+            found = []
+            for key in request['Keys']:
+                rollup = self.rollups.get(key['bikeId'])
+                if rollup:
+                    self.counters.read_units += read_units(item_size(rollup))
+                    found.append(dict(rollup))
+            responses[table_name] = found
+        return {'Responses': responses}
+
+class InMemoryS3:
+    """get_object() of the catalog snapshot, with If-None-Match"""
+
+    def __init__(self, body, counters, bandwidth_mb_s):
+        self.body = body
+        self.etag = '"%x"' % hash(body)
+        self.counters = counters
+        self.bandwidth = bandwidth_mb_s * 1024 * 1024
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.counters.round_trip()
+        if self.body is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        if IfNoneMatch == self.etag:
+            raise ClientError({'Error': {'Code': '304'}}, 'GetObject')
+        time.sleep(len(self.body) / self.bandwidth)
+
+        class Body:
+            def __init__(self, data):
+                self.data = data
+
+            def read(self):
+                return self.data
+
+        return {'Body': Body(self.body), 'ETag': self.etag}
+
+def synthetic_bike(i, rng):
+    return {
+        'bikeId': 'BIKE-%06d' % i,
+        'type': rng.choice(BIKE_TYPES),
+        'hourlyRate': Decimal(str(rng.choice([4, 5.5, 7, 8.5, 10, 12]))),
+        'franchiseId': 'franchise-%d' % rng.randrange(50),
+        'status': 'available' if rng.random() < 0.9 else 'maintenance',
+        'features': {'batteryLife': '%d km' % rng.randrange(20, 80), 'maxSpeed': '%d km/h' % rng.randrange(15, 45)},
+        'imageUrl': 'https://dalscooter-bike-images.s3.amazonaws.com/bikes/BIKE-%06d-%032x.jpg' % (i, rng.getrandbits(128)),
+        'discountCode': 'SPRING%d' % rng.randrange(100) if rng.random() < 0.2 else '',
+        'createdAt': '2025-01-01T00:00:00',
+        'updatedAt': '2025-01-01T00:00:00'
+    }
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bikes', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=20, help='requests per scenario')
+    parser.add_argument('--rtt-ms', type=float, default=5.0, help='simulated round trip per AWS request')
+    parser.add_argument('--s3-mb-per-second', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bikes = [synthetic_bike(i, rng) for i in range(args.bikes)]
+    rollups = {
+        bike['bikeId']: {'bikeId': bike['bikeId'], 'ratingCount': Decimal(n), 'ratingSum': Decimal(n * rng.randint(2, 5))}
+        for bike in bikes for n in [rng.randrange(0, 40)] if n
+    }
+
+    counters = Counters(args.rtt_ms)
+    get_all_bikes.table = InMemoryBikesTable(bikes, counters)
+    get_all_bikes.dynamodb = InMemoryDynamoDB(rollups, counters)
+    catalog_snapshot.dynamodb = get_all_bikes.dynamodb
+
+    # The snapshot catalog_snapshot would write for these bikes
+    snapshot = {'version': 1, 'generatedAt': '2025-01-01T00:00:00Z', 'bikes': {}}
+    for bike in bikes:
+        entry = catalog_snapshot.catalog_entry(bike)
+        entry['averageRating'] = catalog_snapshot.average_rating(rollups.get(bike['bikeId'], {}))
+        entry['ratingCount'] = catalog_snapshot.convert_decimal(rollups.get(bike['bikeId'], {}).get('ratingCount', 0))
+        snapshot['bikes'][bike['bikeId']] = entry
+    snapshot_body = json.dumps(snapshot).encode()
+    print(f"{args.bikes} bikes, snapshot {len(snapshot_body) / 1024:.0f} KB, "
+          f"simulated round trip {args.rtt_ms} ms")
+
+    def reset_cache():
+        get_all_bikes.catalog_cache.update({"body": None, "etag": None, "version": None, "s3Etag": None, "checkedAt": 0})
+
+    def run(name, s3_body, prepare, headers=None):
+        get_all_bikes.s3 = InMemoryS3(s3_body, counters, args.s3_mb_per_second)
+        latencies = []
+        statuses = set()
+        counters.requests = 0
+        counters.read_units = 0.0
+        for _ in range(args.requests):
+            prepare()
+            start = time.perf_counter()
+            result = get_all_bikes.lambda_handler({'headers': headers() if headers else {}}, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses.add(result['statusCode'])
+        print(f"{name:<22}{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+              f"{counters.requests / args.requests:>12.1f}{counters.read_units / args.requests:>12.1f}"
+              f"{','.join(map(str, sorted(statuses))):>8}")
+
+    print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'requests':>12}{'read units':>12}{'status':>8}")
+    run('scan', None, reset_cache)
+    run('snapshot, cold', snapshot_body, reset_cache)
+
+    reset_cache()
+    get_all_bikes.s3 = InMemoryS3(snapshot_body, counters, args.s3_mb_per_second)
+    get_all_bikes.get_catalog()
+    run('snapshot, warm', snapshot_body, lambda: None)
+    run('snapshot, 304', snapshot_body, lambda: None, headers=lambda: {'If-None-Match': get_all_bikes.catalog_cache['etag']})
+
+    def expire():
+        get_all_bikes.catalog_cache['checkedAt'] = 0
+    run('revalidate, 304', snapshot_body, expire, headers=lambda: {'If-None-Match': get_all_bikes.catalog_cache['etag']})
+
+    # Cost of one bike write on the snapshot side (excluding the S3 round trips)
+    bike = dict(bikes[0], hourlyRate=Decimal('9'))
+    record = {
+        'eventName': 'MODIFY',
+        'eventSourceARN': f'arn:aws:dynamodb:ca-central-1:000000000000:table/{catalog_snapshot.bikes_table_name}/stream/x',
+        'dynamodb': {
+            'Keys': {'bikeId': {'S': bike['bikeId']}},
+            'NewImage': {k: TypeSerializer().serialize(v) for k, v in bike.items()}
+        }
+    }
+    timings = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        current = json.loads(snapshot_body)
+        catalog_snapshot.apply_records(current, [record])
+        json.dumps(current).encode()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"Applying one bike change to the snapshot: p50 {percentile(timings, 50):.1f} ms")
+
+if __name__ == '__main__':
+    main()
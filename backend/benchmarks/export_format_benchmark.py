@@ -0,0 +1,175 @@
+"""
+Size and load time benchmark of the analytics export formats.
+
+Writes synthetic bikes table items (as the DynamoDB resource returns them)
+with the export lambda's own writers, in every EXPORT_FORMAT, into memory
+rather than S3, then loads each file back the way a warehouse load would:
+every value converted to its schema type.
+
+    python backend/benchmarks/export_format_benchmark.py --items 200000
+
+Compares untyped CSV (the export before schemas) with CSV, gzip'd NDJSON
+and Parquet written with monitoring/schemas/bikes.json. Reports bytes,
+size against untyped CSV, write and load seconds, and the values a load
+would have to reject or coerce. Parquet is skipped when pyarrow is not
+installed.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ca-central-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'monitoring'))
+
+import lambda_visualisation  # noqa: E402
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'monitoring', 'schemas', 'bikes.json')
+BIKE_TYPES = ['ebike', 'gyroscooter', 'segway']
+
+class InMemoryUpload:
+    """write() of a MultipartUpload, kept in memory"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        self.buffer.write(data)
+
+    @property
+    def bytes_uploaded(self):
+        return self.buffer.tell()
+
+def synthetic_bike(i, rng, start):
+    created = start + timedelta(seconds=rng.randrange(0, 365 * 86400))
+    bike = {
+        'bikeId': f'bike-{i:08d}',
+        'createdAt': created.isoformat() + 'Z',
+        'updatedAt': (created + timedelta(seconds=rng.randrange(0, 30 * 86400))).isoformat() + 'Z',
+        'franchiseId': f'franchise-{rng.randrange(50):03d}',
+        'type': rng.choice(BIKE_TYPES),
+        'status': rng.choice(['available', 'available', 'available', 'booked', 'maintenance']),
+        'hourlyRate': Decimal(rng.choice(['4.5', '6', '7.25', '10', '12.99'])),
+        'imageUrl': f'https://dal-scooter-team-6-bike-images.s3.amazonaws.com/bikes/{i:08d}.jpg',
+        'features': {'battery': Decimal(rng.randrange(40, 100)), 'heightAdjustable': rng.random() < 0.5},
+    }
+    if rng.random() < 0.2:
+        bike['discountCode'] = f'SAVE{rng.randrange(5, 30)}'
+    return bike
+
+def pages_of(items, page_size=1000):
+    for start in range(0, len(items), page_size):
+        yield items[start:start + page_size]
+
+def convert(value, field_type):
+    """A loaded text value as its schema type, as a warehouse load would parse it"""
+    if value in (None, ''):
+        return None
+    if field_type == 'TIMESTAMP':
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if field_type == 'NUMERIC':
+        return Decimal(value)
+    if field_type == 'INTEGER':
+        return int(value)
+    if field_type == 'FLOAT':
+        return float(value)
+    if field_type == 'BOOLEAN':
+        return value.lower() == 'true'
+    if field_type == 'DATE':
+        return date.fromisoformat(value)
+    return value
+
+def load_csv(body, schema):
+    rows = []
+    rejected = 0
+    for row in csv.DictReader(io.StringIO(body.decode('utf-8'))):
+        try:
+            rows.append({column['name']: convert(row.get(column['name']), column['type']) for column in schema})
+        except ValueError:
+            rejected += 1
+    return rows, rejected
+
+def load_ndjson_gz(body, schema):
+    rows = []
+    rejected = 0
+    for line in gzip.decompress(body).splitlines():
+        row = json.loads(line)
+        try:
+            rows.append({
+                column['name']: convert(row.get(column['name']), column['type'])
+                if isinstance(row.get(column['name']), str) else row.get(column['name'])
+                for column in schema
+            })
+        except ValueError:
+            rejected += 1
+    return rows, rejected
+
+def load_parquet(body, schema):
+    import pyarrow.parquet
+    return pyarrow.parquet.read_table(io.BytesIO(body)).to_pylist(), 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=5410)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2025, 1, 1)
+    items = [synthetic_bike(i, rng, start) for i in range(args.items)]
+    with open(SCHEMA_FILE) as schema_file:
+        typed = [{'name': column['name'], 'type': column['type']} for column in json.load(schema_file)]
+    untyped = [{'name': column['name'], 'type': None} for column in typed]
+    # What a load of untyped CSV has to assume: every column a string
+    as_text = [{'name': column['name'], 'type': 'STRING'} for column in typed]
+
+    formats = [
+        ('csv untyped', 'csv', untyped, load_csv, as_text),
+        ('csv', 'csv', typed, load_csv, typed),
+        ('ndjson.gz', 'ndjson.gz', typed, load_ndjson_gz, typed),
+        ('parquet', 'parquet', typed, load_parquet, typed),
+    ]
+    days = len({item['createdAt'][:10] for item in items})
+    print(f"{args.items} bikes over {days} days of createdAt, {len(typed)} columns")
+    print(f"{'format':<14}{'bytes':>14}{'vs csv':>9}{'write s':>10}{'load s':>10}{'typed':>8}{'rejected':>10}")
+
+    baseline = None
+    for name, export_format, schema, load, load_schema in formats:
+        upload = InMemoryUpload()
+        began = time.perf_counter()
+        try:
+            if export_format == 'parquet':
+                lambda_visualisation.write_parquet(pages_of(items), schema, upload)
+            elif export_format == 'ndjson.gz':
+                lambda_visualisation.write_ndjson_gz(pages_of(items), schema, upload)
+            else:
+                lambda_visualisation.write_csv(pages_of(items), schema, upload)
+        except ImportError:
+            print(f"{name:<14}  skipped, pyarrow is not installed")
+            continue
+        written = time.perf_counter() - began
+        body = upload.buffer.getvalue()
+
+        began = time.perf_counter()
+        rows, rejected = load(body, load_schema)
+        loaded = time.perf_counter() - began
+
+        # A row is typed when its timestamps and rates loaded as timestamps and numbers
+        sample = rows[0] if rows else {}
+        is_typed = isinstance(sample.get('createdAt'), datetime) and isinstance(sample.get('hourlyRate'), Decimal)
+        baseline = baseline or len(body)
+        print(f"{name:<14}{len(body):>14,}{len(body) / baseline:>9.2f}{written:>10.2f}{loaded:>10.2f}"
+              f"{'yes' if is_typed else 'no':>8}{rejected:>10}")
+
+    print(f"A date bounded query of one day reads about 1/{days} of a table partitioned by day on createdAt, "
+          f"all of an unpartitioned one")
+
+if __name__ == '__main__':
+    main()
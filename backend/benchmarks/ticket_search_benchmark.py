@@ -0,0 +1,131 @@
+"""
+Query latency benchmark for the ticket search index.
+
+Builds an in-memory copy of the inverted index for synthetic tickets using
+the same tokenizer/term weighting as ticket_indexer and runs the same ranking
+code as search_tickets against it. Posting reads are counted as a proxy for
+DynamoDB read cost.
+
+    python backend/benchmarks/ticket_search_benchmark.py --tickets 1000000
+
+1M tickets takes about 7 minutes to index and 2.2 GB of memory.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ca-central-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_functions', 'tickets'))
+
+import search_tickets  # noqa: E402
+import ticket_indexer  # noqa: E402
+
+COMMON_WORDS = [
+    'scooter', 'bike', 'ride', 'battery', 'charge', 'app', 'payment', 'booking',
+    'refund', 'brake', 'wheel', 'lock', 'unlock', 'screen', 'speed', 'error',
+    'station', 'helmet', 'late', 'account', 'login', 'card', 'broken', 'noise'
+]
+RARE_WORDS = ['word%d' % i for i in range(20000)]
+BIKE_TYPES = ['ebike', 'gyroscooter', 'segway']
+
+class InMemoryPostingStore:
+    """
+    Same interface as search_tickets.DynamoDBPostingStore, backed by dicts
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.df = {}
+        self.doc_count = 0
+        self.total_length = 0
+        self.reads = 0
+
+    def add(self, ticket):
+        terms, length = ticket_indexer.ticket_terms(ticket)
+        ticket_id = ticket['ticketId']
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[ticket_id] = (tf, length)
+            self.df[term] = self.df.get(term, 0) + 1
+        self.doc_count += 1
+        self.total_length += length
+
+    def get_term_stats(self, terms):
+        self.reads += len(terms) + 1
+        return {
+            'docCount': self.doc_count,
+            'totalLength': self.total_length,
+            'df': {term: self.df[term] for term in terms if term in self.df}
+        }
+
+    def iter_postings(self, term):
+        for ticket_id, posting in self.postings.get(term, {}).items():
+            self.reads += 1
+            yield ticket_id, posting
+
+    def get_postings_for(self, term, ticket_ids):
+        self.reads += len(ticket_ids)
+        term_postings = self.postings.get(term, {})
+        return {ticket_id: term_postings[ticket_id] for ticket_id in ticket_ids if ticket_id in term_postings}
+
+def synthetic_ticket(i, rng):
+    words = rng.sample(COMMON_WORDS, 3) + [rng.choice(RARE_WORDS)]
+    description = rng.choices(COMMON_WORDS, k=8) + rng.sample(RARE_WORDS, 4)
+    return {
+        'ticketId': 'TKT-%08X' % i,
+        'subject': ' '.join(words),
+        'description': ' '.join(description),
+        'resolutionMessage': ' '.join(rng.choices(COMMON_WORDS, k=4)) if i % 3 == 0 else '',
+        'bookingReference': 'BK-%06d' % rng.randrange(1000000) if i % 2 == 0 else '',
+        'bikeId': '%s-%d' % (rng.choice(BIKE_TYPES), rng.randrange(5000))
+    }
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickets', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200, help='queries per query type')
+    parser.add_argument('--max-candidates', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = InMemoryPostingStore()
+
+    start = time.perf_counter()
+    for i in range(args.tickets):
+        store.add(synthetic_ticket(i, rng))
+    print(f"Indexed {args.tickets} tickets in {time.perf_counter() - start:.1f}s "
+          f"({len(store.postings)} terms)")
+
+    query_types = {
+        'rare term': lambda: rng.choice(RARE_WORDS),
+        'common term': lambda: rng.choice(COMMON_WORDS),
+        'common + rare': lambda: f"{rng.choice(COMMON_WORDS)} {rng.choice(RARE_WORDS)}",
+        'three common': lambda: ' '.join(rng.sample(COMMON_WORDS, 3)),
+        'bike id': lambda: '%s-%d' % (rng.choice(BIKE_TYPES), rng.randrange(5000)),
+    }
+
+    print(f"{'query':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hits':>10}{'reads':>10}")
+    for name, make_query in query_types.items():
+        latencies = []
+        hits = []
+        reads = []
+        for _ in range(args.queries):
+            terms = search_tickets.query_tokens(make_query())
+            store.reads = 0
+            start = time.perf_counter()
+            ranked, _ = search_tickets.search(store, terms, args.max_candidates)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits.append(len(ranked))
+            reads.append(store.reads)
+        print(f"{name:<16}{percentile(latencies, 50):>10.2f}{percentile(latencies, 95):>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}{statistics.mean(hits):>10.0f}{statistics.mean(reads):>10.0f}")
+
+if __name__ == '__main__':
+    main()
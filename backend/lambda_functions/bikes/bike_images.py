@@ -0,0 +1,86 @@
+# Bike image helpers shared by create_bike and update_bike, packaged into
+# both lambdas' zips next to the handler (see the api-gateway module)
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+# S3_ENDPOINT_URL points the client at a local S3 stand-in
+s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+sqs = boto3.client('sqs')
+
+bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
+derivatives_queue_url = os.environ.get('DERIVATIVES_QUEUE_URL')
+
+UPLOAD_PREFIX = "uploads/"
+# Tag image_upload_validator puts on accepted uploads
+VALIDATION_TAG = "imageValidation"
+
+
+def image_url(image_key):
+    return f"https://{bucket_name}.s3.amazonaws.com/{image_key}"
+
+
+def check_uploaded_image(bike_id, image_key):
+    """
+    (error, imageStatus) for an upload before the bike records it. error is
+    set if image_key was not issued for this bike, or has not landed or was
+    rejected (the validator deletes rejected uploads). imageStatus is READY
+    if image_upload_validator already accepted the upload, else PENDING.
+    """
+    if not image_key.startswith(f"{UPLOAD_PREFIX}{bike_id}/"):
+        return "imageKey was not issued for this bike.", None
+    status = upload_status(image_key)
+    if status == "REJECTED":
+        return "Image has not been uploaded, or was rejected.", None
+    return None, status
+
+
+def upload_status(image_key):
+    """READY if the upload was accepted, REJECTED if it is gone, otherwise PENDING"""
+    try:
+        tags = s3.get_object_tagging(Bucket=bucket_name, Key=image_key).get("TagSet", [])
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return "REJECTED"
+        raise
+    return "READY" if {"Key": VALIDATION_TAG, "Value": "ACCEPTED"} in tags else "PENDING"
+
+
+def settle_image_status(bike_id, image_key):
+    """
+    imageStatus of a bike just written with a PENDING upload. The validator
+    only updates bikes that already record the key, so a verdict reached
+    between check_uploaded_image and the write is applied here.
+    """
+    status = upload_status(image_key)
+    if status != "PENDING" and set_image_status(bike_id, image_key, status):
+        return status
+    return "PENDING"
+
+
+def set_image_status(bike_id, image_key, status):
+    """Set the bike's imageStatus, unless the bike moved on to another image"""
+    try:
+        bikes_table.update_item(
+            Key={"bikeId": bike_id},
+            UpdateExpression="SET imageStatus = :status",
+            ConditionExpression="imageKey = :key",
+            ExpressionAttributeValues={":status": status, ":key": image_key}
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+
+
+def queue_derivatives(bike_id, image_key):
+    """Queue image_derivatives for an image the bike now uses"""
+    if derivatives_queue_url:
+        sqs.send_message(
+            QueueUrl=derivatives_queue_url,
+            MessageBody=json.dumps({"bucket": bucket_name, "key": image_key, "bikeId": bike_id})
+        )
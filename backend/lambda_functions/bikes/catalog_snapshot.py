@@ -0,0 +1,188 @@
+import json
+import os
+import time
+import boto3
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+deserializer = TypeDeserializer()
+
+bikes_table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
+rating_rollups_table_name = os.environ.get('RATING_ROLLUPS_TABLE', 'bike-rating-rollups-dev')
+catalog_bucket = os.environ.get('CATALOG_BUCKET', 'dalscooter-bike-images')
+catalog_key = os.environ.get('CATALOG_KEY', 'catalog/bikes.json')
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+# Attributes of a bike kept in the catalog, as returned by get_all_bikes
+CATALOG_ATTRIBUTES = ["bikeId", "features", "franchiseId", "imageUrl", "thumbnailUrl", "type", "status", "hourlyRate"]
+
+def lambda_handler(event, context):
+    """
+    Keep the bike catalog snapshot served by get_all_bikes in step with the
+    bikes table (create/update/delete_bike) and the rating rollups.
+
+    Fed by the streams of both tables. Each batch is applied to the current
+    snapshot and written back as a new version, conditional on the snapshot
+    not having been replaced in between; on a conflict the batch fails and
+    is retried. Invoke with {"action": "REBUILD"} to regenerate the snapshot
+    from a full scan.
+    """
+    start = time.time()
+    if event.get('action') == 'REBUILD':
+        current, s3_etag = load_snapshot()
+        snapshot = build_snapshot(current['version'] if current else 0)
+        save_snapshot(snapshot, s3_etag)
+        print(f"Rebuilt catalog snapshot v{snapshot['version']} with {len(snapshot['bikes'])} bikes")
+        return {"statusCode": 200, "body": json.dumps({"version": snapshot['version'], "bikes": len(snapshot['bikes'])})}
+
+    snapshot, s3_etag = load_snapshot()
+    if snapshot is None:
+        # First write since the snapshot was introduced, the scan already includes this batch
+        snapshot = build_snapshot(0)
+    else:
+        apply_records(snapshot, event.get('Records', []))
+        snapshot['version'] += 1
+        snapshot['generatedAt'] = datetime.utcnow().isoformat() + "Z"
+
+    # Raises on a concurrent update, the stream retries the batch against the newer snapshot
+    save_snapshot(snapshot, s3_etag)
+    print("Catalog snapshot updated:", json.dumps({
+        "version": snapshot['version'],
+        "records": len(event.get('Records', [])),
+        "bikes": len(snapshot['bikes']),
+        "seconds": round(time.time() - start, 3)
+    }))
+    return {"statusCode": 200}
+
+def apply_records(snapshot, records):
+    """Apply bike and rating rollup stream records to the snapshot in place"""
+    bikes = snapshot['bikes']
+    new_bike_ids = []
+    for record in records:
+        table_name = record['eventSourceARN'].split(':table/', 1)[1].split('/', 1)[0]
+        keys = deserialize(record['dynamodb']['Keys'])
+        bike_id = keys['bikeId']
+
+        if table_name == bikes_table_name:
+            if record['eventName'] == 'REMOVE':
+                bikes.pop(bike_id, None)
+                continue
+            entry = catalog_entry(deserialize(record['dynamodb']['NewImage']))
+            if bike_id in bikes:
+                entry['averageRating'] = bikes[bike_id].get('averageRating')
+                entry['ratingCount'] = bikes[bike_id].get('ratingCount', 0)
+            else:
+                new_bike_ids.append(bike_id)
+            bikes[bike_id] = entry
+
+        elif table_name == rating_rollups_table_name and bike_id in bikes:
+            # Rollups of bikes not in the catalog are picked up when the bike is added
+            rollup = deserialize(record['dynamodb'].get('NewImage', {}))
+            bikes[bike_id]['averageRating'] = average_rating(rollup)
+            bikes[bike_id]['ratingCount'] = convert_decimal(rollup.get('ratingCount', 0))
+
+    # A bike may have been rated before it was added to the catalog
+    rollups = get_rating_rollups(new_bike_ids)
+    for bike_id in new_bike_ids:
+        if bike_id in bikes:
+            bikes[bike_id]['averageRating'] = average_rating(rollups.get(bike_id, {}))
+            bikes[bike_id]['ratingCount'] = convert_decimal(rollups.get(bike_id, {}).get('ratingCount', 0))
+
+def build_snapshot(version):
+    """Snapshot of every bike from a full scan of the bikes table"""
+    bikes_table = dynamodb.Table(bikes_table_name)
+    scan_kwargs = {
+        'ProjectionExpression': "bikeId, features, franchiseId, imageUrl, thumbnailUrl, #type, hourlyRate, #status",
+        'ExpressionAttributeNames': {"#type": "type", "#status": "status"}
+    }
+    bikes = {}
+    while True:
+        result = bikes_table.scan(**scan_kwargs)
+        for bike in result.get('Items', []):
+            bikes[bike['bikeId']] = catalog_entry(bike)
+        if 'LastEvaluatedKey' not in result:
+            break
+        scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    rollups = get_rating_rollups(list(bikes))
+    for bike_id, entry in bikes.items():
+        entry['averageRating'] = average_rating(rollups.get(bike_id, {}))
+        entry['ratingCount'] = convert_decimal(rollups.get(bike_id, {}).get('ratingCount', 0))
+
+    return {
+        'version': version + 1,
+        'generatedAt': datetime.utcnow().isoformat() + "Z",
+        'bikes': bikes
+    }
+
+def catalog_entry(bike):
+    return {attribute: convert_decimal(bike.get(attribute)) for attribute in CATALOG_ATTRIBUTES}
+
+def load_snapshot():
+    """The current snapshot and its S3 ETag, (None, None) if there is none yet"""
+    try:
+        result = s3.get_object(Bucket=catalog_bucket, Key=catalog_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None, None
+        raise
+    return json.loads(result['Body'].read()), result['ETag']
+
+def save_snapshot(snapshot, s3_etag):
+    """Write the snapshot, only if the one it was built from is still current"""
+    put_kwargs = {
+        'Bucket': catalog_bucket,
+        'Key': catalog_key,
+        'Body': json.dumps(snapshot).encode(),
+        'ContentType': 'application/json',
+        'Metadata': {'catalog-version': str(snapshot['version'])}
+    }
+    if s3_etag:
+        put_kwargs['IfMatch'] = s3_etag
+    else:
+        put_kwargs['IfNoneMatch'] = '*'
+    s3.put_object(**put_kwargs)
+
+def get_rating_rollups(bike_ids):
+    """Batch-read the rating rollups of the given bikes, keyed by bikeId"""
+    rollups = {}
+    for start in range(0, len(bike_ids), BATCH_GET_SIZE):
+        request_items = {
+            rating_rollups_table_name: {
+                "Keys": [{"bikeId": bike_id} for bike_id in bike_ids[start:start + BATCH_GET_SIZE]],
+                "ProjectionExpression": "bikeId, ratingCount, ratingSum"
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for rollup in result.get("Responses", {}).get(rating_rollups_table_name, []):
+                rollups[rollup["bikeId"]] = rollup
+            request_items = result.get("UnprocessedKeys")
+    return rollups
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+def average_rating(rollup):
+    count = rollup.get("ratingCount", 0)
+    if count <= 0:
+        return None
+    return round(float(rollup["ratingSum"]) / float(count), 2)
+
+def convert_decimal(val):
+    if isinstance(val, Decimal):
+        if val % 1 == 0:
+            return int(val)
+        else:
+            return float(val)
+    elif isinstance(val, dict):
+        return {k: convert_decimal(v) for k, v in val.items()}
+    elif isinstance(val, list):
+        return [convert_decimal(i) for i in val]
+    return val
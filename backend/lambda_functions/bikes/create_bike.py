@@ -5,13 +5,12 @@ import uuid
 import base64
 from datetime import datetime
 from decimal import Decimal
+from bike_images import s3, bucket_name, image_url, check_uploaded_image, settle_image_status, queue_derivatives
 
 dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3')
 
 bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
 availability_table = dynamodb.Table(os.environ.get('AVAILABILITY_TABLE', 'availability-table-dev'))
-bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
 
 
 def lambda_handler(event, context):
@@ -28,10 +27,13 @@ def lambda_handler(event, context):
         body = json.loads(event.get("body", "{}"))
 
         # Validate required fields
-        required_fields = ["bikeId", "type", "hourlyRate", "imageBase64"]
+        required_fields = ["bikeId", "type", "hourlyRate"]
         for field in required_fields:
             if not body.get(field):
                 return response(400, f"Missing required field: {field}")
+        # imageKey comes from POST /bikes/{bikeId}/image-upload, imageBase64 is the old inline upload
+        if not body.get("imageKey") and not body.get("imageBase64"):
+            return response(400, "Missing required field: imageKey")
 
         bike_id = body["bikeId"]
 
@@ -40,21 +42,28 @@ def lambda_handler(event, context):
         if existing_bike.get("Item"):
             return response(409, f"Bike with ID '{bike_id}' already exists.")
 
-        # Upload image to S3
-        image_base64 = body["imageBase64"]
-        try:
-            image_bytes = base64.b64decode(image_base64)
-        except Exception:
-            return response(400, "Invalid base64 image data.")
-
-        image_key = f"bikes/{bike_id}-{str(uuid.uuid4())}.jpg"
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=image_key,
-            Body=image_bytes,
-            ContentType='image/jpeg'
-        )
-        image_url = f"https://{bucket_name}.s3.amazonaws.com/{image_key}"
+        if body.get("imageKey"):
+            # Uploaded straight to S3, validated asynchronously by image_upload_validator
+            image_key = body["imageKey"]
+            error, image_status = check_uploaded_image(bike_id, image_key)
+            if error:
+                return response(400, error)
+        else:
+            # Upload image to S3
+            image_base64 = body["imageBase64"]
+            try:
+                image_bytes = base64.b64decode(image_base64)
+            except Exception:
+                return response(400, "Invalid base64 image data.")
+
+            image_key = f"bikes/{bike_id}-{str(uuid.uuid4())}.jpg"
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=image_key,
+                Body=image_bytes,
+                ContentType='image/jpeg'
+            )
+            image_status = "READY"
 
         # Create bike item
         bike_item = {
@@ -64,7 +73,9 @@ def lambda_handler(event, context):
             "franchiseId": franchise_id,
             "status": body.get("status", "available"),
             "features": body.get("features", {}),
-            "imageUrl": image_url,
+            "imageUrl": image_url(image_key),
+            "imageKey": image_key,
+            "imageStatus": image_status,
             "discountCode": body.get("discountCode", ""),
             "createdAt": datetime.utcnow().isoformat(),
             "updatedAt": datetime.utcnow().isoformat()
@@ -72,6 +83,11 @@ def lambda_handler(event, context):
 
         # Add bike to DynamoDB
         bikes_table.put_item(Item=bike_item)
+        if image_status == "PENDING":
+            bike_item["imageStatus"] = settle_image_status(bike_id, image_key)
+        if bike_item["imageStatus"] == "READY":
+            # Otherwise image_upload_validator queues it once validated
+            queue_derivatives(bike_id, image_key)
 
         # Create individual availability records for each time slot (consistent schema)
         time_slots = ["10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00", "18:00"]
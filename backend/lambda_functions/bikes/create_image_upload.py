@@ -0,0 +1,86 @@
+import json
+import os
+import uuid
+import boto3
+
+dynamodb = boto3.resource('dynamodb')
+# S3_ENDPOINT_URL points the client (and so the presigned URLs) at a local S3 stand-in
+s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+
+bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_URL_EXPIRY_SECONDS = int(os.environ.get('UPLOAD_URL_EXPIRY_SECONDS', '900'))
+
+# Accepted image types and the extension their keys get
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp"
+}
+
+def lambda_handler(event, context):
+    """
+    Issue a presigned POST for uploading a bike image straight to S3.
+
+    The client uploads the file with the returned url and fields, then
+    passes imageKey to create_bike or update_bike. The policy pins the
+    key and content type and caps the size at MAX_IMAGE_BYTES; the upload
+    is checked again by image_upload_validator once it lands.
+    """
+    try:
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+        user_type = claims.get("custom:userType")
+        franchise_id = claims.get("cognito:username")
+
+        if user_type != "admin":
+            return response(403, "Unauthorized: Only admin can upload bike images.")
+
+        bike_id = event["pathParameters"]["bikeId"]
+        body = json.loads(event.get("body") or "{}")
+        content_type = body.get("contentType", "image/jpeg")
+        if content_type not in IMAGE_EXTENSIONS:
+            return response(400, f"contentType must be one of: {list(IMAGE_EXTENSIONS)}")
+
+        # Images of an existing bike may only be replaced by its franchise
+        bike = bikes_table.get_item(Key={"bikeId": bike_id}, ProjectionExpression="franchiseId").get("Item")
+        if bike and bike.get("franchiseId") != franchise_id:
+            return response(403, "Unauthorized: Franchise ID mismatch.")
+
+        image_key = f"uploads/{bike_id}/{uuid.uuid4()}.{IMAGE_EXTENSIONS[content_type]}"
+        upload = s3.generate_presigned_post(
+            Bucket=bucket_name,
+            Key=image_key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, MAX_IMAGE_BYTES]
+            ],
+            ExpiresIn=UPLOAD_URL_EXPIRY_SECONDS
+        )
+
+        return response(200, {
+            "imageKey": image_key,
+            "uploadUrl": upload["url"],
+            "fields": upload["fields"],
+            "maxBytes": MAX_IMAGE_BYTES,
+            "expiresIn": UPLOAD_URL_EXPIRY_SECONDS
+        })
+
+    except json.JSONDecodeError as e:
+        return response(400, f"Invalid JSON in request body: {str(e)}")
+    except Exception as e:
+        print(f"Error in create_image_upload lambda: {str(e)}")
+        return response(500, f"Internal server error: {str(e)}")
+
+
+def response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
+            "Access-Control-Allow-Methods": "POST,OPTIONS"
+        },
+        "body": json.dumps(body if isinstance(body, dict) else {"error": body})
+    }
@@ -1,12 +1,27 @@
 import os
 import json
 import boto3
+from datetime import datetime
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb')
+sqs = boto3.client('sqs')
 table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
 table = dynamodb.Table(table_name)
+cleanup_queue_url = os.environ.get('BIKE_CLEANUP_QUEUE_URL')
 
 def lambda_handler(event, context):
+    """
+    Delete a bike. The bike is marked with deletionRequestedAt and
+    delete_bike_cascade deletes it together with its bookings,
+    availability rows and images, so this answers 202. The bike is only
+    marked before the cleanup is queued, if queueing fails the bike stays
+    and the request can be retried.
+    """
+    if not cleanup_queue_url:
+        print("Error: BIKE_CLEANUP_QUEUE_URL not configured")
+        return response(500, {"error": "BIKE_CLEANUP_QUEUE_URL not configured"})
+
     try:
         bike_id = event["pathParameters"]["bikeId"]
         claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
@@ -16,7 +31,10 @@ def lambda_handler(event, context):
         if user_type != "admin":
             return response(403, "Unauthorized: Only admin can delete a bike.")
 
-        bike = table.get_item(Key={"bikeId": bike_id}).get("Item")
+        bike = table.get_item(
+            Key={"bikeId": bike_id},
+            ProjectionExpression="bikeId, franchiseId, imageKey, thumbnailKey, mediumKey"
+        ).get("Item")
         if not bike:
             return response(404, f"Bike with ID '{bike_id}' not found.")
 
@@ -24,8 +42,30 @@ def lambda_handler(event, context):
         if franchise_id_token != franchise_id_table:
             return response(403, "Unauthorized: Franchise ID mismatch.")
 
-        table.delete_item(Key={"bikeId": bike_id})
-        return response(200, {"message": f"Deleted bike with ID '{bike_id}' successfully."})
+        requested_at = datetime.utcnow().isoformat() + "Z"
+        try:
+            table.update_item(
+                Key={"bikeId": bike_id},
+                UpdateExpression="SET deletionRequestedAt = :requested",
+                ConditionExpression="franchiseId = :franchise",
+                ExpressionAttributeValues={":requested": requested_at, ":franchise": franchise_id_token}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                # Deleted by the cleanup of a concurrent request
+                return response(404, f"Bike with ID '{bike_id}' not found.")
+            raise
+
+        # delete_bike_cascade only deletes the bike while it still carries this requestedAt
+        sqs.send_message(
+            QueueUrl=cleanup_queue_url,
+            MessageBody=json.dumps({
+                "bikeId": bike_id,
+                "imageKeys": [bike[key] for key in ["imageKey", "thumbnailKey", "mediumKey"] if bike.get(key)],
+                "requestedAt": requested_at
+            })
+        )
+        return response(202, {"message": f"Deleted bike with ID '{bike_id}' successfully.", "cleanup": "QUEUED"})
 
     except Exception as e:
         return response(500, {"error": str(e)})
@@ -38,4 +78,4 @@ def response(status_code, body):
             "Access-Control-Allow-Origin": "*"
         },
         "body": json.dumps(body)
-    }
\ No newline at end of file
+    }
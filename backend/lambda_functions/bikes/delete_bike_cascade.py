@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import boto3
+from datetime import datetime
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+sns = boto3.client('sns')
+
+bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+bookings_table_name = os.environ.get('BOOKINGS_TABLE', 'bookings-table-dev')
+availability_table_name = os.environ.get('AVAILABILITY_TABLE', 'dev-availability-table')
+bookings_table = dynamodb.Table(bookings_table_name)
+availability_table = dynamodb.Table(availability_table_name)
+bookings_bike_index = os.environ.get('BOOKINGS_BIKE_INDEX', 'bikeId-bookingDate-index')
+availability_bike_index = os.environ.get('AVAILABILITY_BIKE_INDEX', 'originalBikeId-index')
+bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
+sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
+
+# Bookings that still hold a slot
+ACTIVE_BOOKING_STATUSES = ['REQUESTED', 'PENDING_APPROVAL', 'RESERVED', 'CONFIRMED']
+
+# Each cancellation is two writes, TransactWriteItems takes at most 100
+CANCEL_TRANSACTION_SIZE = 50
+
+# DeleteObjects takes at most 1000 keys
+S3_DELETE_BATCH_SIZE = 1000
+
+# Length of the "-<uuid4>" suffix of bikes/<bikeId>-<uuid>.jpg keys
+UUID_SUFFIX_LENGTH = 37
+
+def lambda_handler(event, context):
+    """
+    Delete a bike and clean up after it (SQS, queued by delete_bike).
+
+    Each message is {"bikeId", "imageKeys", "requestedAt"}. The bike is
+    deleted first, so no new bookings come in, but only while it still
+    carries the message's deletionRequestedAt: a bike that was deleted
+    and created again, or whose deletion was requested again (that
+    request queued its own message), is left alone and the message
+    dropped. Then bookings from today on are cancelled, each together with the release of its slot in
+    one transaction, the bike's remaining availability rows are
+    batch-deleted and its images and derivatives removed with bulk
+    deletes. Every step only touches what is left, so a retried message
+    picks up where the failed attempt stopped. Progress is logged per step.
+    """
+    failures = []
+    for record in event["Records"]:
+        try:
+            cleanup_bike(json.loads(record["body"]))
+        except Exception as e:
+            print(f"Bike cleanup failed for message {record['messageId']}: {str(e)}")
+            failures.append({"itemIdentifier": record["messageId"]})
+    return {"batchItemFailures": failures}
+
+def cleanup_bike(message):
+    bike_id = message["bikeId"]
+    progress = {"bikeId": bike_id, "requestedAt": message["requestedAt"]}
+    start = time.time()
+
+    if not delete_bike(bike_id, message["requestedAt"]):
+        report(progress, "SUPERSEDED", start)
+        return
+    report(progress, "BIKE_DELETED", start)
+
+    progress["bookingsCancelled"] = cancel_bookings(bike_id)
+    report(progress, "BOOKINGS_CANCELLED", start)
+
+    progress["availabilityDeleted"] = delete_availability(bike_id)
+    report(progress, "AVAILABILITY_DELETED", start)
+
+    progress["imagesDeleted"] = delete_images(bike_id, message.get("imageKeys", []))
+    report(progress, "COMPLETED", start)
+
+def report(progress, step, start):
+    progress["step"] = step
+    progress["seconds"] = round(time.time() - start, 3)
+    print("Bike cleanup progress:", json.dumps(progress))
+
+def delete_bike(bike_id, requested_at):
+    """
+    Delete the bike if its deletion was requested at requested_at, or it is
+    already gone (a retry). False if the bike is there without that request.
+    """
+    try:
+        bikes_table.delete_item(
+            Key={"bikeId": bike_id},
+            ConditionExpression="attribute_not_exists(bikeId) OR deletionRequestedAt = :requested",
+            ExpressionAttributeValues={":requested": requested_at}
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+
+def cancel_bookings(bike_id):
+    """Cancel the bike's active bookings from today on, returns how many were cancelled"""
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    query_kwargs = {
+        "IndexName": bookings_bike_index,
+        "KeyConditionExpression": Key("bikeId").eq(bike_id) & Key("bookingDate").gte(today),
+        "FilterExpression": Attr("status").is_in(ACTIVE_BOOKING_STATUSES)
+    }
+    bookings = []
+    while True:
+        result = bookings_table.query(**query_kwargs)
+        bookings.extend(result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            break
+        query_kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+    cancelled = []
+    for start in range(0, len(bookings), CANCEL_TRANSACTION_SIZE):
+        cancelled.extend(write_cancellations(bookings[start:start + CANCEL_TRANSACTION_SIZE]))
+    for booking in cancelled:
+        notify_cancelled(booking)
+    return len(cancelled)
+
+def write_cancellations(bookings):
+    """
+    Cancel a chunk of bookings in one transaction, falling back to one
+    transaction per booking if any changed meanwhile. Returns the bookings
+    that were cancelled.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    # A transaction cannot touch an item twice, a slot shared by two bookings is released once
+    transact_items = []
+    slots = set()
+    for booking in bookings:
+        cancel, release = cancellation_items(booking, now)
+        transact_items.append(cancel)
+        if release["Delete"]["Key"]["bikeId"] not in slots:
+            slots.add(release["Delete"]["Key"]["bikeId"])
+            transact_items.append(release)
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        return bookings
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+
+    # A booking approved, rejected or cancelled since it was read cancels the whole transaction
+    cancelled = []
+    for booking in bookings:
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=cancellation_items(booking, now))
+            cancelled.append(booking)
+        except ClientError as e:
+            reasons = e.response.get("CancellationReasons", [])
+            if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+                # No longer active, nothing to cancel
+                continue
+            raise
+    return cancelled
+
+def cancellation_items(booking, now):
+    """Cancel a booking and release its availability slot, if it is still active"""
+    return [
+        {
+            "Update": {
+                "TableName": bookings_table_name,
+                "Key": {"bookingId": booking["bookingId"]},
+                "UpdateExpression": "SET #status = :cancelled, cancellationReason = :reason, updatedAt = :updated",
+                "ConditionExpression": "#status IN (" + ", ".join(f":s{i}" for i in range(len(ACTIVE_BOOKING_STATUSES))) + ")",
+                "ExpressionAttributeNames": {"#status": "status"},
+                "ExpressionAttributeValues": {
+                    ":cancelled": "CANCELLED",
+                    ":reason": "BIKE_DELETED",
+                    ":updated": now,
+                    **{f":s{i}": status for i, status in enumerate(ACTIVE_BOOKING_STATUSES)}
+                }
+            }
+        },
+        {
+            "Delete": {
+                "TableName": availability_table_name,
+                "Key": {"bikeId": f"{booking['bikeId']}#{booking['bookingDate']}#{booking['slotTime']}"}
+            }
+        }
+    ]
+
+def notify_cancelled(booking):
+    """Tell the customer their booking was cancelled, same message as approve_booking's"""
+    if not sns_topic_arn:
+        return
+    try:
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Message=json.dumps({
+                'userId': booking.get('userId'),
+                'userEmail': booking.get('email', ''),
+                'type': 'BOOKING_STATUS_UPDATE',
+                'bookingId': booking['bookingId'],
+                'status': 'CANCELLED',
+                'message': f'Your booking {booking.get("referenceCode")} has been cancelled because the bike was removed from the fleet'
+            }),
+            Subject=f'Booking CANCELLED - {booking.get("referenceCode")}',
+            MessageAttributes={
+                'email': {'DataType': 'String', 'StringValue': booking.get('email', '') or 'unknown'},
+                'type': {'DataType': 'String', 'StringValue': 'BOOKING_STATUS_UPDATE'}
+            }
+        )
+    except Exception as e:
+        # The cancellation stands, a missed email is not worth a retry of the cleanup
+        print(f"Cancellation notification failed for booking {booking['bookingId']}: {str(e)}")
+
+def delete_availability(bike_id):
+    """Batch-delete every availability row of the bike, returns how many were deleted"""
+    deleted = 0
+    with availability_table.batch_writer() as batch:
+        for key in availability_keys(bike_id):
+            batch.delete_item(Key=key)
+            deleted += 1
+    return deleted
+
+def availability_keys(bike_id):
+    """Keys of the bike's availability rows, via the originalBikeId index"""
+    read_kwargs = {
+        "IndexName": availability_bike_index,
+        "KeyConditionExpression": Key("originalBikeId").eq(bike_id),
+        "ProjectionExpression": "bikeId"
+    }
+    while True:
+        result = availability_table.query(**read_kwargs)
+        for item in result.get("Items", []):
+            yield {"bikeId": item["bikeId"]}
+        if "LastEvaluatedKey" not in result:
+            return
+        read_kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+def delete_images(bike_id, image_keys):
+    """Delete the bike's uploads, images and derivatives, returns how many objects were deleted"""
+    keys = set(key for key in image_keys if key)
+    for prefix in [f"uploads/{bike_id}/", f"derivatives/uploads/{bike_id}/"]:
+        keys.update(list_keys(prefix))
+    # Other bikes' ids may start with this one, keep only keys whose id part matches exactly
+    for prefix in [f"bikes/{bike_id}-", f"derivatives/bikes/{bike_id}-"]:
+        for key in list_keys(prefix):
+            stem = key.rsplit("/", 1)[1].rsplit(".", 1)[0]
+            for suffix in ["-thumbnail", "-medium"]:
+                if key.startswith("derivatives/") and stem.endswith(suffix):
+                    stem = stem[:-len(suffix)]
+            if stem[:-UUID_SUFFIX_LENGTH] == bike_id:
+                keys.add(key)
+
+    keys = sorted(keys)
+    deleted = 0
+    for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        result = s3.delete_objects(
+            Bucket=bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys[start:start + S3_DELETE_BATCH_SIZE]], "Quiet": True}
+        )
+        errors = result.get("Errors", [])
+        if errors:
+            raise RuntimeError(f"Could not delete {len(errors)} images, first: {errors[0]}")
+        deleted += min(S3_DELETE_BATCH_SIZE, len(keys) - start)
+    return deleted
+
+def list_keys(prefix):
+    keys = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix):
+        keys.extend(item["Key"] for item in page.get("Contents", []))
+    return keys
@@ -1,17 +1,89 @@
 import json
 import os
+import time
+import base64
+import hashlib
 import boto3
-from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from decimal import Decimal, InvalidOperation
 
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
 table = dynamodb.Table(table_name)
+rating_rollups_table_name = os.environ.get('RATING_ROLLUPS_TABLE', 'bike-rating-rollups-dev')
+franchise_index_name = os.environ.get('BIKES_FRANCHISE_INDEX', 'franchiseId-bikeId-index')
+type_index_name = os.environ.get('BIKES_TYPE_INDEX', 'type-hourlyRate-index')
+catalog_bucket = os.environ.get('CATALOG_BUCKET', 'dalscooter-bike-images')
+catalog_key = os.environ.get('CATALOG_KEY', 'catalog/bikes.json')
+CATALOG_CACHE_SECONDS = int(os.environ.get('CATALOG_CACHE_SECONDS', '30'))
+
+s3 = boto3.client('s3')
+
+# Container-lifetime copy of the catalog snapshot written by catalog_snapshot
+catalog_cache = {"body": None, "etag": None, "version": None, "s3Etag": None, "checkedAt": 0}
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Reads per page when filters leave pages short
+MAX_FILTERED_READS = 10
+
+# Only the attributes returned in the catalog are read, type and status are reserved words
+PROJECTION = "bikeId, features, franchiseId, imageUrl, thumbnailUrl, #type, hourlyRate, #status"
+PROJECTION_NAMES = {"#type": "type", "#status": "status"}
 
 def lambda_handler(event, context):
+    """
+    List bikes, optionally filtered by type, franchiseId, minRate/maxRate
+    (hourly rate, inclusive) and status.
+
+    With limit or nextToken the catalog is paged, {"bikes", "count",
+    "nextToken"}, each page costing at most limit bikes worth of reads.
+    Without either, every matching bike is returned as a plain list, as
+    before pagination was added. The unfiltered list is served from the
+    catalog snapshot (see catalog_snapshot) with a strong ETag, and a
+    matching If-None-Match is answered with a 304 without reading DynamoDB.
+
+    A franchiseId filter queries the franchiseId index and a type filter
+    the type/hourlyRate index (with the rate range as a key condition),
+    otherwise the table is scanned. The remaining filters are applied by
+    DynamoDB before items are returned.
+    """
     try:
-        response = table.scan()
-        bikes = response.get("Items", [])
-        # Only include required attributes
+        query_params = event.get("queryStringParameters") or {}
+        paged = "limit" in query_params or "nextToken" in query_params
+        has_filters = any(query_params.get(name) for name in ["type", "franchiseId", "minRate", "maxRate", "status"])
+
+        if not paged and not has_filters:
+            catalog = get_catalog()
+            if catalog:
+                return catalog_response(catalog, event.get("headers") or {})
+
+        try:
+            limit = min(int(query_params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE) if paged else None
+            min_rate = parse_rate(query_params.get("minRate"))
+            max_rate = parse_rate(query_params.get("maxRate"))
+        except (ValueError, InvalidOperation):
+            return response(400, "limit, minRate and maxRate must be numbers.")
+        if limit is not None and limit < 1:
+            return response(400, "limit must be at least 1.")
+
+        read_kwargs, key_attributes = build_read(
+            query_params.get("type"), query_params.get("franchiseId"), min_rate, max_rate, query_params.get("status")
+        )
+        if query_params.get("nextToken"):
+            try:
+                read_kwargs["ExclusiveStartKey"] = decode_next_token(query_params["nextToken"], key_attributes)
+            except ValueError:
+                return response(400, "nextToken is invalid.")
+
+        bikes, last_key = read_bikes(read_kwargs, limit)
+
+        rollups = get_rating_rollups([bike["bikeId"] for bike in bikes])
         result = []
         for bike in bikes:
             filtered = {
@@ -19,23 +91,196 @@ def lambda_handler(event, context):
                 "features": bike.get("features"),
                 "franchiseId": bike.get("franchiseId"),
                 "imageUrl": bike.get("imageUrl"),
+                "thumbnailUrl": bike.get("thumbnailUrl"),
                 "type": bike.get("type"),
-                "hourlyRate": convert_decimal(bike.get("hourlyRate"))
+                "status": bike.get("status"),
+                "hourlyRate": convert_decimal(bike.get("hourlyRate")),
+                "averageRating": average_rating(rollups.get(bike.get("bikeId"), {})),
+                "ratingCount": convert_decimal(rollups.get(bike.get("bikeId"), {}).get("ratingCount", 0))
             }
             result.append(filtered)
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": json.dumps(result)
-        }
+
+        if not paged:
+            return response(200, result)
+        return response(200, {
+            "bikes": result,
+            "count": len(result),
+            "nextToken": encode_next_token(last_key) if last_key else None
+        })
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+        print(f"Error in get_all_bikes lambda: {str(e)}")
+        return response(500, f"Internal server error: {str(e)}")
+
+def get_catalog():
+    """
+    The catalog snapshot, refreshed from S3 at most every
+    CATALOG_CACHE_SECONDS with a conditional GET. None if there is no
+    snapshot yet.
+    """
+    now = time.time()
+    if catalog_cache["body"] is not None and now - catalog_cache["checkedAt"] < CATALOG_CACHE_SECONDS:
+        return catalog_cache
+
+    get_kwargs = {"Bucket": catalog_bucket, "Key": catalog_key}
+    if catalog_cache["s3Etag"]:
+        get_kwargs["IfNoneMatch"] = catalog_cache["s3Etag"]
+    try:
+        result = s3.get_object(**get_kwargs)
+    except ClientError as e:
+        code = e.response["Error"]["Code"]
+        if code in ("304", "NotModified"):
+            catalog_cache["checkedAt"] = now
+            return catalog_cache
+        if code in ("NoSuchKey", "404"):
+            return None
+        raise
+
+    snapshot = json.loads(result["Body"].read())
+    body = json.dumps([snapshot["bikes"][bike_id] for bike_id in sorted(snapshot["bikes"])])
+    catalog_cache.update({
+        "body": body,
+        # Strong validator, a different body always gets a different ETag
+        "etag": f'"{snapshot["version"]}-{hashlib.sha256(body.encode()).hexdigest()[:32]}"',
+        "version": snapshot["version"],
+        "s3Etag": result["ETag"],
+        "checkedAt": now
+    })
+    return catalog_cache
+
+def catalog_response(catalog, request_headers):
+    """200 with the snapshot, or 304 if the client already has this version"""
+    if_none_match = next((value for name, value in request_headers.items() if name.lower() == "if-none-match"), None)
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "ETag,X-Catalog-Version",
+        "ETag": catalog["etag"],
+        "X-Catalog-Version": str(catalog["version"]),
+        # Clients may keep the catalog but must revalidate it on every use
+        "Cache-Control": "no-cache"
+    }
+    if if_none_match and (if_none_match.strip() == "*" or catalog["etag"] in [tag.strip() for tag in if_none_match.split(",")]):
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    return {"statusCode": 200, "headers": headers, "body": catalog["body"]}
+
+def parse_rate(value):
+    return Decimal(value) if value not in (None, "") else None
+
+def build_read(bike_type, franchise_id, min_rate, max_rate, status):
+    """
+    Query/scan kwargs for the most selective access path, and the key
+    attributes of that path's LastEvaluatedKey
+    """
+    read_kwargs = {
+        "ProjectionExpression": PROJECTION,
+        "ExpressionAttributeNames": dict(PROJECTION_NAMES)
+    }
+    filters = []
+    rate_in_key = False
+
+    if franchise_id:
+        # A franchise owns a handful of bikes, the most selective filter
+        read_kwargs["IndexName"] = franchise_index_name
+        read_kwargs["KeyConditionExpression"] = Key("franchiseId").eq(franchise_id)
+        key_attributes = {"bikeId", "franchiseId"}
+        if bike_type:
+            filters.append(Attr("type").eq(bike_type))
+    elif bike_type:
+        read_kwargs["IndexName"] = type_index_name
+        key_condition = Key("type").eq(bike_type)
+        if min_rate is not None and max_rate is not None:
+            key_condition &= Key("hourlyRate").between(min_rate, max_rate)
+        elif min_rate is not None:
+            key_condition &= Key("hourlyRate").gte(min_rate)
+        elif max_rate is not None:
+            key_condition &= Key("hourlyRate").lte(max_rate)
+        read_kwargs["KeyConditionExpression"] = key_condition
+        key_attributes = {"bikeId", "type", "hourlyRate"}
+        rate_in_key = True
+    else:
+        key_attributes = {"bikeId"}
+
+    if not rate_in_key:
+        if min_rate is not None:
+            filters.append(Attr("hourlyRate").gte(min_rate))
+        if max_rate is not None:
+            filters.append(Attr("hourlyRate").lte(max_rate))
+    if status:
+        filters.append(Attr("status").eq(status))
+
+    if filters:
+        filter_expression = filters[0]
+        for condition in filters[1:]:
+            filter_expression &= condition
+        read_kwargs["FilterExpression"] = filter_expression
+    return read_kwargs, key_attributes
+
+def read_bikes(read_kwargs, limit):
+    """
+    Read up to limit bikes (all of them when limit is None).
+    Returns (bikes, LastEvaluatedKey to resume from or None)
+    """
+    read = table.query if "KeyConditionExpression" in read_kwargs else table.scan
+    bikes = []
+    last_key = None
+    reads = 0
+    while True:
+        if limit is not None:
+            # Limit is applied before the filters, so keep reading for the
+            # rest of the page until it is full or the bikes run out
+            read_kwargs["Limit"] = limit - len(bikes)
+        result = read(**read_kwargs)
+        reads += 1
+        bikes.extend(result.get("Items", []))
+        last_key = result.get("LastEvaluatedKey")
+        if not last_key:
+            return bikes, None
+        if limit is not None and (len(bikes) >= limit or reads >= MAX_FILTERED_READS):
+            return bikes, last_key
+        read_kwargs["ExclusiveStartKey"] = last_key
+
+def encode_next_token(last_evaluated_key):
+    """Encode a LastEvaluatedKey as an opaque pagination token"""
+    # hourlyRate is a Decimal in the type index's keys
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=str).encode()).decode()
+
+def decode_next_token(token, key_attributes):
+    """Decode a pagination token back into an ExclusiveStartKey for this access path"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid nextToken")
+    if not isinstance(key, dict) or set(key) != key_attributes:
+        raise ValueError("Invalid nextToken")
+    if "hourlyRate" in key:
+        try:
+            key["hourlyRate"] = Decimal(str(key["hourlyRate"]))
+        except InvalidOperation:
+            raise ValueError("Invalid nextToken")
+    return key
+
+def get_rating_rollups(bike_ids):
+    """Batch-read the rating rollups of a page of bikes, keyed by bikeId"""
+    rollups = {}
+    for start in range(0, len(bike_ids), BATCH_GET_SIZE):
+        request_items = {
+            rating_rollups_table_name: {
+                "Keys": [{"bikeId": bike_id} for bike_id in bike_ids[start:start + BATCH_GET_SIZE]],
+                "ProjectionExpression": "bikeId, ratingCount, ratingSum"
+            }
         }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for rollup in result.get("Responses", {}).get(rating_rollups_table_name, []):
+                rollups[rollup["bikeId"]] = rollup
+            request_items = result.get("UnprocessedKeys")
+    return rollups
+
+def average_rating(rollup):
+    count = rollup.get("ratingCount", 0)
+    if count <= 0:
+        return None
+    return round(float(rollup["ratingSum"]) / float(count), 2)
 
 def convert_decimal(val):
     if isinstance(val, Decimal):
@@ -43,4 +288,14 @@ def convert_decimal(val):
             return int(val)
         else:
             return float(val)
-    return val
\ No newline at end of file
+    return val
+
+def response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*"
+        },
+        "body": json.dumps(body if isinstance(body, (dict, list)) else {"error": body})
+    }
@@ -6,6 +6,7 @@ from decimal import Decimal
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
 table = dynamodb.Table(table_name)
+rating_rollups_table = dynamodb.Table(os.environ.get('RATING_ROLLUPS_TABLE', 'bike-rating-rollups-dev'))
 
 def lambda_handler(event, context):
     try:
@@ -13,12 +14,23 @@ def lambda_handler(event, context):
         result = table.get_item(Key={"bikeId": bike_id})
         if "Item" not in result:
             return response(404, f"Bike with ID '{bike_id}' not found.")
+        item = result["Item"]
+        # Rating summary from the bike's feedback rollup
+        rollup = rating_rollups_table.get_item(Key={"bikeId": bike_id}).get("Item") or {}
+        item["ratingCount"] = rollup.get("ratingCount", 0)
+        item["averageRating"] = average_rating(rollup)
         # Convert Decimal to int/float
-        item = convert_decimal(result["Item"])
+        item = convert_decimal(item)
         return response(200, item)
     except Exception as e:
         return response(500, f"Internal server error: {str(e)}")
 
+def average_rating(rollup):
+    count = rollup.get("ratingCount", 0)
+    if count <= 0:
+        return None
+    return round(float(rollup["ratingSum"]) / float(count), 2)
+
 def convert_decimal(obj):
     if isinstance(obj, Decimal):
         if obj % 1 == 0:
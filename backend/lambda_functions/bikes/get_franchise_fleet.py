@@ -0,0 +1,186 @@
+import json
+import os
+import base64
+import boto3
+from datetime import datetime
+from boto3.dynamodb.conditions import Key, Attr
+from decimal import Decimal
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+franchise_index_name = os.environ.get('BIKES_FRANCHISE_INDEX', 'franchiseId-bikeId-index')
+availability_table_name = os.environ.get('AVAILABILITY_TABLE', 'dev-availability-table')
+rating_rollups_table_name = os.environ.get('RATING_ROLLUPS_TABLE', 'bike-rating-rollups-dev')
+
+# BatchGetItem accepts at most 100 keys per call, across all tables
+BATCH_GET_SIZE = 100
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 50
+
+# Same slots create_bike opens for a bike
+TIME_SLOTS = ["10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00", "18:00"]
+
+# Availability row status -> slot status, as get_availability reports them
+SLOT_STATUSES = {"AVAILABLE": "available", "UNAVAILABLE": "unavailable", "RESERVED": "reserved"}
+
+def lambda_handler(event, context):
+    """
+    List the caller's own fleet (GET /bikes/fleet), a page at a time.
+
+    Bikes come from the franchiseId index, and each page is joined with
+    today's slots from the availability table and the bikes' rating
+    rollups in a single stream of BatchGetItem calls, so the operator
+    dashboard needs one request per page. A missing slot row counts as
+    available, as in get_availability.
+
+    Query parameters: limit (default 25, at most 50), nextToken and status.
+    """
+    try:
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+        user_type = claims.get("custom:userType")
+        franchise_id = claims.get("cognito:username")
+
+        if user_type != "admin":
+            return response(403, "Unauthorized: Only admin can view a fleet.")
+
+        query_params = event.get("queryStringParameters") or {}
+        try:
+            limit = min(int(query_params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return response(400, "limit must be a number.")
+        if limit < 1:
+            return response(400, "limit must be at least 1.")
+
+        query_kwargs = {
+            "IndexName": franchise_index_name,
+            "KeyConditionExpression": Key("franchiseId").eq(franchise_id),
+            "Limit": limit
+        }
+        if query_params.get("status"):
+            query_kwargs["FilterExpression"] = Attr("status").eq(query_params["status"])
+        if query_params.get("nextToken"):
+            try:
+                query_kwargs["ExclusiveStartKey"] = decode_next_token(query_params["nextToken"], franchise_id)
+            except ValueError:
+                return response(400, "nextToken is invalid.")
+
+        result = table.query(**query_kwargs)
+        bikes = result.get("Items", [])
+        last_key = result.get("LastEvaluatedKey")
+
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        slots, rollups = get_slots_and_rollups([bike["bikeId"] for bike in bikes], today)
+
+        fleet = []
+        summary = {"bikes": len(bikes), "available": 0, "unavailable": 0, "reserved": 0}
+        for bike in bikes:
+            bike_id = bike["bikeId"]
+            slot_statuses = {
+                slot: SLOT_STATUSES.get(slots.get(f"{bike_id}#{today}#{slot}", "AVAILABLE"), "available")
+                for slot in TIME_SLOTS
+            }
+            availability = {"date": today, "available": 0, "unavailable": 0, "reserved": 0, "slots": slot_statuses}
+            for slot_status in slot_statuses.values():
+                availability[slot_status] += 1
+                summary[slot_status] += 1
+
+            rollup = rollups.get(bike_id, {})
+            fleet.append({
+                "bikeId": bike_id,
+                "type": bike.get("type"),
+                "status": bike.get("status"),
+                "hourlyRate": convert_decimal(bike.get("hourlyRate")),
+                "features": convert_decimal(bike.get("features")),
+                "discountCode": bike.get("discountCode"),
+                "imageUrl": bike.get("imageUrl"),
+                "thumbnailUrl": bike.get("thumbnailUrl"),
+                "imageStatus": bike.get("imageStatus"),
+                "averageRating": average_rating(rollup),
+                "ratingCount": convert_decimal(rollup.get("ratingCount", 0)),
+                "availability": availability
+            })
+
+        return response(200, {
+            "franchiseId": franchise_id,
+            "date": today,
+            "bikes": fleet,
+            "count": len(fleet),
+            "summary": summary,
+            "nextToken": encode_next_token(last_key) if last_key else None
+        })
+    except Exception as e:
+        print(f"Error in get_franchise_fleet lambda: {str(e)}")
+        return response(500, f"Internal server error: {str(e)}")
+
+def get_slots_and_rollups(bike_ids, today):
+    """
+    Today's slot statuses (keyed by availability key) and the rating
+    rollups (keyed by bikeId) of a page of bikes, with both tables' keys
+    packed into the same BatchGetItem calls
+    """
+    keys = [
+        (availability_table_name, {"bikeId": f"{bike_id}#{today}#{slot}"})
+        for bike_id in bike_ids for slot in TIME_SLOTS
+    ] + [(rating_rollups_table_name, {"bikeId": bike_id}) for bike_id in bike_ids]
+    projections = {
+        availability_table_name: {"ProjectionExpression": "bikeId, #status", "ExpressionAttributeNames": {"#status": "status"}},
+        rating_rollups_table_name: {"ProjectionExpression": "bikeId, ratingCount, ratingSum"}
+    }
+
+    slots = {}
+    rollups = {}
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request_items = {}
+        for table_name, key in keys[start:start + BATCH_GET_SIZE]:
+            request_items.setdefault(table_name, dict(projections[table_name], Keys=[]))["Keys"].append(key)
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in result.get("Responses", {}).get(availability_table_name, []):
+                slots[item["bikeId"]] = (item.get("status") or "").upper()
+            for rollup in result.get("Responses", {}).get(rating_rollups_table_name, []):
+                rollups[rollup["bikeId"]] = rollup
+            request_items = result.get("UnprocessedKeys")
+    return slots, rollups
+
+def encode_next_token(last_evaluated_key):
+    """Encode a LastEvaluatedKey as an opaque pagination token"""
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_next_token(token, franchise_id):
+    """Decode a pagination token, which must be from this franchise's fleet"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid nextToken")
+    if not isinstance(key, dict) or set(key) != {"bikeId", "franchiseId"} or key["franchiseId"] != franchise_id:
+        raise ValueError("Invalid nextToken")
+    return key
+
+def average_rating(rollup):
+    count = rollup.get("ratingCount", 0)
+    if count <= 0:
+        return None
+    return round(float(rollup["ratingSum"]) / float(count), 2)
+
+def convert_decimal(val):
+    if isinstance(val, Decimal):
+        if val % 1 == 0:
+            return int(val)
+        else:
+            return float(val)
+    if isinstance(val, dict):
+        return {k: convert_decimal(v) for k, v in val.items()}
+    if isinstance(val, list):
+        return [convert_decimal(v) for v in val]
+    return val
+
+def response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*"
+        },
+        "body": json.dumps(body if isinstance(body, (dict, list)) else {"error": body})
+    }
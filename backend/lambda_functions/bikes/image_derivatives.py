@@ -0,0 +1,220 @@
+import io
+import json
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps, features
+
+dynamodb = boto3.resource('dynamodb')
+# S3_ENDPOINT_URL points the client at a local S3 stand-in
+s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+
+bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
+# AVIF needs a Pillow build with AVIF support, WebP is always available
+DERIVATIVE_FORMAT = os.environ.get('DERIVATIVE_FORMAT', 'webp').lower()
+
+# Bounding box and encoder quality of each derivative
+DERIVATIVE_SIZES = {
+    "thumbnail": ((320, 240), 70),
+    "medium": ((960, 720), 80)
+}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"method": 4}),
+    "avif": ("AVIF", "image/avif", {"speed": 6})
+}
+
+DERIVATIVES_PREFIX = "derivatives/"
+
+def lambda_handler(event, context):
+    """
+    Generate the thumbnail and medium derivatives of bike images and
+    record them on the bike (SQS, batched).
+
+    Messages are {"bucket", "key", "bikeId"}, queued by create_bike,
+    update_bike and image_upload_validator once the bike uses a validated
+    image. Derivative keys are derived from the source key, and sources
+    the bike already has derivatives for, or no longer uses, are skipped,
+    so redeliveries are cheap no-ops.
+
+    {"action": "BACKFILL"} generates the derivatives of every bike that
+    has none for its current image.
+    """
+    image_format = DERIVATIVE_FORMAT if DERIVATIVE_FORMAT in FORMATS and features.check(DERIVATIVE_FORMAT) else "webp"
+    if event.get("action") == "BACKFILL":
+        return backfill(image_format)
+
+    failures = []
+    processed = 0
+    start = time.time()
+    for record in event["Records"]:
+        try:
+            message = json.loads(record["body"])
+            if process_image(message.get("bucket", bucket_name), message["key"], image_format):
+                processed += 1
+        except Exception as e:
+            print(f"Derivatives failed for message {record['messageId']}: {str(e)}")
+            failures.append({"itemIdentifier": record["messageId"]})
+
+    print("Image derivative batch processed:", json.dumps({
+        "messages": len(event["Records"]),
+        "imagesProcessed": processed,
+        "failed": len(failures),
+        "format": image_format,
+        "seconds": round(time.time() - start, 3)
+    }))
+    return {"batchItemFailures": failures}
+
+def backfill(image_format):
+    """Process the current image of every bike that has no derivatives for it"""
+    scan_kwargs = {"ProjectionExpression": "bikeId, imageKey, imageUrl, derivativesSourceKey"}
+    processed = 0
+    failed = 0
+    while True:
+        result = bikes_table.scan(**scan_kwargs)
+        for bike in result.get("Items", []):
+            key = bike.get("imageKey") or image_key_from_url(bike.get("imageUrl"))
+            if not key or bike.get("derivativesSourceKey") == key:
+                continue
+            try:
+                if process_image(bucket_name, key, image_format):
+                    processed += 1
+            except Exception as e:
+                print(f"Derivatives failed for bike {bike['bikeId']}: {str(e)}")
+                failed += 1
+        if "LastEvaluatedKey" not in result:
+            break
+        scan_kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    print(f"Backfilled derivatives of {processed} bikes, {failed} failed")
+    return {"processed": processed, "failed": failed}
+
+def image_key_from_url(image_url):
+    """Object key of an image URL of the bike images bucket"""
+    prefix = f"https://{bucket_name}.s3.amazonaws.com/"
+    if image_url and image_url.startswith(prefix):
+        return image_url[len(prefix):]
+    return None
+
+def bike_id_for(key):
+    """bikeId from bikes/<bikeId>-<uuid>.<ext> or uploads/<bikeId>/<uuid>.<ext>"""
+    if key.startswith("uploads/"):
+        return key.split("/")[1]
+    if key.startswith("bikes/"):
+        stem = key[len("bikes/"):].rsplit(".", 1)[0]
+        # The uuid4 suffix is 36 characters, bike ids may contain dashes
+        return stem[:-37] if len(stem) > 37 else None
+    return None
+
+def derivative_key(key, name, image_format):
+    stem = key.rsplit(".", 1)[0]
+    return f"{DERIVATIVES_PREFIX}{stem}-{name}.{image_format}"
+
+def process_image(bucket, key, image_format):
+    """
+    Build and store the derivatives of one source image. False if it was
+    skipped because the bike already has them or no longer uses the image.
+    """
+    bike_id = bike_id_for(key)
+    if not bike_id:
+        print(f"Skipping {key}, not a bike image key")
+        return False
+
+    bike = bikes_table.get_item(
+        Key={"bikeId": bike_id},
+        ProjectionExpression="imageKey, imageUrl, derivativesSourceKey"
+    ).get("Item")
+    if not bike or not uses_image(bike, key):
+        print(f"Skipping {key}, bike {bike_id} does not use it")
+        return False
+    if bike.get("derivativesSourceKey") == key:
+        return False
+
+    timings = {}
+    started = time.perf_counter()
+    try:
+        source = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            print(f"Skipping {key}, deleted since it was uploaded")
+            return False
+        raise
+    timings["downloadMs"] = elapsed_ms(started)
+
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(source))
+    # Apply the camera orientation before EXIF is dropped by the re-encode
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    timings["decodeMs"] = elapsed_ms(started)
+
+    pil_format, content_type, options = FORMATS[image_format]
+    derivatives = {}
+    sizes = {}
+    for name, (box, quality) in DERIVATIVE_SIZES.items():
+        started = time.perf_counter()
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, pil_format, quality=quality, **options)
+        timings[f"{name}EncodeMs"] = elapsed_ms(started)
+
+        started = time.perf_counter()
+        derivative = derivative_key(key, name, image_format)
+        s3.put_object(
+            Bucket=bucket,
+            Key=derivative,
+            Body=buffer.getvalue(),
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable"
+        )
+        timings[f"{name}UploadMs"] = elapsed_ms(started)
+        derivatives[name] = derivative
+        sizes[name] = buffer.tell()
+
+    recorded = record_derivatives(bike_id, key, bucket, derivatives)
+    print("Image derivatives:", json.dumps({
+        "key": key,
+        "bikeId": bike_id,
+        "sourceBytes": len(source),
+        "sourceSize": list(image.size),
+        "bytes": sizes,
+        "recorded": recorded,
+        **timings
+    }))
+    return True
+
+def uses_image(bike, key):
+    if bike.get("imageKey") == key:
+        return True
+    # Bikes created before imageKey was stored only have the URL
+    return bool(bike.get("imageUrl")) and bike["imageUrl"].endswith("/" + key)
+
+def record_derivatives(bike_id, key, bucket, derivatives):
+    """Store the derivative keys and thumbnail URL, unless the bike changed image meanwhile"""
+    try:
+        bikes_table.update_item(
+            Key={"bikeId": bike_id},
+            UpdateExpression=(
+                "SET thumbnailKey = :thumbnail, mediumKey = :medium, "
+                "thumbnailUrl = :thumbnailUrl, mediumUrl = :mediumUrl, derivativesSourceKey = :source"
+            ),
+            ConditionExpression="attribute_exists(bikeId) AND (imageKey = :source OR attribute_not_exists(imageKey))",
+            ExpressionAttributeValues={
+                ":thumbnail": derivatives["thumbnail"],
+                ":medium": derivatives["medium"],
+                ":thumbnailUrl": f"https://{bucket}.s3.amazonaws.com/{derivatives['thumbnail']}",
+                ":mediumUrl": f"https://{bucket}.s3.amazonaws.com/{derivatives['medium']}",
+                ":source": key
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,108 @@
+import os
+import json
+import boto3
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+sqs = boto3.client('sqs')
+
+bikes_table = dynamodb.Table(os.environ.get('BIKES_TABLE', 'BikesTable'))
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', str(10 * 1024 * 1024)))
+derivatives_queue_url = os.environ.get('DERIVATIVES_QUEUE_URL')
+
+UPLOAD_PREFIX = "uploads/"
+
+# Tag create_bike/update_bike look for when the upload was validated before the bike recorded it
+VALIDATION_TAG = "imageValidation"
+
+def lambda_handler(event, context):
+    """
+    Validate bike images uploaded with a presigned POST (S3 ObjectCreated
+    on uploads/).
+
+    The object must be within MAX_IMAGE_BYTES and its first bytes must
+    match the declared content type. Accepted uploads are tagged and the
+    bike recording the key is marked READY; rejected ones are deleted and
+    the bike marked REJECTED. The bike is only touched if it still points
+    at the key, create_bike/update_bike check the tag for uploads
+    validated before the bike recorded them. Accepted uploads the bike
+    already uses are queued for image_derivatives, the bike writes queue
+    the others.
+    """
+    for record in event.get("Records", []):
+        bucket = record["s3"]["bucket"]["name"]
+        key = unquote_plus(record["s3"]["object"]["key"])
+        if not key.startswith(UPLOAD_PREFIX):
+            continue
+        bike_id = key[len(UPLOAD_PREFIX):].split("/", 1)[0]
+
+        try:
+            head = s3.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                # Replaced or deleted since the event was sent
+                continue
+            raise
+
+        reason = validate_image(bucket, key, head)
+        if reason is None:
+            s3.put_object_tagging(
+                Bucket=bucket,
+                Key=key,
+                Tagging={"TagSet": [{"Key": VALIDATION_TAG, "Value": "ACCEPTED"}]}
+            )
+            marked = set_image_status(bike_id, key, "READY")
+            if marked and derivatives_queue_url:
+                sqs.send_message(
+                    QueueUrl=derivatives_queue_url,
+                    MessageBody=json.dumps({"bucket": bucket, "key": key, "bikeId": bike_id})
+                )
+            print(f"Accepted image {key} ({head['ContentLength']} bytes), bike updated: {marked}")
+        else:
+            s3.delete_object(Bucket=bucket, Key=key)
+            marked = set_image_status(bike_id, key, "REJECTED")
+            print(f"Rejected image {key}: {reason}, bike updated: {marked}")
+
+    return {"statusCode": 200}
+
+def validate_image(bucket, key, head):
+    """None if the upload is an acceptable image, otherwise why not"""
+    size = head["ContentLength"]
+    if size <= 0 or size > MAX_IMAGE_BYTES:
+        return f"size {size} outside 1..{MAX_IMAGE_BYTES} bytes"
+
+    # Only the header is needed to tell the format apart
+    header = s3.get_object(Bucket=bucket, Key=key, Range="bytes=0-15")["Body"].read()
+    detected = sniff_image_type(header)
+    if detected is None:
+        return "not a JPEG, PNG or WebP image"
+    if detected != head.get("ContentType"):
+        return f"content is {detected} but was uploaded as {head.get('ContentType')}"
+    return None
+
+def sniff_image_type(header):
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def set_image_status(bike_id, key, status):
+    """Set the bike's imageStatus, if the bike still points at this key"""
+    try:
+        bikes_table.update_item(
+            Key={"bikeId": bike_id},
+            UpdateExpression="SET imageStatus = :status",
+            ConditionExpression="imageKey = :key",
+            ExpressionAttributeValues={":status": status, ":key": key}
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # Not recorded on the bike yet (or replaced), the bike write checks the tag
+            return False
+        raise
@@ -0,0 +1,292 @@
+import csv
+import io
+import json
+import os
+import re
+import time
+import base64
+import boto3
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+dynamodb = boto3.resource('dynamodb')
+
+bikes_table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
+availability_table_name = os.environ.get('AVAILABILITY_TABLE', 'availability-table-dev')
+
+MAX_IMPORT_ROWS = int(os.environ.get('MAX_IMPORT_ROWS', '1000'))
+
+# BatchGetItem takes at most 100 keys, BatchWriteItem 25 writes
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+MAX_WRITE_ATTEMPTS = 8
+
+# Same slots create_bike opens for a new bike
+TIME_SLOTS = ["10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00", "18:00"]
+
+# bikeId ends up in availability keys (<bikeId>#<date>#<slot>) and S3 keys
+BIKE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# CSV columns features.<name> become entries of the features map
+FEATURE_COLUMN_PREFIX = "features."
+
+def lambda_handler(event, context):
+    """
+    Import a manifest of bikes for the caller's franchise (POST /bikes/import).
+
+    The body is CSV with a header row (bikeId, type, hourlyRate, and
+    optionally status, discountCode, features.<name> columns) or NDJSON
+    with one bike object per line, told apart by Content-Type or ?format=.
+    Rows are validated, existing bikeIds looked up with batched reads and
+    the bikes and their availability slots written with batched writes,
+    retrying unprocessed items. Images are attached afterwards through
+    /bikes/{bikeId}/image-upload and update_bike.
+
+    Returns a report with the outcome of every row. With ?dryRun=true
+    nothing is written.
+    """
+    start = time.time()
+    try:
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+        user_type = claims.get("custom:userType")
+        franchise_id = claims.get("cognito:username")
+
+        if user_type != "admin":
+            return response(403, "Unauthorized: Only admin can import bikes.")
+
+        query_params = event.get("queryStringParameters") or {}
+        dry_run = query_params.get("dryRun", "").lower() == "true"
+        body = event.get("body") or ""
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body).decode("utf-8")
+        # Spreadsheet exports often start with a byte order mark
+        body = body.lstrip("\ufeff")
+
+        manifest_format = query_params.get("format") or manifest_format_of(event.get("headers") or {}, body)
+        if manifest_format not in ("csv", "ndjson"):
+            return response(400, "format must be csv or ndjson.")
+        rows = parse_csv(body) if manifest_format == "csv" else parse_ndjson(body)
+        if not rows:
+            return response(400, "The manifest has no bikes.")
+        if len(rows) > MAX_IMPORT_ROWS:
+            return response(400, f"A manifest may have at most {MAX_IMPORT_ROWS} bikes, split it up.")
+
+        now = datetime.utcnow().isoformat()
+        report = []
+        valid = {}
+        for number, (values, parse_error) in enumerate(rows, start=1):
+            bike_item, errors = validate_row(values, parse_error, franchise_id, now)
+            bike_id = (values or {}).get("bikeId")
+            row = {"row": number, "bikeId": str(bike_id) if bike_id is not None else None, "status": "INVALID", "errors": errors}
+            if not errors and bike_item["bikeId"] in valid:
+                row["status"] = "DUPLICATE"
+                row["errors"] = [f"bikeId also on row {valid[bike_item['bikeId']][0]['row']}"]
+            elif not errors:
+                row["status"] = "VALID"
+                valid[bike_item["bikeId"]] = (row, bike_item)
+            report.append(row)
+
+        for bike_id in existing_bike_ids(list(valid)):
+            row, _ = valid.pop(bike_id)
+            row["status"] = "EXISTS"
+            row["errors"] = [f"Bike with ID '{bike_id}' already exists."]
+
+        if not dry_run and valid:
+            write_bikes(list(valid.values()), now)
+
+        counts = {}
+        for row in report:
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+        print("Bike import:", json.dumps({
+            "franchiseId": franchise_id,
+            "format": manifest_format,
+            "rows": len(report),
+            "dryRun": dry_run,
+            "counts": counts,
+            "seconds": round(time.time() - start, 3)
+        }))
+        return response(200, {
+            "dryRun": dry_run,
+            "total": len(report),
+            "counts": counts,
+            "rows": report
+        })
+
+    except UnicodeDecodeError:
+        return response(400, "The manifest must be UTF-8 text.")
+    except csv.Error as e:
+        return response(400, f"Invalid CSV: {str(e)}")
+    except Exception as e:
+        print(f"Error in import_bikes lambda: {str(e)}")
+        return response(500, f"Internal server error: {str(e)}")
+
+def manifest_format_of(headers, body):
+    content_type = next((value for name, value in headers.items() if name.lower() == "content-type"), "") or ""
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    # Untyped uploads, NDJSON lines are objects
+    return "ndjson" if body.lstrip().startswith("{") else "csv"
+
+def parse_csv(body):
+    """(values, parse error) per data row, features.<name> columns folded into features"""
+    rows = []
+    for values in csv.DictReader(io.StringIO(body)):
+        if not any((value or "").strip() for value in values.values() if isinstance(value, str)):
+            continue
+        if None in values:
+            rows.append((values, "more fields than the header"))
+            continue
+        bike = {"features": {}}
+        for column, value in values.items():
+            value = (value or "").strip()
+            if column.startswith(FEATURE_COLUMN_PREFIX):
+                if value:
+                    bike["features"][column[len(FEATURE_COLUMN_PREFIX):]] = value
+            elif value:
+                bike[column] = value
+        rows.append((bike, None))
+    return rows
+
+def parse_ndjson(body):
+    """(values, parse error) per non-blank line"""
+    rows = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line, parse_float=Decimal)
+        except json.JSONDecodeError as e:
+            rows.append((None, f"invalid JSON: {str(e)}"))
+            continue
+        if not isinstance(values, dict):
+            rows.append((None, "each line must be a JSON object"))
+            continue
+        rows.append((values, None))
+    return rows
+
+def validate_row(values, parse_error, franchise_id, now):
+    """The bike item a row describes and the reasons it is invalid, if any"""
+    if parse_error:
+        return None, [parse_error]
+    errors = []
+    bike_id = str(values.get("bikeId") or "")
+    if not bike_id:
+        errors.append("Missing required field: bikeId")
+    elif not BIKE_ID_PATTERN.match(bike_id):
+        errors.append("bikeId may only contain letters, digits, '.', '_' and '-' (at most 64)")
+    if not values.get("type"):
+        errors.append("Missing required field: type")
+
+    hourly_rate = None
+    if values.get("hourlyRate") in (None, ""):
+        errors.append("Missing required field: hourlyRate")
+    else:
+        try:
+            hourly_rate = Decimal(str(values["hourlyRate"]))
+            if not hourly_rate.is_finite() or hourly_rate <= 0:
+                errors.append("hourlyRate must be a positive number")
+        except InvalidOperation:
+            errors.append("hourlyRate must be a positive number")
+
+    features = values.get("features", {})
+    if not isinstance(features, dict):
+        errors.append("features must be an object")
+    if values.get("franchiseId") not in (None, franchise_id):
+        errors.append("franchiseId must be your own franchise")
+    if errors:
+        return None, errors
+
+    return {
+        "bikeId": bike_id,
+        "type": str(values["type"]),
+        "hourlyRate": hourly_rate,
+        "franchiseId": franchise_id,
+        "status": str(values.get("status") or "available"),
+        "features": features,
+        "discountCode": str(values.get("discountCode") or ""),
+        "createdAt": now,
+        "updatedAt": now
+    }, []
+
+def existing_bike_ids(bike_ids):
+    """The bikeIds that are already taken, read in batches"""
+    existing = set()
+    for start in range(0, len(bike_ids), BATCH_GET_SIZE):
+        request_items = {
+            bikes_table_name: {
+                "Keys": [{"bikeId": bike_id} for bike_id in bike_ids[start:start + BATCH_GET_SIZE]],
+                "ProjectionExpression": "bikeId"
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            existing.update(item["bikeId"] for item in result.get("Responses", {}).get(bikes_table_name, []))
+            request_items = result.get("UnprocessedKeys")
+    return existing
+
+def write_bikes(rows, now):
+    """
+    Write the availability slots and then the bikes in batches, so a row
+    that fails is not left behind as an existing bike and can simply be
+    imported again. Rows end up CREATED or FAILED.
+    """
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    slots = []
+    for row, bike_item in rows:
+        for slot in TIME_SLOTS:
+            slots.append((row, {
+                "bikeId": f"{bike_item['bikeId']}#{today}#{slot}",
+                "originalBikeId": bike_item["bikeId"],
+                "date": today,
+                "timeSlot": slot,
+                "status": "AVAILABLE",
+                "notes": "Default availability created with bike import",
+                "updatedAt": now + "Z"
+            }))
+    failed = batch_put(availability_table_name, slots)
+    failed |= batch_put(bikes_table_name, [(row, bike_item) for row, bike_item in rows if id(row) not in failed])
+
+    for row, _ in rows:
+        if id(row) in failed:
+            row["status"] = "FAILED"
+            row["errors"] = ["Could not be written while the tables were throttling, import the row again"]
+        else:
+            row["status"] = "CREATED"
+
+def batch_put(table_name, writes):
+    """
+    Put (row, item) pairs in batches of 25, retrying unprocessed items with
+    backoff. Returns the ids of the rows with items that were never written.
+    """
+    failed = set()
+    for start in range(0, len(writes), BATCH_WRITE_SIZE):
+        chunk = writes[start:start + BATCH_WRITE_SIZE]
+        owners = {item["bikeId"]: row for row, item in chunk}
+        request_items = {table_name: [{"PutRequest": {"Item": item}} for _, item in chunk]}
+        attempt = 0
+        while True:
+            result = dynamodb.batch_write_item(RequestItems=request_items)
+            request_items = result.get("UnprocessedItems")
+            if not request_items:
+                break
+            attempt += 1
+            if attempt >= MAX_WRITE_ATTEMPTS:
+                failed.update(id(owners[request["PutRequest"]["Item"]["bikeId"]]) for request in request_items[table_name])
+                break
+            # Unprocessed items mean the table is throttling, back off before retrying
+            time.sleep(min(0.05 * 2 ** attempt, 2))
+    return failed
+
+def response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
+            "Access-Control-Allow-Methods": "POST,OPTIONS"
+        },
+        "body": json.dumps(body if isinstance(body, dict) else {"error": body})
+    }
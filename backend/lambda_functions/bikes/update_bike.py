@@ -5,12 +5,11 @@ import boto3
 import base64
 import uuid
 import decimal
+from bike_images import s3, bucket_name, image_url, check_uploaded_image, settle_image_status, queue_derivatives
 
 dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3')
 
 table_name = os.environ.get('BIKES_TABLE', 'BikesTable')
-bucket_name = os.environ.get('BIKE_IMAGES_BUCKET', 'dalscooter-bike-images')
 table = dynamodb.Table(table_name)
 
 def lambda_handler(event, context):
@@ -44,14 +43,29 @@ def lambda_handler(event, context):
             expr_attr_vals[":f"] = body["features"]
             expr_attr_names["#F"] = "features"
         if "hourlyRate" in body:
+            # hourlyRate is a number key of the rate index, same checks as import_bikes
+            try:
+                hourly_rate = decimal.Decimal(str(body["hourlyRate"]))
+            except decimal.InvalidOperation:
+                hourly_rate = None
+            if hourly_rate is None or not hourly_rate.is_finite() or hourly_rate <= 0:
+                return response(400, "hourlyRate must be a positive number")
             update_expr.append("#R = :r")
-            expr_attr_vals[":r"] = body["hourlyRate"]
+            expr_attr_vals[":r"] = hourly_rate
             expr_attr_names["#R"] = "hourlyRate"
         if "discountCode" in body:
             update_expr.append("#D = :d")
             expr_attr_vals[":d"] = body["discountCode"]
             expr_attr_names["#D"] = "discountCode"
-        if "imageBase64" in body and body["imageBase64"]:
+        image_key = None
+        image_status = None
+        if body.get("imageKey"):
+            # Uploaded straight to S3, validated asynchronously by image_upload_validator
+            image_key = body["imageKey"]
+            error, image_status = check_uploaded_image(bike_id, image_key)
+            if error:
+                return response(400, error)
+        elif "imageBase64" in body and body["imageBase64"]:
             image_bytes = base64.b64decode(body["imageBase64"])
             image_key = f"bikes/{bike_id}-{str(uuid.uuid4())}.jpg"
             s3.put_object(
@@ -60,9 +74,17 @@ def lambda_handler(event, context):
                 Body=image_bytes,
                 ContentType='image/jpeg'
             )
+            image_status = "READY"
+        if image_key:
             update_expr.append("#I = :i")
             expr_attr_vals[":i"] = image_key
             expr_attr_names["#I"] = "imageKey"
+            update_expr.append("#U = :u")
+            expr_attr_vals[":u"] = image_url(image_key)
+            expr_attr_names["#U"] = "imageUrl"
+            update_expr.append("#IS = :is")
+            expr_attr_vals[":is"] = image_status
+            expr_attr_names["#IS"] = "imageStatus"
 
         if not update_expr:
             return response(400, "No valid fields to update.")
@@ -73,6 +95,11 @@ def lambda_handler(event, context):
             ExpressionAttributeValues=expr_attr_vals,
             ExpressionAttributeNames=expr_attr_names
         )
+        if image_status == "PENDING":
+            image_status = settle_image_status(bike_id, image_key)
+        if image_status == "READY":
+            # Otherwise image_upload_validator queues it once validated
+            queue_derivatives(bike_id, image_key)
 
         # Fetch updated bike
         updated_bike = table.get_item(Key={"bikeId": bike_id}).get("Item")
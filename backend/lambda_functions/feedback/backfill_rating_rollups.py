@@ -0,0 +1,164 @@
+import json
+import os
+import time
+import boto3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+FEEDBACK_TABLE = os.environ['FEEDBACK_TABLE']
+BIKES_TABLE = os.environ['BIKES_TABLE']
+RATING_ROLLUPS_TABLE = os.environ['RATING_ROLLUPS_TABLE']
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '8'))
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+_thread_local = threading.local()
+
+def lambda_handler(event, context):
+    """
+    Rebuild every bike's rating rollup from the feedback table, and copy
+    the bike's franchiseId onto feedback submitted before it was stored.
+
+    Invoked manually, optionally with {"segments": n}. The feedback table is
+    read with a parallel scan, one worker per segment. Rollups are
+    overwritten, so run it while feedback writes are paused (or re-run it)
+    to avoid losing ratings submitted mid-backfill.
+    """
+    try:
+        segments = int(event.get('segments', SCAN_SEGMENTS))
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            partials = list(executor.map(lambda segment: scan_segment(segment, segments), range(segments)))
+
+        rollups = {}
+        scanned = 0
+        missing_franchise = []
+        for partial, segment_scanned, segment_missing in partials:
+            scanned += segment_scanned
+            missing_franchise.extend(segment_missing)
+            for bike_id, rollup in partial.items():
+                merged = rollups.setdefault(bike_id, new_rollup(bike_id))
+                for attribute in ['ratingCount', 'ratingSum'] + [f'stars{star}' for star in range(1, 6)]:
+                    merged[attribute] += rollup[attribute]
+
+        bike_ids = set(rollups) | {bike_id for _, bike_id in missing_franchise}
+        franchises = get_bike_franchises(list(bike_ids))
+
+        updated_at = datetime.utcnow().isoformat() + "Z"
+        rollups_table = boto3.resource('dynamodb').Table(RATING_ROLLUPS_TABLE)
+        with rollups_table.batch_writer() as batch:
+            for rollup in rollups.values():
+                rollup['updatedAt'] = updated_at
+                if franchises.get(rollup['bikeId']):
+                    rollup['franchiseId'] = franchises[rollup['bikeId']]
+                batch.put_item(Item=rollup)
+
+        to_update = [
+            (feedback_id, franchises[bike_id]) for feedback_id, bike_id in missing_franchise
+            if franchises.get(bike_id)
+        ]
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            list(executor.map(lambda args: set_feedback_franchise(*args), to_update))
+
+        summary = {
+            "feedbackScanned": scanned,
+            "rollupsWritten": len(rollups),
+            "feedbackFranchiseSet": len(to_update),
+            "segments": segments,
+            "seconds": round(time.time() - start, 2)
+        }
+        print("Rating rollup backfill complete:", json.dumps(summary))
+        return {"statusCode": 200, "body": json.dumps(summary)}
+
+    except Exception as e:
+        print(f"Error in backfill_rating_rollups: {str(e)}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+
+def get_feedback_table():
+    """Feedback table for the current worker thread"""
+    # boto3 resources are not thread-safe, each worker gets its own
+    if not hasattr(_thread_local, 'feedback_table'):
+        _thread_local.feedback_table = boto3.session.Session().resource('dynamodb').Table(FEEDBACK_TABLE)
+    return _thread_local.feedback_table
+
+def scan_segment(segment, total_segments):
+    """
+    Aggregate the ratings of one scan segment. Returns (rollups by bikeId,
+    items scanned, [(feedbackId, bikeId)] of feedback without a franchiseId)
+    """
+    feedback_table = get_feedback_table()
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ProjectionExpression': 'feedbackId, bikeId, rating, franchiseId'
+    }
+    rollups = {}
+    scanned = 0
+    missing_franchise = []
+
+    while True:
+        resp = feedback_table.scan(**scan_kwargs)
+        for item in resp.get('Items', []):
+            scanned += 1
+            if 'bikeId' not in item:
+                continue
+            if 'franchiseId' not in item:
+                missing_franchise.append((item['feedbackId'], item['bikeId']))
+            if 'rating' not in item:
+                continue
+            rating = Decimal(str(item['rating']))
+            rollup = rollups.setdefault(item['bikeId'], new_rollup(item['bikeId']))
+            rollup['ratingCount'] += 1
+            rollup['ratingSum'] += rating
+            rollup[star_bucket(rating)] += 1
+
+        if 'LastEvaluatedKey' not in resp:
+            return rollups, scanned, missing_franchise
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def get_bike_franchises(bike_ids):
+    """Batch-read the franchiseId of each bike, keyed by bikeId"""
+    dynamodb = boto3.resource('dynamodb')
+    franchises = {}
+    for start in range(0, len(bike_ids), BATCH_GET_SIZE):
+        request_items = {
+            BIKES_TABLE: {
+                'Keys': [{'bikeId': bike_id} for bike_id in bike_ids[start:start + BATCH_GET_SIZE]],
+                'ProjectionExpression': 'bikeId, franchiseId'
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for bike in result.get('Responses', {}).get(BIKES_TABLE, []):
+                franchises[bike['bikeId']] = bike.get('franchiseId')
+            request_items = result.get('UnprocessedKeys')
+    return franchises
+
+def set_feedback_franchise(feedback_id, franchise_id):
+    """Copy the bike's franchiseId onto a feedback item, if it still exists"""
+    feedback_table = get_feedback_table()
+    try:
+        feedback_table.update_item(
+            Key={'feedbackId': feedback_id},
+            UpdateExpression='SET franchiseId = :franchiseId',
+            ConditionExpression='attribute_exists(feedbackId)',
+            ExpressionAttributeValues={':franchiseId': franchise_id}
+        )
+    except feedback_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+def new_rollup(bike_id):
+    rollup = {'bikeId': bike_id, 'ratingCount': 0, 'ratingSum': Decimal(0)}
+    for star in range(1, 6):
+        rollup[f'stars{star}'] = 0
+    return rollup
+
+def star_bucket(rating):
+    """Histogram attribute for a rating, e.g. 4.5 -> stars5"""
+    return f"stars{min(max(int(rating + Decimal('0.5')), 1), 5)}"
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from datetime import date, datetime, timedelta
+
+FEEDBACK_DAILY_STATS_TABLE = os.environ['FEEDBACK_DAILY_STATS_TABLE']
+DAY_RETENTION_DAYS = int(os.environ.get('DAY_RETENTION_DAYS', '90'))
+WEEK_RETENTION_DAYS = int(os.environ.get('WEEK_RETENTION_DAYS', '365'))
+
+COUNTERS = ['ratingCount', 'ratingSum'] + [f'stars{star}' for star in range(1, 6)] + [
+    'positive', 'negative', 'neutral', 'mixed', 'pending'
+]
+
+dynamodb = boto3.resource('dynamodb')
+daily_stats_table = dynamodb.Table(FEEDBACK_DAILY_STATS_TABLE)
+
+def lambda_handler(event, context):
+    """
+    Fold day stats older than DAY_RETENTION_DAYS into their week, and week
+    stats older than WEEK_RETENTION_DAYS into their month.
+
+    Runs daily on a schedule, or manually with {"today": "YYYY-MM-DD"}.
+    Each fold adds the counters to the coarser item and deletes the finer
+    one in a single transaction, conditional on the finer item not having
+    changed since it was read. Feedback edits for an already compacted day
+    are applied to the week or month it was folded into (update_feedback),
+    a sentiment scored later recreates the day item, which is folded on the
+    next run.
+    """
+    try:
+        start = time.time()
+        today = date.fromisoformat(event['today']) if event.get('today') else datetime.utcnow().date()
+        day_cutoff = today - timedelta(days=DAY_RETENTION_DAYS)
+        week_cutoff = today - timedelta(days=WEEK_RETENTION_DAYS)
+
+        # Days first, so weeks they fold into are compacted on the same run
+        days_folded, days_skipped = fold_period('DAY#', f"DAY#{day_cutoff.isoformat()}", week_key)
+        weeks_folded, weeks_skipped = fold_period('WEEK#', f"WEEK#{week_cutoff.isoformat()}", month_key)
+
+        summary = {
+            "daysFolded": days_folded,
+            "weeksFolded": weeks_folded,
+            "skipped": days_skipped + weeks_skipped,
+            "dayCutoff": day_cutoff.isoformat(),
+            "weekCutoff": week_cutoff.isoformat(),
+            "seconds": round(time.time() - start, 2)
+        }
+        print("Feedback stats compaction complete:", json.dumps(summary))
+        return {"statusCode": 200, "body": json.dumps(summary)}
+
+    except Exception as e:
+        print(f"Error in compact_feedback_stats: {str(e)}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+
+def week_key(period_start):
+    """WEEK# key of the week (starting Monday) a day falls in"""
+    day = date.fromisoformat(period_start)
+    return f"WEEK#{(day - timedelta(days=day.weekday())).isoformat()}"
+
+def month_key(period_start):
+    """MONTH# key of the month a week starts in"""
+    return f"MONTH#{period_start[:7]}"
+
+def fold_period(prefix, cutoff_key, target_key):
+    """
+    Fold every item with a periodKey of this prefix before cutoff_key into
+    the item target_key maps its start to. Returns (folded, skipped).
+    """
+    scan_kwargs = {
+        'FilterExpression': Attr('periodKey').begins_with(prefix) & Attr('periodKey').lt(cutoff_key)
+    }
+    folded = 0
+    skipped = 0
+    while True:
+        resp = daily_stats_table.scan(**scan_kwargs)
+        for item in resp.get('Items', []):
+            if fold_item(item, target_key(item['periodKey'].split('#', 1)[1])):
+                folded += 1
+            else:
+                skipped += 1
+        if 'LastEvaluatedKey' not in resp:
+            return folded, skipped
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def fold_item(item, target_period_key):
+    """
+    Add an item's counters to the coarser period and delete it, atomically.
+    False if the item changed since it was read, it is folded next run.
+    """
+    source_key = {'statsId': item['statsId'], 'periodKey': item['periodKey']}
+    delete = {
+        'TableName': FEEDBACK_DAILY_STATS_TABLE,
+        'Key': source_key,
+        'ConditionExpression': 'updatedAt = :seen',
+        'ExpressionAttributeValues': {':seen': item['updatedAt']}
+    }
+
+    deltas = {attribute: item[attribute] for attribute in COUNTERS if item.get(attribute)}
+    transact_items = [{'Delete': delete}]
+    if deltas:
+        expr_attr_names = {}
+        expr_attr_vals = {':now': datetime.utcnow().isoformat() + 'Z'}
+        for i, (attribute, delta) in enumerate(deltas.items()):
+            expr_attr_names[f'#a{i}'] = attribute
+            expr_attr_vals[f':a{i}'] = delta
+        transact_items.append({
+            'Update': {
+                'TableName': FEEDBACK_DAILY_STATS_TABLE,
+                'Key': {'statsId': item['statsId'], 'periodKey': target_period_key},
+                'UpdateExpression': 'ADD ' + ', '.join(f'#a{i} :a{i}' for i in range(len(deltas))) + ' SET updatedAt = :now',
+                'ExpressionAttributeNames': expr_attr_names,
+                'ExpressionAttributeValues': expr_attr_vals
+            }
+        })
+
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'TransactionCanceledException':
+            print(f"Stats {item['statsId']} {item['periodKey']} changed while compacting, skipping")
+            return False
+        raise
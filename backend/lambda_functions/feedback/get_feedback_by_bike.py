@@ -1,38 +1,71 @@
 import json
 import os
+import base64
 import boto3
+from boto3.dynamodb.conditions import Key, Attr
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 feedback_table = dynamodb.Table(os.environ['FEEDBACK_TABLE'])
+rating_rollups_table = dynamodb.Table(os.environ['RATING_ROLLUPS_TABLE'])
+bike_index_name = os.environ.get('FEEDBACK_BIKE_INDEX', 'bikeId-submittedAt-index')
+
+VALID_SENTIMENTS = ['POSITIVE', 'NEGATIVE', 'NEUTRAL', 'MIXED', 'PENDING']
+
+# Queries per request when a sentiment filter leaves pages short
+MAX_FILTERED_QUERIES = 10
 
 def lambda_handler(event, context):
     try:
         bike_id = event["pathParameters"]["bikeId"]
-        # Scan feedbacks for this bikeId (since GSI doesn't exist)
-        resp = feedback_table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr('bikeId').eq(bike_id)
-        )
-        items = resp.get('Items', [])
-        
-        # Handle pagination if needed
-        while 'LastEvaluatedKey' in resp:
-            resp = feedback_table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('bikeId').eq(bike_id),
-                ExclusiveStartKey=resp['LastEvaluatedKey']
-            )
+        query_params = event.get('queryStringParameters') or {}
+        limit = min(int(query_params.get('limit', 20)), 100)  # Max 100 items
+        sentiment = (query_params.get('sentiment') or '').upper()
+
+        if sentiment and sentiment not in VALID_SENTIMENTS:
+            return response(400, {"error": f"sentiment must be one of: {VALID_SENTIMENTS}"})
+
+        query_kwargs = {
+            'IndexName': bike_index_name,
+            'KeyConditionExpression': Key('bikeId').eq(bike_id),
+            'ScanIndexForward': False  # Newest first
+        }
+        if sentiment:
+            query_kwargs['FilterExpression'] = Attr('sentiment').eq(sentiment)
+        if query_params.get('nextToken'):
+            try:
+                query_kwargs['ExclusiveStartKey'] = decode_next_token(query_params['nextToken'], bike_id)
+            except ValueError:
+                return response(400, {"error": "nextToken is invalid"})
+
+        # Limit is applied before the sentiment filter, so keep querying
+        # for the rest of the page until it is full or the bike runs out
+        items = []
+        last_key = None
+        for _ in range(MAX_FILTERED_QUERIES):
+            query_kwargs['Limit'] = limit - len(items)
+            resp = feedback_table.query(**query_kwargs)
             items.extend(resp.get('Items', []))
-            
-        ratings = [float(item['rating']) for item in items if 'rating' in item]
-        avg_rating = sum(ratings) / len(ratings) if ratings else None
+            last_key = resp.get('LastEvaluatedKey')
+            if not last_key or len(items) >= limit:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
+
+        # The average comes from the bike's rollup, maintained on every submit/update
+        rollup = rating_rollups_table.get_item(Key={'bikeId': bike_id}).get('Item')
+        summary = rating_summary(rollup)
         for item in items:
             if 'rating' in item:
                 item['rating'] = float(item['rating'])
-        print(items)
+        print(f"Returning {len(items)} feedbacks for bike {bike_id}")
         return response(200, {
             "bikeId": bike_id,
-            "averageRating": avg_rating,
-            "feedbacks": items
+            "averageRating": summary["averageRating"],
+            "ratingCount": summary["ratingCount"],
+            "ratingHistogram": summary["ratingHistogram"],
+            "feedbacks": items,
+            "count": len(items),
+            "nextToken": encode_next_token(last_key) if last_key else None
         })
     except Exception as e:
         print(f"Error in get_feedback_by_bike: {str(e)}")
@@ -40,9 +73,33 @@ def lambda_handler(event, context):
         print(f"Traceback: {traceback.format_exc()}")
         return response(500, {"error": str(e)})
 
+def rating_summary(rollup):
+    """Average, count and per-star histogram from a bike's rating rollup"""
+    rollup = rollup or {}
+    count = int(rollup.get('ratingCount', 0))
+    return {
+        "averageRating": round(float(rollup['ratingSum']) / count, 2) if count > 0 else None,
+        "ratingCount": count,
+        "ratingHistogram": {str(star): int(rollup.get(f'stars{star}', 0)) for star in range(1, 6)}
+    }
+
+def encode_next_token(last_evaluated_key):
+    """Encode a LastEvaluatedKey as an opaque pagination token"""
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_next_token(token, bike_id):
+    """Decode a pagination token back into an ExclusiveStartKey for this bike"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid nextToken')
+    if not isinstance(key, dict) or set(key) != {'feedbackId', 'bikeId', 'submittedAt'} or key['bikeId'] != bike_id:
+        raise ValueError('Invalid nextToken')
+    return key
+
 def response(status, body):
     return {
         "statusCode": status,
         "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
         "body": json.dumps(body)
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,114 @@
+import json
+import os
+import boto3
+from boto3.dynamodb.conditions import Key
+from datetime import date, datetime, timedelta
+
+dynamodb = boto3.resource('dynamodb')
+daily_stats_table = dynamodb.Table(os.environ['FEEDBACK_DAILY_STATS_TABLE'])
+
+SENTIMENT_COUNTS = ['positive', 'negative', 'neutral', 'mixed', 'pending']
+
+# Default window when no range is given
+DEFAULT_RANGE_DAYS = 30
+
+# Longest range a single request may ask for
+MAX_RANGE_DAYS = 731
+
+def lambda_handler(event, context):
+    """
+    Time series of a bike's or a franchise's ratings and sentiments between
+    from and to (YYYY-MM-DD, inclusive, default the last 30 days).
+
+    Recent days are kept per day, older ones are compacted into weeks and
+    then months (compact_feedback_stats), so a series can mix day, week
+    and month points. Each point covers the period starting at its start.
+    """
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        bike_id = query_params.get('bikeId')
+        franchise_id = query_params.get('franchiseId')
+
+        if bool(bike_id) == bool(franchise_id):
+            return response(400, {"error": "Exactly one of bikeId or franchiseId is required"})
+
+        if franchise_id:
+            # Same rule as get_franchise_feedback, franchise owners see only their own stats
+            claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+            if claims.get("custom:userType", "") != "admin":
+                return response(403, {"error": "Only franchise owners can access franchise stats."})
+            if claims.get("cognito:username") != franchise_id:
+                return response(403, {"error": "You can only access your own franchise stats."})
+
+        try:
+            to_day = parse_day(query_params.get('to')) if query_params.get('to') else datetime.utcnow().date()
+            from_day = parse_day(query_params.get('from')) if query_params.get('from') else to_day - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        except ValueError:
+            return response(400, {"error": "from and to must be dates in YYYY-MM-DD format"})
+        if from_day > to_day:
+            return response(400, {"error": "from must not be after to"})
+        if (to_day - from_day).days >= MAX_RANGE_DAYS:
+            return response(400, {"error": f"Range must not exceed {MAX_RANGE_DAYS} days"})
+
+        stats_id = f"BIKE#{bike_id}" if bike_id else f"FRANCHISE#{franchise_id}"
+
+        # Weeks are keyed by their Monday and months by YYYY-MM, so widen
+        # those ranges to include the periods the range starts inside of
+        week_start = from_day - timedelta(days=from_day.weekday())
+        items = (
+            query_period(stats_id, f"DAY#{from_day.isoformat()}", f"DAY#{to_day.isoformat()}")
+            + query_period(stats_id, f"WEEK#{week_start.isoformat()}", f"WEEK#{to_day.isoformat()}")
+            + query_period(stats_id, f"MONTH#{from_day.isoformat()[:7]}", f"MONTH#{to_day.isoformat()[:7]}")
+        )
+
+        points = sorted((stats_point(item) for item in items), key=lambda point: (point["start"], point["period"]))
+        print(f"Returning {len(points)} stats points for {stats_id}")
+        return response(200, {
+            "bikeId": bike_id,
+            "franchiseId": franchise_id,
+            "from": from_day.isoformat(),
+            "to": to_day.isoformat(),
+            "points": points,
+            "count": len(points)
+        })
+    except Exception as e:
+        print(f"Error in get_feedback_stats: {str(e)}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return response(500, {"error": str(e)})
+
+def parse_day(value):
+    return date.fromisoformat(value)
+
+def query_period(stats_id, start_key, end_key):
+    """All stats items of one granularity with periodKey between start_key and end_key"""
+    query_kwargs = {
+        'KeyConditionExpression': Key('statsId').eq(stats_id) & Key('periodKey').between(start_key, end_key)
+    }
+    items = []
+    while True:
+        resp = daily_stats_table.query(**query_kwargs)
+        items.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            return items
+        query_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def stats_point(item):
+    """One point of the series from a day, week or month stats item"""
+    period, start = item['periodKey'].split('#', 1)
+    count = int(item.get('ratingCount', 0))
+    return {
+        "period": period.lower(),
+        "start": start,
+        "ratingCount": count,
+        "averageRating": round(float(item['ratingSum']) / count, 2) if count > 0 else None,
+        "ratingHistogram": {str(star): int(item.get(f'stars{star}', 0)) for star in range(1, 6)},
+        "sentiments": {sentiment.upper(): int(item.get(sentiment, 0)) for sentiment in SENTIMENT_COUNTS}
+    }
+
+def response(status, body):
+    return {
+        "statusCode": status,
+        "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
+        "body": json.dumps(body)
+    }
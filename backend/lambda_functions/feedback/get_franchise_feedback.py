@@ -1,11 +1,12 @@
 import json
 import os
 import boto3
+from boto3.dynamodb.conditions import Key
 from decimal import Decimal
-from collections import defaultdict
 
 dynamodb = boto3.resource('dynamodb')
-feedback_table = dynamodb.Table(os.environ['FEEDBACK_TABLE'])
+rating_rollups_table = dynamodb.Table(os.environ['RATING_ROLLUPS_TABLE'])
+franchise_index_name = os.environ.get('ROLLUP_FRANCHISE_INDEX', 'franchiseId-bikeId-index')
 
 def lambda_handler(event, context):
     try:
@@ -24,35 +25,28 @@ def lambda_handler(event, context):
         if user_franchise_id != franchise_id:
             return response(403, {"error": "You can only access your own franchise feedback."})
         
-        # Scan feedbacks for this franchiseId (since GSI doesn't exist)
-        resp = feedback_table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr('franchiseId').eq(franchise_id)
-        )
-        items = resp.get('Items', [])
+        # One rollup per rated bike, kept up to date by submit/update feedback
+        query_kwargs = {
+            'IndexName': franchise_index_name,
+            'KeyConditionExpression': Key('franchiseId').eq(franchise_id)
+        }
+        resp = rating_rollups_table.query(**query_kwargs)
+        rollups = resp.get('Items', [])
         
         # Handle pagination if needed
         while 'LastEvaluatedKey' in resp:
-            resp = feedback_table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('franchiseId').eq(franchise_id),
-                ExclusiveStartKey=resp['LastEvaluatedKey']
-            )
-            items.extend(resp.get('Items', []))
-        
-        summary = defaultdict(lambda: {"count": 0, "sum": 0.0})
-        for item in items:
-            bike_id = item.get('bikeId')
-            rating = float(item.get('rating', 0))
-            summary[bike_id]["count"] += 1
-            summary[bike_id]["sum"] += rating
+            query_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+            resp = rating_rollups_table.query(**query_kwargs)
+            rollups.extend(resp.get('Items', []))
         
         result = {
             "franchiseId": franchise_id,
             "bikes": [
                 {
-                    "bikeId": bike_id,
-                    "averageRating": (data["sum"] / data["count"]) if data["count"] else None,
-                    "feedbackCount": data["count"]
-                } for bike_id, data in summary.items()
+                    "bikeId": rollup['bikeId'],
+                    "averageRating": (float(rollup['ratingSum']) / int(rollup['ratingCount'])) if rollup.get('ratingCount') else None,
+                    "feedbackCount": int(rollup.get('ratingCount', 0))
+                } for rollup in rollups if rollup.get('ratingCount')
             ]
         }
         return response(200, result)
@@ -0,0 +1,339 @@
+import json
+import os
+import re
+import time
+import hashlib
+import boto3
+from collections import OrderedDict
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+feedback_table = dynamodb.Table(os.environ['FEEDBACK_TABLE'])
+sentiment_cache_table = dynamodb.Table(os.environ['SENTIMENT_CACHE_TABLE'])
+daily_stats_table_name = os.environ['FEEDBACK_DAILY_STATS_TABLE']
+sentiment_backend = os.environ.get('SENTIMENT_BACKEND', 'comprehend')
+SENTIMENT_LRU_SIZE = int(os.environ.get('SENTIMENT_LRU_SIZE', '1000'))
+SENTIMENT_CACHE_TTL_DAYS = int(os.environ.get('SENTIMENT_CACHE_TTL_DAYS', '30'))
+
+# Container-lifetime sentiment cache in front of the DynamoDB tier
+sentiment_lru = OrderedDict()
+
+# BatchDetectSentiment accepts at most 25 documents per call, each scored
+# batch is also written back as one transaction (max 100 actions)
+SENTIMENT_BATCH_SIZE = 25
+
+# Comprehend rejects documents over 5000 bytes
+MAX_TEXT_BYTES = 5000
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+def lambda_handler(event, context):
+    """
+    Score the comments of PENDING feedback (SQS, one message per feedback)
+    and write the sentiment back.
+
+    Comments are looked up in the sentiment cache first (in-process LRU,
+    then the DynamoDB tier), keyed by a hash of the normalized text. Only
+    distinct uncached texts are sent to the sentiment client, in batches of
+    up to 25, and the results are written back in batched transactional
+    updates. A result is only written if the feedback is still PENDING
+    with the comment that was scored, and moves the feedback from the
+    pending count to its sentiment's count in the daily stats.
+    """
+    start = time.time()
+    client = get_sentiment_client()
+    failed_message_ids = set()
+    stats = {"memoryHits": 0, "tableHits": 0, "misses": 0}
+
+    # A transaction cannot touch the same item twice, so only the first
+    # message for a feedback is processed in this batch. Later ones (an edited
+    # comment or a redelivery) are reported as failures and retried in a
+    # later batch, SQS does not order them so any of them can be the current one.
+    pending = {}
+    for record in event['Records']:
+        try:
+            message = json.loads(record['body'])
+            if message['feedbackId'] in pending:
+                failed_message_ids.add(record['messageId'])
+                continue
+            pending[message['feedbackId']] = {
+                'messageId': record['messageId'],
+                'feedbackId': message['feedbackId'],
+                'comment': message['comment'],
+                'textHash': comment_hash(message['comment']),
+                'bikeId': message.get('bikeId'),
+                'franchiseId': message.get('franchiseId'),
+                'day': message.get('day')
+            }
+        except (KeyError, ValueError) as e:
+            # Malformed messages would fail forever, drop them
+            print(f"Skipping malformed sentiment message {record.get('messageId')}: {str(e)}")
+    pending = list(pending.values())
+
+    # Resolve each distinct text from the cache tiers
+    sentiments = {}
+    table_lookups = []
+    for text_hash in dict.fromkeys(item['textHash'] for item in pending):
+        if text_hash in sentiment_lru:
+            sentiment_lru.move_to_end(text_hash)
+            sentiments[text_hash] = sentiment_lru[text_hash]
+            stats["memoryHits"] += 1
+        else:
+            table_lookups.append(text_hash)
+    for text_hash, sentiment in get_cached_sentiments(table_lookups).items():
+        remember(text_hash, sentiment)
+        sentiments[text_hash] = sentiment
+        stats["tableHits"] += 1
+
+    # Score the rest, each distinct text once
+    texts = {}
+    for item in pending:
+        if item['textHash'] not in sentiments:
+            texts.setdefault(item['textHash'], item['comment'])
+    misses = list(texts)
+    stats["misses"] = len(misses)
+
+    calls = 0
+    new_entries = {}
+    for chunk_start in range(0, len(misses), SENTIMENT_BATCH_SIZE):
+        chunk = misses[chunk_start:chunk_start + SENTIMENT_BATCH_SIZE]
+        try:
+            results = detect_sentiments(client, [texts[text_hash] for text_hash in chunk])
+            calls += 1
+        except Exception as e:
+            print(f"Sentiment batch failed, retrying {len(chunk)} comments: {str(e)}")
+            continue
+        for text_hash, sentiment in zip(chunk, results):
+            if sentiment is None:
+                # Rejected by the service, keep the old NEUTRAL default but don't cache it
+                sentiments[text_hash] = 'NEUTRAL'
+            else:
+                sentiments[text_hash] = sentiment
+                new_entries[text_hash] = sentiment
+                remember(text_hash, sentiment)
+    put_cached_sentiments(new_entries)
+
+    scored = []
+    for item in pending:
+        if item['textHash'] in sentiments:
+            item['sentiment'] = sentiments[item['textHash']]
+            scored.append(item)
+        else:
+            failed_message_ids.add(item['messageId'])
+
+    for chunk_start in range(0, len(scored), SENTIMENT_BATCH_SIZE):
+        failed_message_ids.update(write_sentiments(scored[chunk_start:chunk_start + SENTIMENT_BATCH_SIZE]))
+
+    elapsed = time.time() - start
+    lookups = sum(stats.values())
+    written = len(scored) - len(failed_message_ids.intersection(item['messageId'] for item in scored))
+    print("Sentiment batch processed:", json.dumps({
+        "messages": len(event['Records']),
+        "scored": written,
+        "failed": len(failed_message_ids),
+        "sentimentCalls": calls,
+        "cache": dict(stats, hitRatio=round((lookups - stats["misses"]) / lookups, 3) if lookups else None),
+        "backend": sentiment_backend,
+        "seconds": round(elapsed, 3),
+        "commentsPerSecond": round(written / elapsed, 1) if elapsed > 0 else None
+    }))
+
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
+
+def detect_sentiments(client, texts):
+    """
+    Sentiment of each text, in order. None for documents the service
+    rejected individually.
+    """
+    text_list = [truncate(text) for text in texts]
+    result = client.batch_detect_sentiment(TextList=text_list, LanguageCode='en')
+
+    sentiments = [None] * len(texts)
+    for entry in result.get('ResultList', []):
+        sentiments[entry['Index']] = entry['Sentiment']
+    for error in result.get('ErrorList', []):
+        print(f"Sentiment failed for document {error['Index']}: {error.get('ErrorMessage')}")
+    return sentiments
+
+def write_sentiments(items):
+    """
+    Write a batch of sentiments in one transaction, moving each feedback
+    from the PENDING count to its sentiment's count in the daily stats.
+    Returns the messageIds that failed and should be retried.
+    """
+    # A transaction cannot touch an item twice, so the daily stats changes
+    # are summed per bike/franchise and day
+    daily_deltas = {}
+    for item in items:
+        for stats_key in stats_keys(item):
+            deltas = daily_deltas.setdefault(stats_key, {})
+            for attribute, delta in sentiment_deltas(item).items():
+                deltas[attribute] = deltas.get(attribute, 0) + delta
+
+    try:
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[{'Update': feedback_sentiment_update(item)} for item in items]
+            + [{'Update': daily_stats_update(stats_id, day, deltas)} for (stats_id, day), deltas in daily_deltas.items()]
+        )
+        return []
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            print(f"Sentiment write batch failed: {str(e)}")
+            return [item['messageId'] for item in items]
+
+    # One stale or deleted feedback cancels the whole transaction, fall back to one transaction per feedback
+    failed = []
+    for item in items:
+        transact_items = [{'Update': feedback_sentiment_update(item)}] + [
+            {'Update': daily_stats_update(stats_id, day, sentiment_deltas(item))}
+            for stats_id, day in stats_keys(item)
+        ]
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            reasons = e.response.get('CancellationReasons', [])
+            if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+                # Feedback deleted, its comment edited or already scored since, nothing to write
+                continue
+            print(f"Sentiment write failed for feedback {item['feedbackId']}: {str(e)}")
+            failed.append(item['messageId'])
+    return failed
+
+def feedback_sentiment_update(item):
+    """Update setting a PENDING feedback's sentiment, if it still has the scored comment"""
+    return {
+        'TableName': feedback_table.name,
+        'Key': {'feedbackId': item['feedbackId']},
+        'UpdateExpression': 'SET sentiment = :sentiment, updatedAt = :now REMOVE pendingSince',
+        'ConditionExpression': 'attribute_exists(feedbackId) AND #C = :comment AND sentiment = :pending',
+        'ExpressionAttributeNames': {'#C': 'comment'},
+        'ExpressionAttributeValues': {
+            ':sentiment': item['sentiment'],
+            ':comment': item['comment'],
+            ':pending': 'PENDING',
+            ':now': datetime.utcnow().isoformat() + 'Z'
+        }
+    }
+
+def stats_keys(item):
+    """(statsId, day) of the bike's and the franchise's daily stats a feedback counts in"""
+    if not item['bikeId'] or not item['day']:
+        # Queued before daily stats were kept
+        return []
+    stats_ids = [f"BIKE#{item['bikeId']}"] + ([f"FRANCHISE#{item['franchiseId']}"] if item['franchiseId'] else [])
+    return [(stats_id, item['day']) for stats_id in stats_ids]
+
+def sentiment_deltas(item):
+    """Move a feedback from the pending count to its sentiment's count"""
+    return {'pending': -1, item['sentiment'].lower(): 1}
+
+def daily_stats_update(stats_id, day, deltas):
+    """
+    Update adding deltas ({attribute: n}) to one day's stats. Must stay in
+    sync with daily_stats_updates in submit_feedback and update_feedback.
+    """
+    expr_attr_names = {}
+    expr_attr_vals = {':now': datetime.utcnow().isoformat() + 'Z'}
+    for i, (attribute, delta) in enumerate(deltas.items()):
+        expr_attr_names[f'#a{i}'] = attribute
+        expr_attr_vals[f':a{i}'] = delta
+    return {
+        'TableName': daily_stats_table_name,
+        'Key': {'statsId': stats_id, 'periodKey': f'DAY#{day}'},
+        'UpdateExpression': 'ADD ' + ', '.join(f'#a{i} :a{i}' for i in range(len(deltas))) + ' SET updatedAt = :now',
+        'ExpressionAttributeNames': expr_attr_names,
+        'ExpressionAttributeValues': expr_attr_vals
+    }
+
+def normalize_comment(text):
+    """
+    Lowercase, drop punctuation and collapse whitespace, so near-identical
+    comments share a cache entry. Must stay in sync with submit_feedback
+    and update_feedback.
+    """
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+def comment_hash(text):
+    """Sentiment cache key of a comment"""
+    return hashlib.sha256(normalize_comment(text).encode('utf-8')).hexdigest()
+
+def remember(text_hash, sentiment):
+    """Add a sentiment to the in-process LRU"""
+    sentiment_lru[text_hash] = sentiment
+    sentiment_lru.move_to_end(text_hash)
+    while len(sentiment_lru) > SENTIMENT_LRU_SIZE:
+        sentiment_lru.popitem(last=False)
+
+def get_cached_sentiments(text_hashes):
+    """Batch-read unexpired sentiments from the DynamoDB cache tier, keyed by hash"""
+    cached = {}
+    now = int(time.time())
+    for start in range(0, len(text_hashes), BATCH_GET_SIZE):
+        request_items = {
+            sentiment_cache_table.name: {
+                'Keys': [{'textHash': text_hash} for text_hash in text_hashes[start:start + BATCH_GET_SIZE]],
+                'ProjectionExpression': 'textHash, sentiment, expiresAt'
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for entry in result.get('Responses', {}).get(sentiment_cache_table.name, []):
+                # TTL deletes lazily, expired entries can still be returned
+                if int(entry.get('expiresAt', 0)) > now:
+                    cached[entry['textHash']] = entry['sentiment']
+            request_items = result.get('UnprocessedKeys')
+    return cached
+
+def put_cached_sentiments(entries):
+    """Store newly scored sentiments in the DynamoDB cache tier"""
+    expires_at = int(time.time()) + SENTIMENT_CACHE_TTL_DAYS * 86400
+    try:
+        with sentiment_cache_table.batch_writer() as batch:
+            for text_hash, sentiment in entries.items():
+                batch.put_item(Item={'textHash': text_hash, 'sentiment': sentiment, 'expiresAt': expires_at})
+    except Exception as e:
+        # The sentiments are still written to the feedback, only future lookups miss
+        print(f"Failed to update sentiment cache: {str(e)}")
+
+def truncate(text):
+    """Cut text to Comprehend's document size limit on a character boundary"""
+    encoded = text.encode('utf-8')
+    if len(encoded) <= MAX_TEXT_BYTES:
+        return text
+    return encoded[:MAX_TEXT_BYTES].decode('utf-8', errors='ignore')
+
+def get_sentiment_client():
+    """Sentiment client for SENTIMENT_BACKEND: comprehend (default) or local"""
+    if sentiment_backend == 'local':
+        return LocalSentimentClient()
+    return boto3.client('comprehend')
+
+class LocalSentimentClient:
+    """
+    Keyword based stand-in with Comprehend's batch_detect_sentiment
+    interface, for local runs and tests without AWS credentials
+    """
+
+    POSITIVE_WORDS = {'good', 'great', 'love', 'excellent', 'smooth', 'fast', 'easy', 'clean', 'amazing', 'comfortable'}
+    NEGATIVE_WORDS = {'bad', 'broken', 'slow', 'dirty', 'terrible', 'flat', 'dead', 'poor', 'awful', 'hate'}
+
+    def batch_detect_sentiment(self, TextList, LanguageCode):
+        if len(TextList) > SENTIMENT_BATCH_SIZE:
+            raise ValueError(f"At most {SENTIMENT_BATCH_SIZE} documents per batch")
+        results = []
+        for index, text in enumerate(TextList):
+            words = set(re.findall(r'[a-z]+', text.lower()))
+            positive = len(words & self.POSITIVE_WORDS)
+            negative = len(words & self.NEGATIVE_WORDS)
+            if positive and negative:
+                sentiment = 'MIXED'
+            elif positive:
+                sentiment = 'POSITIVE'
+            elif negative:
+                sentiment = 'NEGATIVE'
+            else:
+                sentiment = 'NEUTRAL'
+            results.append({'Index': index, 'Sentiment': sentiment})
+        return {'ResultList': results, 'ErrorList': []}
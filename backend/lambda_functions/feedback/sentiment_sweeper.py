@@ -0,0 +1,140 @@
+import json
+import os
+import time
+import boto3
+from boto3.dynamodb.conditions import Key
+from datetime import date, datetime, timedelta
+
+FEEDBACK_TABLE = os.environ['FEEDBACK_TABLE']
+FEEDBACK_DAILY_STATS_TABLE = os.environ['FEEDBACK_DAILY_STATS_TABLE']
+SENTIMENT_QUEUE_URL = os.environ.get('SENTIMENT_QUEUE_URL')
+PENDING_INDEX_NAME = os.environ.get('PENDING_INDEX_NAME', 'sentiment-pendingSince-index')
+SWEEP_AFTER_MINUTES = int(os.environ.get('SWEEP_AFTER_MINUTES', '15'))
+MAX_FEEDBACK_PER_RUN = int(os.environ.get('MAX_FEEDBACK_PER_RUN', '500'))
+
+# SendMessageBatch accepts at most 10 entries per call
+SEND_BATCH_SIZE = 10
+
+dynamodb = boto3.resource('dynamodb')
+feedback_table = dynamodb.Table(FEEDBACK_TABLE)
+daily_stats_table = dynamodb.Table(FEEDBACK_DAILY_STATS_TABLE)
+sqs = boto3.client('sqs')
+
+def lambda_handler(event, context):
+    """
+    Queue sentiment scoring again for feedback that has been PENDING for
+    more than SWEEP_AFTER_MINUTES.
+
+    submit_feedback and update_feedback only log a failed enqueue, and
+    messages the processor gave up on end in the DLQ, either way the
+    feedback would stay PENDING. It stays in the sparse pending index until
+    sentiment_processor scores it, so the next run picks up anything this
+    one could not queue. A feedback that is still queued gets a second
+    message, which the processor skips once the first one is written.
+    """
+    if not SENTIMENT_QUEUE_URL:
+        print("Error: SENTIMENT_QUEUE_URL not configured")
+        return {"statusCode": 500, "body": json.dumps({"error": "SENTIMENT_QUEUE_URL not configured"})}
+
+    try:
+        start = time.time()
+        cutoff = (datetime.utcnow() - timedelta(minutes=SWEEP_AFTER_MINUTES)).isoformat() + "Z"
+        stale = get_stale_pending(cutoff, MAX_FEEDBACK_PER_RUN)
+        enqueued, failed = enqueue_sentiments(stale)
+
+        summary = {
+            "stale": len(stale),
+            "enqueued": enqueued,
+            "failed": failed,
+            "cutoff": cutoff,
+            "seconds": round(time.time() - start, 2)
+        }
+        if len(stale) >= MAX_FEEDBACK_PER_RUN:
+            print(f"Reached MAX_FEEDBACK_PER_RUN ({MAX_FEEDBACK_PER_RUN}), remaining feedback waits for the next run")
+        print("Sentiment sweep complete:", json.dumps(summary))
+        return {"statusCode": 200, "body": json.dumps(summary)}
+
+    except Exception as e:
+        print(f"Error in sentiment_sweeper: {str(e)}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+
+def get_stale_pending(cutoff, limit):
+    """PENDING feedback that entered the pending index before cutoff, oldest first"""
+    query_kwargs = {
+        'IndexName': PENDING_INDEX_NAME,
+        'KeyConditionExpression': Key('sentiment').eq('PENDING') & Key('pendingSince').lt(cutoff),
+        'Limit': limit
+    }
+    feedback = []
+    while len(feedback) < limit:
+        resp = feedback_table.query(**query_kwargs)
+        feedback.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            break
+        query_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+        query_kwargs['Limit'] = limit - len(feedback)
+    return feedback[:limit]
+
+def stats_day(feedback):
+    """
+    Day of the bike's stats the feedback's pending count was added to, or ""
+    for feedback submitted before daily stats were kept (no period of its
+    day exists), as submit_feedback and update_feedback send it.
+    """
+    day = feedback.get('submittedAt', '')[:10]
+    if not day or not feedback.get('bikeId'):
+        return ""
+    for period_key in period_keys(day):
+        item = daily_stats_table.get_item(
+            Key={'statsId': f"BIKE#{feedback['bikeId']}", 'periodKey': period_key},
+            ProjectionExpression='periodKey'
+        ).get('Item')
+        if item:
+            return day
+    return ""
+
+def period_keys(day):
+    """
+    Stats period keys a day's counts can be kept under: the day, then the
+    week and the month compact_feedback_stats folds it into. Must stay in
+    sync with update_feedback.period_keys.
+    """
+    day_date = date.fromisoformat(day)
+    week_start = (day_date - timedelta(days=day_date.weekday())).isoformat()
+    return [f"DAY#{day}", f"WEEK#{week_start}", f"MONTH#{week_start[:7]}"]
+
+def enqueue_sentiments(feedback):
+    """
+    Send sentiment messages (as submit_feedback builds them) in batches,
+    returning (enqueued, failed) counts
+    """
+    enqueued = 0
+    failed = 0
+    for start in range(0, len(feedback), SEND_BATCH_SIZE):
+        batch = feedback[start:start + SEND_BATCH_SIZE]
+        entries = [
+            {
+                'Id': str(i),
+                'MessageBody': json.dumps({
+                    'feedbackId': item['feedbackId'],
+                    'comment': item.get('comment', ''),
+                    'bikeId': item.get('bikeId'),
+                    'franchiseId': item.get('franchiseId'),
+                    'day': stats_day(item)
+                })
+            }
+            for i, item in enumerate(batch)
+        ]
+        try:
+            resp = sqs.send_message_batch(QueueUrl=SENTIMENT_QUEUE_URL, Entries=entries)
+            enqueued += len(resp.get('Successful', []))
+            for failure in resp.get('Failed', []):
+                failed += 1
+                print(f"Failed to queue sentiment for {batch[int(failure['Id'])]['feedbackId']}: {failure.get('Message')}")
+        except Exception as e:
+            # The feedback stays in the pending index, the next run picks it up again
+            failed += len(batch)
+            print(f"Failed to send sentiment batch: {str(e)}")
+    return enqueued, failed
@@ -1,14 +1,28 @@
 import json
 import os
+import re
+import time
+import hashlib
 import boto3
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 feedback_table = dynamodb.Table(os.environ['FEEDBACK_TABLE'])
 bikes_table = dynamodb.Table(os.environ['BIKES_TABLE'])
-comprehend = boto3.client('comprehend')
+rating_rollups_table_name = os.environ['RATING_ROLLUPS_TABLE']
+daily_stats_table_name = os.environ['FEEDBACK_DAILY_STATS_TABLE']
+sentiment_cache_table = dynamodb.Table(os.environ['SENTIMENT_CACHE_TABLE'])
+sentiment_queue_url = os.environ.get('SENTIMENT_QUEUE_URL')
+SENTIMENT_LRU_SIZE = int(os.environ.get('SENTIMENT_LRU_SIZE', '1000'))
+sqs = boto3.client('sqs')
+
+# Container-lifetime sentiment cache in front of the DynamoDB tier
+sentiment_lru = OrderedDict()
+cache_stats = {"memoryHits": 0, "tableHits": 0, "misses": 0}
+
 def lambda_handler(event, context):
     try:
         # Auth: Cognito customer only
@@ -29,6 +43,14 @@ def lambda_handler(event, context):
         if not all([bike_id, rating]):
             return response(400, {"error": "Missing required fields: bikeId, rating"})
 
+        # Ratings are 1-5 stars, the bike's rollup keeps a histogram per star
+        try:
+            rating = Decimal(str(rating))
+        except Exception:
+            return response(400, {"error": "rating must be a number between 1 and 5"})
+        if not 1 <= rating <= 5:
+            return response(400, {"error": "rating must be a number between 1 and 5"})
+
         # Fetch bike info
         bike_resp = bikes_table.get_item(Key={"bikeId": bike_id})
         bike = bike_resp.get("Item")
@@ -36,10 +58,11 @@ def lambda_handler(event, context):
             return response(404, {"error": "Bike not found"})
         
         bike_type = bike.get("type")
+        franchise_id = bike.get("franchiseId")
 
-        # Optionally: perform sentiment analysis on comment (placeholder)
-        # sentiment = analyze_sentiment(comment)
-        sentiment_data = analyze_sentiment(comment)
+        # Cached comments are resolved here, the rest is scored asynchronously by sentiment_processor
+        sentiment = comment_sentiment(comment)
+        log_cache_stats()
 
         feedback_id = str(uuid.uuid4())
         submitted_at = datetime.utcnow().isoformat() + "Z"
@@ -49,56 +72,169 @@ def lambda_handler(event, context):
             "bikeId": bike_id,
             "userId": user_id,
             "username": username,
-            "rating": Decimal(str(rating)),
+            "rating": rating,
             "comment": comment,
             "bikeType": bike_type,
             "submittedAt": submitted_at,
-            "sentiment": sentiment_data["sentiment"]
+            "sentiment": sentiment
         }
+        # Denormalized so franchise views do not have to look up every bike
+        if franchise_id:
+            item["franchiseId"] = franchise_id
+        # Keeps the feedback in the sentiment sweeper's index until it is scored
+        if sentiment == "PENDING":
+            item["pendingSince"] = submitted_at
         
-        feedback_table.put_item(Item=item)
+        # Store the feedback and add it to the bike's rating rollup and the
+        # bike's/franchise's stats for the day in one transaction
+        daily_updates = daily_stats_updates(bike_id, franchise_id, submitted_at[:10], {
+            "ratingCount": 1,
+            "ratingSum": rating,
+            star_bucket(rating): 1,
+            sentiment.lower(): 1
+        })
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {"Put": {"TableName": feedback_table.name, "Item": item}},
+                {"Update": rollup_update(bike_id, franchise_id, rating, 1)}
+            ] + [{"Update": update} for update in daily_updates]
+        )
+        
+        if sentiment == "PENDING":
+            enqueue_sentiment(item, comment)
         
         return response(201, {
             "message": "Feedback submitted successfully", 
             "feedbackId": feedback_id,
             "userId": user_id,
             "bikeId": bike_id,
-            "sentiment": sentiment_data["sentiment"]
+            "sentiment": sentiment
         })
         
     except Exception as e:
         return response(500, {"error": str(e)})
-def analyze_sentiment(text):
+def rollup_update(bike_id, franchise_id, rating, direction):
     """
-    Analyze sentiment of the given text using AWS Comprehend
-    Returns only sentiment (POSITIVE, NEGATIVE, NEUTRAL, MIXED)
+    Update that adds (direction=1) or removes (direction=-1) a rating from a
+    bike's rollup: count, rating sum and the count for its star bucket.
+    The rollup carries the bike's franchiseId for the franchise index.
+    Must stay in sync with update_feedback.rollup_update.
+    """
+    update = {
+        "TableName": rating_rollups_table_name,
+        "Key": {"bikeId": bike_id},
+        "UpdateExpression": "ADD ratingCount :count, ratingSum :sum, #bucket :count SET updatedAt = :now",
+        "ExpressionAttributeNames": {"#bucket": star_bucket(rating)},
+        "ExpressionAttributeValues": {
+            ":count": direction,
+            ":sum": rating * direction,
+            ":now": datetime.utcnow().isoformat() + "Z"
+        }
+    }
+    if franchise_id:
+        update["UpdateExpression"] += ", franchiseId = :franchiseId"
+        update["ExpressionAttributeValues"][":franchiseId"] = franchise_id
+    return update
+
+def daily_stats_updates(bike_id, franchise_id, day, deltas):
+    """
+    Updates adding deltas ({attribute: n}) to the bike's and the franchise's
+    stats for a day. Must stay in sync with update_feedback and
+    sentiment_processor.
+    """
+    deltas = {attribute: delta for attribute, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+    
+    expr_attr_names = {}
+    expr_attr_vals = {":now": datetime.utcnow().isoformat() + "Z"}
+    for i, (attribute, delta) in enumerate(deltas.items()):
+        expr_attr_names[f"#a{i}"] = attribute
+        expr_attr_vals[f":a{i}"] = delta
+    update_expr = "ADD " + ", ".join(f"#a{i} :a{i}" for i in range(len(deltas))) + " SET updatedAt = :now"
+    
+    stats_ids = [f"BIKE#{bike_id}"] + ([f"FRANCHISE#{franchise_id}"] if franchise_id else [])
+    return [
+        {
+            "TableName": daily_stats_table_name,
+            "Key": {"statsId": stats_id, "periodKey": f"DAY#{day}"},
+            "UpdateExpression": update_expr,
+            "ExpressionAttributeNames": expr_attr_names,
+            "ExpressionAttributeValues": expr_attr_vals
+        }
+        for stats_id in stats_ids
+    ]
+
+def star_bucket(rating):
+    """Histogram attribute for a rating, e.g. 4.5 -> stars5"""
+    return f"stars{min(max(int(rating + Decimal('0.5')), 1), 5)}"
+
+def normalize_comment(text):
     """
+    Lowercase, drop punctuation and collapse whitespace, so near-identical
+    comments share a cache entry. Must stay in sync with sentiment_processor.
+    """
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+def comment_sentiment(comment):
+    """
+    Sentiment for a comment without calling the sentiment service: NEUTRAL
+    for empty comments, a cached result, or PENDING (must be enqueued)
+    """
+    normalized = normalize_comment(comment or "")
+    if not normalized:
+        return "NEUTRAL"
+    text_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    if text_hash in sentiment_lru:
+        sentiment_lru.move_to_end(text_hash)
+        cache_stats["memoryHits"] += 1
+        return sentiment_lru[text_hash]
+    
     try:
-        # Skip sentiment analysis if comment is empty
-        if not text or text.strip() == "":
-            return {
-                "sentiment": "NEUTRAL"
-            }
-        
-        # Call AWS Comprehend to detect sentiment
-        response = comprehend.detect_sentiment(
-            Text=text,
-            LanguageCode='en'  # Assuming English text
+        entry = sentiment_cache_table.get_item(Key={"textHash": text_hash}).get("Item")
+    except Exception as e:
+        print(f"Sentiment cache lookup failed: {str(e)}")
+        entry = None
+    # TTL deletes lazily, expired entries can still be returned
+    if entry and int(entry.get("expiresAt", 0)) > time.time():
+        sentiment_lru[text_hash] = entry["sentiment"]
+        while len(sentiment_lru) > SENTIMENT_LRU_SIZE:
+            sentiment_lru.popitem(last=False)
+        cache_stats["tableHits"] += 1
+        return entry["sentiment"]
+    
+    cache_stats["misses"] += 1
+    return "PENDING"
+
+def log_cache_stats():
+    """Log the container's sentiment cache hit ratio so far"""
+    lookups = sum(cache_stats.values())
+    hit_ratio = round((lookups - cache_stats["misses"]) / lookups, 3) if lookups else None
+    print("Sentiment cache:", json.dumps(dict(cache_stats, hitRatio=hit_ratio)))
+
+def enqueue_sentiment(feedback, comment):
+    """Queue a comment for sentiment scoring, the feedback stays PENDING until then"""
+    feedback_id = feedback["feedbackId"]
+    try:
+        if not sentiment_queue_url:
+            print("Warning: SENTIMENT_QUEUE_URL not configured")
+            return
+        sqs.send_message(
+            QueueUrl=sentiment_queue_url,
+            MessageBody=json.dumps({
+                "feedbackId": feedback_id,
+                "comment": comment,
+                # Where the sentiment processor moves the feedback out of the PENDING count
+                "bikeId": feedback.get("bikeId"),
+                "franchiseId": feedback.get("franchiseId"),
+                "day": feedback.get("submittedAt", "")[:10]
+            })
         )
-        
-        # Extract only sentiment, ignore scores
-        sentiment = response['Sentiment']
-        
-        return {
-            "sentiment": sentiment
-        }
-        
     except Exception as e:
-        # If sentiment analysis fails, default to NEUTRAL
-        print(f"Sentiment analysis failed: {str(e)}")
-        return {
-            "sentiment": "NEUTRAL"
-        }
+        # Don't fail the submission, the feedback is already stored and the
+        # sentiment sweeper queues it again
+        print(f"Warning: Failed to queue sentiment analysis for {feedback_id}: {str(e)}")
 
 def response(status, body):
     return {
@@ -1,10 +1,26 @@
 import json
 import os
+import re
+import time
+import hashlib
 import boto3
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb')
 feedback_table = dynamodb.Table(os.environ['FEEDBACK_TABLE'])
+rating_rollups_table_name = os.environ['RATING_ROLLUPS_TABLE']
+daily_stats_table_name = os.environ['FEEDBACK_DAILY_STATS_TABLE']
+sentiment_cache_table = dynamodb.Table(os.environ['SENTIMENT_CACHE_TABLE'])
+sentiment_queue_url = os.environ.get('SENTIMENT_QUEUE_URL')
+SENTIMENT_LRU_SIZE = int(os.environ.get('SENTIMENT_LRU_SIZE', '1000'))
+sqs = boto3.client('sqs')
+
+# Container-lifetime sentiment cache in front of the DynamoDB tier
+sentiment_lru = OrderedDict()
+cache_stats = {"memoryHits": 0, "tableHits": 0, "misses": 0}
 
 def lambda_handler(event, context):
     try:
@@ -54,27 +70,99 @@ def lambda_handler(event, context):
         expr_attr_names = {}
         
         if rating is not None:
+            try:
+                rating = Decimal(str(rating))
+            except Exception:
+                return response(400, {"error": "rating must be a number between 1 and 5"})
+            if not 1 <= rating <= 5:
+                return response(400, {"error": "rating must be a number between 1 and 5"})
             update_expr.append("#R = :r")
-            expr_attr_vals[":r"] = Decimal(str(rating))
+            expr_attr_vals[":r"] = rating
             expr_attr_names["#R"] = "rating"
         
+        sentiment = None
         if comment is not None:
             update_expr.append("#C = :c")
             expr_attr_vals[":c"] = comment
             expr_attr_names["#C"] = "comment"
+            # Re-score edited comments, from the cache or asynchronously
+            if comment != feedback.get("comment"):
+                sentiment = comment_sentiment(comment)
+                log_cache_stats()
+                update_expr.append("#S = :s")
+                expr_attr_vals[":s"] = sentiment
+                expr_attr_names["#S"] = "sentiment"
+                # Keeps the feedback in the sentiment sweeper's index until it is scored
+                if sentiment == "PENDING":
+                    update_expr.append("#P = :u")
+                    expr_attr_names["#P"] = "pendingSince"
         
-        # Add updated timestamp
+        # Add updated timestamp, the incremental analytics export watermarks on it
         update_expr.append("#U = :u")
-        expr_attr_vals[":u"] = "updated"
+        expr_attr_vals[":u"] = datetime.utcnow().isoformat() + "Z"
         expr_attr_names["#U"] = "updatedAt"
         
-        # Update the feedback
-        feedback_table.update_item(
-            Key={"feedbackId": feedback_id},
-            UpdateExpression="SET " + ", ".join(update_expr),
-            ExpressionAttributeValues=expr_attr_vals,
-            ExpressionAttributeNames=expr_attr_names
-        )
+        remove_expr = ""
+        if sentiment is not None and sentiment != "PENDING":
+            remove_expr = " REMOVE pendingSince"
+        
+        feedback_update = {
+            "TableName": feedback_table.name,
+            "Key": {"feedbackId": feedback_id},
+            "UpdateExpression": "SET " + ", ".join(update_expr) + remove_expr,
+            "ExpressionAttributeValues": expr_attr_vals,
+            "ExpressionAttributeNames": expr_attr_names
+        }
+        
+        # Changes to the bike's rollup and the daily stats of the day the feedback was submitted
+        rollup_updates = []
+        daily_deltas = {}
+        conditions = []
+        
+        old_rating = feedback.get("rating")
+        if rating is not None and old_rating is not None and rating != old_rating:
+            rollup_updates.append(rollup_update(feedback["bikeId"], feedback.get("franchiseId"), old_rating, rating))
+            add_delta(daily_deltas, "ratingSum", rating - old_rating)
+            add_delta(daily_deltas, star_bucket(old_rating), -1)
+            add_delta(daily_deltas, star_bucket(rating), 1)
+            conditions.append("#R = :oldRating")
+            expr_attr_vals[":oldRating"] = old_rating
+        
+        old_sentiment = feedback.get("sentiment")
+        if sentiment is not None and sentiment != old_sentiment:
+            if old_sentiment:
+                add_delta(daily_deltas, old_sentiment.lower(), -1)
+                conditions.append("#S = :oldSentiment")
+                expr_attr_vals[":oldSentiment"] = old_sentiment
+            else:
+                conditions.append("attribute_not_exists(#S)")
+            add_delta(daily_deltas, sentiment.lower(), 1)
+        
+        if conditions:
+            # Only apply the deltas if the feedback still has the values they were computed from
+            feedback_update["ConditionExpression"] = " AND ".join(conditions)
+        
+        day = feedback.get("submittedAt", "")[:10]
+        stats_updates = daily_stats_updates(feedback["bikeId"], feedback.get("franchiseId"), day, daily_deltas) if day else []
+        
+        if rollup_updates or stats_updates:
+            stats_written = write_feedback_update(feedback_update, rollup_updates, stats_updates)
+            if stats_written is None:
+                return response(409, {"error": "Feedback was modified by another update, please retry"})
+            # Feedback submitted before daily stats were kept has no day to adjust
+            if stats_updates and not any(update["Key"]["statsId"].startswith("BIKE#") for update in stats_written):
+                day = ""
+        else:
+            # Update the feedback, the rollups and stats are unaffected
+            try:
+                feedback_table.update_item(**{k: v for k, v in feedback_update.items() if k != "TableName"})
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                return response(409, {"error": "Feedback was modified by another update, please retry"})
+        
+        if sentiment == "PENDING":
+            enqueue_sentiment(feedback, comment, day)
         
         # Get updated feedback
         updated_response = feedback_table.get_item(Key={"feedbackId": feedback_id})
@@ -94,6 +182,193 @@ def lambda_handler(event, context):
         print("Traceback:", traceback.format_exc())
         return response(500, {"error": str(e)})
 
+def rollup_update(bike_id, franchise_id, old_rating, new_rating):
+    """
+    Update that replaces old_rating with new_rating in a bike's rollup.
+    Must stay in sync with submit_feedback.rollup_update.
+    """
+    update_expr = "ADD ratingSum :delta"
+    expr_attr_names = {}
+    expr_attr_vals = {
+        ":delta": new_rating - old_rating,
+        ":now": datetime.utcnow().isoformat() + "Z"
+    }
+    
+    old_bucket = star_bucket(old_rating)
+    new_bucket = star_bucket(new_rating)
+    if old_bucket != new_bucket:
+        update_expr += ", #oldBucket :minusOne, #newBucket :one"
+        expr_attr_names = {"#oldBucket": old_bucket, "#newBucket": new_bucket}
+        expr_attr_vals[":minusOne"] = -1
+        expr_attr_vals[":one"] = 1
+    
+    set_expr = " SET updatedAt = :now"
+    if franchise_id:
+        set_expr += ", franchiseId = :franchiseId"
+        expr_attr_vals[":franchiseId"] = franchise_id
+    
+    update = {
+        "TableName": rating_rollups_table_name,
+        "Key": {"bikeId": bike_id},
+        "UpdateExpression": update_expr + set_expr,
+        "ExpressionAttributeValues": expr_attr_vals
+    }
+    if expr_attr_names:
+        update["ExpressionAttributeNames"] = expr_attr_names
+    return update
+
+def daily_stats_updates(bike_id, franchise_id, day, deltas):
+    """
+    Updates adding deltas ({attribute: n}) to the bike's and the franchise's
+    stats for a day. Must stay in sync with submit_feedback and
+    sentiment_processor.
+    """
+    deltas = {attribute: delta for attribute, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+    
+    expr_attr_names = {}
+    expr_attr_vals = {":now": datetime.utcnow().isoformat() + "Z"}
+    for i, (attribute, delta) in enumerate(deltas.items()):
+        expr_attr_names[f"#a{i}"] = attribute
+        expr_attr_vals[f":a{i}"] = delta
+    update_expr = "ADD " + ", ".join(f"#a{i} :a{i}" for i in range(len(deltas))) + " SET updatedAt = :now"
+    
+    stats_ids = [f"BIKE#{bike_id}"] + ([f"FRANCHISE#{franchise_id}"] if franchise_id else [])
+    return [
+        {
+            "TableName": daily_stats_table_name,
+            "Key": {"statsId": stats_id, "periodKey": f"DAY#{day}"},
+            "UpdateExpression": update_expr,
+            "ExpressionAttributeNames": expr_attr_names,
+            "ExpressionAttributeValues": expr_attr_vals
+        }
+        for stats_id in stats_ids
+    ]
+
+def write_feedback_update(feedback_update, rollup_updates, stats_updates):
+    """
+    Write the feedback update, its rollup updates and its daily stats updates
+    in one transaction. Stats updates only adjust existing items: a day that
+    compact_feedback_stats has folded away is adjusted in the week or month
+    it was folded into, and a day that was never kept (feedback older than
+    the daily stats) is left alone. Returns the stats updates written, or
+    None if the feedback was modified since it was read.
+    """
+    # Each stats update with the period keys it can still be applied to, finest first
+    pending_stats = [(update, period_keys(update["Key"]["periodKey"].split("#", 1)[1])) for update in stats_updates]
+    while True:
+        stats = [
+            dict(update, Key=dict(update["Key"], periodKey=keys[0]), ConditionExpression="attribute_exists(periodKey)")
+            for update, keys in pending_stats
+        ]
+        try:
+            dynamodb.meta.client.transact_write_items(
+                TransactItems=[{"Update": feedback_update}] + [{"Update": update} for update in rollup_updates + stats]
+            )
+            return stats
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response.get("CancellationReasons", [])
+        
+        stats_reasons = reasons[1 + len(rollup_updates):]
+        missing = {i for i, reason in enumerate(stats_reasons) if reason.get("Code") == "ConditionalCheckFailed"}
+        if not missing or reasons[0].get("Code") == "ConditionalCheckFailed":
+            # The feedback changed, or another transaction touched the same items
+            return None
+        # Retry with the missing periods moved to their next coarser period
+        pending_stats = [
+            (update, keys[1:] if i in missing else keys)
+            for i, (update, keys) in enumerate(pending_stats)
+        ]
+        pending_stats = [(update, keys) for update, keys in pending_stats if keys]
+
+def period_keys(day):
+    """
+    Stats period keys a day's counts can be kept under: the day, then the
+    week and the month compact_feedback_stats folds it into. Must stay in
+    sync with compact_feedback_stats.week_key and month_key, and with
+    sentiment_sweeper.
+    """
+    day_date = date.fromisoformat(day)
+    week_start = (day_date - timedelta(days=day_date.weekday())).isoformat()
+    return [f"DAY#{day}", f"WEEK#{week_start}", f"MONTH#{week_start[:7]}"]
+
+def add_delta(deltas, attribute, delta):
+    deltas[attribute] = deltas.get(attribute, 0) + delta
+
+def star_bucket(rating):
+    """Histogram attribute for a rating, e.g. 4.5 -> stars5"""
+    return f"stars{min(max(int(rating + Decimal('0.5')), 1), 5)}"
+
+def normalize_comment(text):
+    """
+    Lowercase, drop punctuation and collapse whitespace, so near-identical
+    comments share a cache entry. Must stay in sync with sentiment_processor.
+    """
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+def comment_sentiment(comment):
+    """
+    Sentiment for a comment without calling the sentiment service: NEUTRAL
+    for empty comments, a cached result, or PENDING (must be enqueued)
+    """
+    normalized = normalize_comment(comment or "")
+    if not normalized:
+        return "NEUTRAL"
+    text_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    if text_hash in sentiment_lru:
+        sentiment_lru.move_to_end(text_hash)
+        cache_stats["memoryHits"] += 1
+        return sentiment_lru[text_hash]
+    
+    try:
+        entry = sentiment_cache_table.get_item(Key={"textHash": text_hash}).get("Item")
+    except Exception as e:
+        print(f"Sentiment cache lookup failed: {str(e)}")
+        entry = None
+    # TTL deletes lazily, expired entries can still be returned
+    if entry and int(entry.get("expiresAt", 0)) > time.time():
+        sentiment_lru[text_hash] = entry["sentiment"]
+        while len(sentiment_lru) > SENTIMENT_LRU_SIZE:
+            sentiment_lru.popitem(last=False)
+        cache_stats["tableHits"] += 1
+        return entry["sentiment"]
+    
+    cache_stats["misses"] += 1
+    return "PENDING"
+
+def log_cache_stats():
+    """Log the container's sentiment cache hit ratio so far"""
+    lookups = sum(cache_stats.values())
+    hit_ratio = round((lookups - cache_stats["misses"]) / lookups, 3) if lookups else None
+    print("Sentiment cache:", json.dumps(dict(cache_stats, hitRatio=hit_ratio)))
+
+def enqueue_sentiment(feedback, comment, day):
+    """Queue a comment for sentiment scoring, the feedback stays PENDING until then"""
+    feedback_id = feedback["feedbackId"]
+    try:
+        if not sentiment_queue_url:
+            print("Warning: SENTIMENT_QUEUE_URL not configured")
+            return
+        sqs.send_message(
+            QueueUrl=sentiment_queue_url,
+            MessageBody=json.dumps({
+                "feedbackId": feedback_id,
+                "comment": comment,
+                # Where the sentiment processor moves the feedback out of the PENDING count
+                "bikeId": feedback.get("bikeId"),
+                "franchiseId": feedback.get("franchiseId"),
+                "day": day
+            })
+        )
+    except Exception as e:
+        # Don't fail the update, the feedback is already stored and the
+        # sentiment sweeper queues it again
+        print(f"Warning: Failed to queue sentiment analysis for {feedback_id}: {str(e)}")
+
 def convert_decimal(obj):
     """Convert Decimal objects to int/float for JSON serialization"""
     if isinstance(obj, list):
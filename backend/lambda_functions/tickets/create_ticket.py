@@ -2,12 +2,21 @@ import json
 import os
 import boto3
 import uuid
+import time
 from datetime import datetime
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 sns = boto3.client('sns')
 tickets_table = dynamodb.Table(os.environ.get('TICKETS_TABLE', 'tickets-table-dev'))
+ticket_events_table_name = os.environ.get('TICKET_EVENTS_TABLE', 'ticket-events-dev')
+
+# Seconds a ticket may stay in each status before the SLA scheduler picks it up
+SLA_SECONDS = {
+    "open": {"low": 3600, "medium": 1800, "high": 900},
+    "assigned": {"low": 86400, "medium": 14400, "high": 3600},
+    "in_progress": {"low": 259200, "medium": 86400, "high": 14400}
+}
 
 def lambda_handler(event, context):
     try:
@@ -58,11 +67,33 @@ def lambda_handler(event, context):
             "bookingReference": booking_reference,
             "status": "open",
             "createdAt": datetime.utcnow().isoformat(),
-            "updatedAt": datetime.utcnow().isoformat()
+            "updatedAt": datetime.utcnow().isoformat(),
+            # SLA deadline (epoch seconds) and the per-status budgets later updates restart it from
+            "slaDueAt": int(time.time()) + SLA_SECONDS["open"][priority],
+            "slaAssignedSeconds": SLA_SECONDS["assigned"][priority],
+            "slaInProgressSeconds": SLA_SECONDS["in_progress"][priority]
+        }
+
+        # First entry of the ticket's history
+        created_event = {
+            "ticketId": ticket_id,
+            "eventKey": f"EVENT#{datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')}#{uuid.uuid4().hex[:8]}",
+            "eventType": "CREATED",
+            "toStatus": "open",
+            "changedBy": user_id,
+            "changedByType": user_type,
+            "changedAt": ticket_item["createdAt"],
+            "priority": priority,
+            "category": category
         }
 
-        # Put item in DynamoDB
-        tickets_table.put_item(Item=ticket_item)
+        # Put ticket and its history event in DynamoDB in one transaction
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {"Put": {"TableName": tickets_table.name, "Item": ticket_item}},
+                {"Put": {"TableName": ticket_events_table_name, "Item": created_event}}
+            ]
+        )
 
         # Publish message to SNS for ticket assignment
         try:
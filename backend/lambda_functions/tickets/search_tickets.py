@@ -0,0 +1,334 @@
+import json
+import boto3
+import os
+import re
+import math
+import heapq
+import base64
+import logging
+from boto3.dynamodb.conditions import Key
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+
+# Environment variables
+TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
+SEARCH_INDEX_TABLE = os.environ.get('SEARCH_INDEX_TABLE', 'ticket-search-index-dev')
+MAX_CANDIDATES = int(os.environ.get('MAX_CANDIDATES', '10000'))
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has',
+    'have', 'i', 'in', 'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'so', 'that',
+    'the', 'this', 'to', 'was', 'we', 'were', 'with', 'you', 'your'
+}
+
+# Special items sharing the index table with the posting lists (see ticket_indexer)
+DF_SORT_KEY = '#DF'
+GLOBAL_STATS_KEY = {'term': '#GLOBAL', 'ticketId': '#STATS'}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+# Ticket fields returned with each search hit
+RESULT_FIELDS = [
+    'ticketId', 'subject', 'status', 'priority', 'category', 'bikeId',
+    'bookingReference', 'assignedTo', 'createdAt', 'updatedAt'
+]
+
+def lambda_handler(event, context):
+    """
+    Ranked full-text search over tickets (admin only)
+    """
+    try:
+        # Get user info from JWT
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+        user_id = claims.get("sub")
+        user_type = claims.get("custom:userType", "")
+
+        if not user_id:
+            return response(401, {'error': 'Authentication required'})
+
+        # Only admins can search all tickets
+        if user_type.upper() != 'ADMIN':
+            return response(403, {
+                'error': 'FORBIDDEN',
+                'message': 'Admin access required'
+            })
+
+        # Parse query parameters
+        query_params = event.get('queryStringParameters') or {}
+        query = (query_params.get('q') or '').strip()
+        try:
+            limit = min(int(query_params.get('limit', 20)), 100)  # Max 100 items
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            return response(400, {
+                'error': 'INVALID_LIMIT',
+                'message': 'limit must be a positive integer'
+            })
+
+        if not query:
+            return response(400, {
+                'error': 'QUERY_REQUIRED',
+                'message': 'Query parameter q is required'
+            })
+
+        try:
+            offset = decode_next_token(query_params.get('nextToken'))
+        except ValueError:
+            return response(400, {
+                'error': 'INVALID_NEXT_TOKEN',
+                'message': 'nextToken is invalid'
+            })
+
+        query_terms = query_tokens(query)
+        if not query_terms:
+            return response(200, {'tickets': [], 'count': 0, 'total': 0, 'nextToken': None})
+
+        ranked, truncated = search(DynamoDBPostingStore(), query_terms, MAX_CANDIDATES)
+
+        page = ranked[offset:offset + limit]
+        tickets = fetch_tickets([ticket_id for ticket_id, _ in page])
+        results = []
+        for ticket_id, score in page:
+            if ticket_id in tickets:
+                ticket = tickets[ticket_id]
+                ticket['score'] = round(score, 4)
+                results.append(ticket)
+
+        next_offset = offset + limit
+        return response(200, {
+            'tickets': results,
+            'count': len(results),
+            'total': len(ranked),
+            'truncated': truncated,
+            'nextToken': encode_next_token(next_offset) if next_offset < len(ranked) else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error searching tickets: {str(e)}")
+        return response(500, {
+            'error': 'INTERNAL_SERVER_ERROR',
+            'message': 'An unexpected error occurred'
+        })
+
+def tokenize(text):
+    """
+    Split text into index terms.
+
+    Must stay in sync with ticket_indexer.tokenize.
+    """
+    terms = []
+    for token in re.findall(r'[a-z0-9]+', str(text).lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        # Light plural folding so "brakes" matches "brake"
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+def query_tokens(query):
+    """
+    Get the distinct terms of a search query.
+
+    Words with punctuation (booking references, bike IDs) are also looked up
+    as exact identifier tokens, so they are not split into common fragments.
+    """
+    terms = []
+    for word in query.lower().split():
+        if re.search(r'[^a-z0-9]', word) and len(word) > 2:
+            terms.append(word)
+        else:
+            terms.extend(tokenize(word))
+    return list(dict.fromkeys(terms))
+
+def search(store, query_terms, max_candidates):
+    """
+    Rank tickets containing all query terms with BM25.
+
+    Terms are evaluated rarest first: the rarest term's posting list is the
+    candidate set and every other term is only looked up for the remaining
+    candidates, so a common word never has its whole posting list read.
+    When the rarest term matches more than max_candidates tickets, the
+    candidates kept are the ones it scores highest (truncated is True).
+    Returns ([(ticketId, score)], truncated).
+    """
+    stats = store.get_term_stats(query_terms)
+
+    # Words that looked like identifiers but are not indexed as one (e.g.
+    # "front-brake") fall back to their individual terms
+    fallback_terms = [
+        term for term in query_terms
+        if stats['df'].get(term, 0) <= 0 and re.search(r'[^a-z0-9]', term)
+    ]
+    if fallback_terms:
+        query_terms = [term for term in query_terms if term not in fallback_terms]
+        for term in fallback_terms:
+            query_terms.extend(fragment for fragment in tokenize(term) if fragment not in query_terms)
+        if not query_terms:
+            return [], False
+        stats = store.get_term_stats(query_terms)
+
+    doc_count = max(int(stats['docCount']), 1)
+    avg_length = max(float(stats['totalLength']) / doc_count, 1.0)
+    document_frequencies = stats['df']
+
+    # A term nobody used means no ticket can match all terms
+    if any(document_frequencies.get(term, 0) <= 0 for term in query_terms):
+        return [], False
+
+    ordered_terms = sorted(query_terms, key=lambda term: document_frequencies[term])
+
+    # Min-heap of the best (score, ticketId) candidates so far
+    candidates = []
+    matched = 0
+    for ticket_id, (tf, dl) in store.iter_postings(ordered_terms[0]):
+        matched += 1
+        candidate = (bm25(ordered_terms[0], tf, dl, document_frequencies, doc_count, avg_length), ticket_id)
+        if len(candidates) < max_candidates:
+            heapq.heappush(candidates, candidate)
+        elif candidate > candidates[0]:
+            heapq.heapreplace(candidates, candidate)
+    truncated = matched > max_candidates
+    scores = {ticket_id: score for score, ticket_id in candidates}
+
+    for term in ordered_terms[1:]:
+        if not scores:
+            break
+        postings = store.get_postings_for(term, list(scores))
+        next_scores = {}
+        for ticket_id, (tf, dl) in postings.items():
+            next_scores[ticket_id] = scores[ticket_id] + bm25(term, tf, dl, document_frequencies, doc_count, avg_length)
+        scores = next_scores
+
+    ranked = sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
+    return ranked, truncated
+
+def bm25(term, tf, dl, document_frequencies, doc_count, avg_length):
+    """
+    BM25 contribution of one term to a ticket's score
+    """
+    df = document_frequencies[term]
+    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+    tf = float(tf)
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * float(dl) / avg_length))
+
+class DynamoDBPostingStore:
+    """
+    Reads posting lists and term statistics from the search index table
+    """
+
+    def __init__(self):
+        self.table = dynamodb.Table(SEARCH_INDEX_TABLE)
+
+    def get_term_stats(self, terms):
+        keys = [{'term': term, 'ticketId': DF_SORT_KEY} for term in terms] + [GLOBAL_STATS_KEY]
+        items = batch_get(SEARCH_INDEX_TABLE, keys)
+
+        stats = {'docCount': 0, 'totalLength': 0, 'df': {}}
+        for item in items:
+            if item['term'] == GLOBAL_STATS_KEY['term']:
+                stats['docCount'] = item.get('docCount', 0)
+                stats['totalLength'] = item.get('totalLength', 0)
+            else:
+                stats['df'][item['term']] = int(item.get('df', 0))
+        return stats
+
+    def iter_postings(self, term):
+        """(ticketId, (tf, dl)) of every ticket containing term, a query page at a time"""
+        query_kwargs = {
+            'KeyConditionExpression': Key('term').eq(term),
+            'ProjectionExpression': 'ticketId, tf, dl'
+        }
+        while True:
+            result = self.table.query(**query_kwargs)
+            for item in result.get('Items', []):
+                # Skip the term's document frequency item
+                if item['ticketId'].startswith('#'):
+                    continue
+                yield item['ticketId'], (item['tf'], item['dl'])
+
+            if 'LastEvaluatedKey' not in result:
+                return
+            query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    def get_postings_for(self, term, ticket_ids):
+        keys = [{'term': term, 'ticketId': ticket_id} for ticket_id in ticket_ids]
+        items = batch_get(SEARCH_INDEX_TABLE, keys, 'ticketId, tf, dl')
+        return {item['ticketId']: (item['tf'], item['dl']) for item in items}
+
+def batch_get(table_name, keys, projection=None, expression_names=None):
+    """
+    BatchGetItem in chunks of 100, retrying unprocessed keys
+    """
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {'Keys': keys[start:start + BATCH_GET_SIZE]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        if expression_names:
+            request['ExpressionAttributeNames'] = expression_names
+        request_items = {table_name: request}
+
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(result.get('Responses', {}).get(table_name, []))
+            request_items = result.get('UnprocessedKeys')
+    return items
+
+def fetch_tickets(ticket_ids):
+    """
+    Get the result fields of a page of tickets, keyed by ticketId
+    """
+    if not ticket_ids:
+        return {}
+
+    keys = [{'ticketId': ticket_id} for ticket_id in ticket_ids]
+    expression_names = {f'#f{i}': field for i, field in enumerate(RESULT_FIELDS)}
+    items = batch_get(TICKETS_TABLE, keys, ', '.join(expression_names), expression_names)
+    return {item['ticketId']: item for item in items}
+
+def encode_next_token(offset):
+    """
+    Encode a result offset as an opaque pagination token
+    """
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode()
+
+def decode_next_token(token):
+    """
+    Decode a pagination token back into a result offset
+    """
+    if not token:
+        return 0
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(token.encode()).decode())['offset'])
+    except Exception:
+        raise ValueError('Invalid nextToken')
+    if offset < 0:
+        raise ValueError('Invalid nextToken')
+    return offset
+
+def response(status_code, body):
+    """
+    Create standardized response
+    """
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,OPTIONS'
+        },
+        'body': json.dumps(body, default=str)  # Handle Decimal serialization
+    }
@@ -0,0 +1,128 @@
+import json
+import boto3
+import os
+import logging
+import time
+from boto3.dynamodb.conditions import Key
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+sns = boto3.client('sns')
+
+# Environment variables
+TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
+TICKET_SNS_TOPIC_ARN = os.environ.get('TICKET_SNS_TOPIC_ARN')
+SLA_INDEX_NAME = os.environ.get('SLA_INDEX_NAME', 'priority-slaDueAt-index')
+MAX_TICKETS_PER_RUN = int(os.environ.get('MAX_TICKETS_PER_RUN', '500'))
+
+# Most urgent first, so a capped run always covers high priority tickets
+PRIORITIES = ['high', 'medium', 'low']
+
+# SNS PublishBatch accepts at most 10 entries per call
+PUBLISH_BATCH_SIZE = 10
+
+def lambda_handler(event, context):
+    """
+    Scheduled SLA check - find tickets past their deadline and hand them to
+    ticket_processor (through the ticket assignment topic) to reassign or escalate
+    """
+    if not TICKET_SNS_TOPIC_ARN:
+        logger.error("TICKET_SNS_TOPIC_ARN not configured")
+        return {'statusCode': 500, 'body': json.dumps({'error': 'TICKET_SNS_TOPIC_ARN not configured'})}
+
+    now = int(time.time())
+    tickets_table = dynamodb.Table(TICKETS_TABLE)
+
+    stats = {'scanned': 0, 'enqueued': 0, 'failed': 0, 'byPriority': {}}
+
+    for priority in PRIORITIES:
+        remaining = MAX_TICKETS_PER_RUN - stats['scanned']
+        if remaining <= 0:
+            logger.warning(f"Reached MAX_TICKETS_PER_RUN ({MAX_TICKETS_PER_RUN}), remaining tickets wait for the next run")
+            break
+
+        due_tickets = get_due_tickets(tickets_table, priority, now, remaining)
+        enqueued, failed = enqueue_breaches(due_tickets)
+
+        stats['scanned'] += len(due_tickets)
+        stats['enqueued'] += enqueued
+        stats['failed'] += failed
+        stats['byPriority'][priority] = {
+            'scanned': len(due_tickets),
+            'enqueued': enqueued,
+            'failed': failed
+        }
+
+    logger.info(f"SLA run complete: {json.dumps(stats)}")
+
+    return {'statusCode': 200, 'body': json.dumps(stats)}
+
+def get_due_tickets(table, priority, now, limit):
+    """
+    Query the SLA index for tickets of one priority whose deadline has passed.
+
+    The index is sparse (only tickets with slaDueAt are in it) and sorted by
+    deadline, so only due tickets are read.
+    """
+    query_kwargs = {
+        'IndexName': SLA_INDEX_NAME,
+        'KeyConditionExpression': Key('priority').eq(priority) & Key('slaDueAt').lte(now),
+        'ProjectionExpression': 'ticketId, #status, slaDueAt',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'Limit': limit
+    }
+
+    tickets = []
+    while len(tickets) < limit:
+        response = table.query(**query_kwargs)
+        tickets.extend(response.get('Items', []))
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        query_kwargs['Limit'] = limit - len(tickets)
+
+    return tickets[:limit]
+
+def enqueue_breaches(tickets):
+    """
+    Publish SLA_BREACH messages in batches, returning (enqueued, failed) counts
+    """
+    enqueued = 0
+    failed = 0
+
+    for start in range(0, len(tickets), PUBLISH_BATCH_SIZE):
+        batch = tickets[start:start + PUBLISH_BATCH_SIZE]
+        entries = []
+        for i, ticket in enumerate(batch):
+            message = {
+                'action': 'SLA_BREACH',
+                'ticketId': ticket['ticketId'],
+                'status': ticket.get('status'),
+                'slaDueAt': int(ticket['slaDueAt'])
+            }
+            entries.append({
+                'Id': str(i),
+                'Message': json.dumps(message),
+                'Subject': f"SLA Breach: {ticket['ticketId']}"
+            })
+
+        try:
+            response = sns.publish_batch(
+                TopicArn=TICKET_SNS_TOPIC_ARN,
+                PublishBatchRequestEntries=entries
+            )
+            enqueued += len(response.get('Successful', []))
+            for failure in response.get('Failed', []):
+                failed += 1
+                logger.error(f"Failed to enqueue SLA breach for ticket {batch[int(failure['Id'])]['ticketId']}: {failure.get('Message')}")
+        except Exception as e:
+            # Tickets stay in the index, the next run picks them up again
+            failed += len(batch)
+            logger.error(f"Failed to publish SLA breach batch: {str(e)}")
+
+    return enqueued, failed
@@ -0,0 +1,226 @@
+import json
+import boto3
+import os
+import logging
+import time
+from boto3.dynamodb.types import TypeDeserializer
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+sns = boto3.client('sns')
+deserializer = TypeDeserializer()
+
+# Environment variables
+TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
+TICKET_EVENTS_TABLE = os.environ.get('TICKET_EVENTS_TABLE', 'ticket-events-dev')
+SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+
+# History events written by update_ticket that the customer/operator hear about
+NOTIFY_EVENT_TYPES = ['STATUS_UPDATED']
+
+# Sent notifications are recorded next to the event (NOTIFIED#<eventKey>#<recipient>),
+# kept for longer than the 24h stream retention so retried records are not sent twice
+SENT_MARKER_PREFIX = 'NOTIFIED#'
+SENT_MARKER_TTL_SECONDS = 7 * 86400
+
+def lambda_handler(event, context):
+    """
+    Send ticket status notifications from the ticket-events stream, so that
+    update_ticket only has to write the ticket and its history event.
+
+    The stream retries from the first failed record, so records before it
+    are not retried and records after it are all retried with it. Each
+    notification is recorded once published and skipped on a retry, which
+    keeps a retried record (or one whose customer notification went out
+    before the operator one failed) from notifying anyone twice.
+    """
+    batch_item_failures = []
+    history_events = []
+
+    for record in event['Records']:
+        if record.get('eventName') != 'INSERT':
+            continue
+        image = record['dynamodb'].get('NewImage', {})
+        history_event = {k: deserializer.deserialize(v) for k, v in image.items()}
+        if history_event.get('eventType') in NOTIFY_EVENT_TYPES:
+            history_events.append((record, history_event))
+
+    if not history_events:
+        return {'batchItemFailures': batch_item_failures}
+
+    tickets = get_tickets({history_event['ticketId'] for _, history_event in history_events})
+    sent = get_sent_markers([history_event for _, history_event in history_events])
+
+    for record, history_event in history_events:
+        ticket = tickets.get(history_event['ticketId'])
+        if not ticket:
+            logger.warning(f"Ticket {history_event['ticketId']} not found for notification")
+            continue
+
+        # Any admin can take over a ticket, but log for audit
+        assigned_to = ticket.get('assignedTo')
+        if assigned_to and assigned_to != history_event.get('changedBy'):
+            logger.warning(f"Admin {history_event.get('changedBy')} updated ticket {ticket['ticketId']} that was assigned to {assigned_to}")
+
+        try:
+            send_status_update_notifications(
+                ticket,
+                history_event['toStatus'],
+                history_event.get('resolution', ''),
+                history_event.get('changedBy'),
+                history_event.get('changedByType', ''),
+                history_event.get('resolutionMessage'),
+                history_event['eventKey'],
+                sent
+            )
+        except Exception as e:
+            # Everything from this record on is retried, stop here
+            logger.error(f"Error notifying for ticket {ticket['ticketId']}: {str(e)}")
+            batch_item_failures.append({'itemIdentifier': record['dynamodb']['SequenceNumber']})
+            break
+
+    logger.info(f"Processed {len(history_events)} ticket events, {len(batch_item_failures)} failed")
+    return {'batchItemFailures': batch_item_failures}
+
+def get_tickets(ticket_ids):
+    """
+    Batch-read the ticket fields needed for notifications
+    """
+    tickets = {}
+    keys = [{'ticketId': ticket_id} for ticket_id in ticket_ids]
+    for start in range(0, len(keys), 100):
+        request_items = {
+            TICKETS_TABLE: {
+                'Keys': keys[start:start + 100],
+                'ProjectionExpression': 'ticketId, userId, assignedTo'
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for ticket in result.get('Responses', {}).get(TICKETS_TABLE, []):
+                tickets[ticket['ticketId']] = ticket
+            request_items = result.get('UnprocessedKeys')
+    return tickets
+
+def sent_marker_key(ticket_id, event_key, recipient):
+    return {'ticketId': ticket_id, 'eventKey': f"{SENT_MARKER_PREFIX}{event_key}#{recipient}"}
+
+def get_sent_markers(history_events):
+    """
+    Batch-read which notifications of these events were already sent,
+    as a set of (ticketId, marker eventKey)
+    """
+    sent = set()
+    keys = [
+        sent_marker_key(history_event['ticketId'], history_event['eventKey'], recipient)
+        for history_event in history_events
+        for recipient in ('customer', 'operator')
+    ]
+    for start in range(0, len(keys), 100):
+        request_items = {
+            TICKET_EVENTS_TABLE: {
+                'Keys': keys[start:start + 100],
+                'ProjectionExpression': 'ticketId, eventKey'
+            }
+        }
+        while request_items:
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for marker in result.get('Responses', {}).get(TICKET_EVENTS_TABLE, []):
+                sent.add((marker['ticketId'], marker['eventKey']))
+            request_items = result.get('UnprocessedKeys')
+    return sent
+
+def publish_once(ticket_id, event_key, recipient, sent, **publish_kwargs):
+    """
+    Publish a notification unless it was already sent for this event, and
+    record it as sent
+    """
+    marker_key = sent_marker_key(ticket_id, event_key, recipient)
+    if (marker_key['ticketId'], marker_key['eventKey']) in sent:
+        logger.info(f"Already sent {recipient} notification for {event_key} of ticket {ticket_id}")
+        return
+    sns.publish(TopicArn=SNS_TOPIC_ARN, **publish_kwargs)
+    dynamodb.Table(TICKET_EVENTS_TABLE).put_item(
+        Item=dict(marker_key, expiresAt=int(time.time()) + SENT_MARKER_TTL_SECONDS)
+    )
+
+def send_status_update_notifications(ticket, new_status, resolution, updated_by, updater_type, resolution_message, event_key, sent):
+    """
+    Send notifications about a status update event, skipping the ones
+    already sent. Errors are raised to the handler, which reports the
+    record for a retry.
+    """
+    if not SNS_TOPIC_ARN:
+        return
+    
+    ticket_id = ticket['ticketId']
+    customer_id = ticket.get('userId')
+    assigned_to = ticket.get('assignedTo')
+    
+    # Notify customer
+    if customer_id and customer_id != updated_by:
+        customer_message = {
+            'userId': customer_id,
+            'type': 'TICKET_STATUS_UPDATE',
+            'ticketId': ticket_id,
+            'newStatus': new_status,
+            'updatedBy': updater_type,
+            'message': create_customer_message(new_status, resolution, resolution_message),
+            'resolutionMessage': resolution_message if resolution_message else None
+        }
+        
+        publish_once(
+            ticket_id, event_key, 'customer', sent,
+            Message=json.dumps(customer_message),
+            Subject=f'Ticket Update: {ticket_id}',
+            MessageAttributes={
+                'userId': {'DataType': 'String', 'StringValue': customer_id},
+                'notificationType': {'DataType': 'String', 'StringValue': 'TICKET_UPDATE'}
+            }
+        )
+    
+    # Notify assigned operator (if different from updater)
+    if assigned_to and assigned_to != updated_by:
+        operator_message = {
+            'userId': assigned_to,
+            'type': 'TICKET_STATUS_UPDATE',
+            'ticketId': ticket_id,
+            'newStatus': new_status,
+            'updatedBy': updater_type,
+            'message': f'Ticket {ticket_id} status updated to {new_status}'
+        }
+        
+        publish_once(
+            ticket_id, event_key, 'operator', sent,
+            Message=json.dumps(operator_message),
+            Subject=f'Ticket Update: {ticket_id}',
+            MessageAttributes={
+                'userId': {'DataType': 'String', 'StringValue': assigned_to},
+                'notificationType': {'DataType': 'String', 'StringValue': 'TICKET_UPDATE'}
+            }
+        )
+    
+    logger.info(f"Sent status update notifications for ticket {ticket_id}")
+
+def create_customer_message(status, resolution, resolution_message=None):
+    """
+    Create customer-friendly message based on status
+    """
+    messages = {
+        'assigned': 'Your ticket has been assigned to a support agent.',
+        'in_progress': 'Your ticket is being worked on by our support team.',
+        'resolved': f'Your ticket has been resolved. {resolution}' if resolution else 'Your ticket has been resolved.',
+        'closed': 'Your ticket has been closed.'
+    }
+    
+    base_message = messages.get(status, f'Your ticket status has been updated to {status}.')
+    
+    # Add resolution message for resolved tickets
+    if status == 'resolved' and resolution_message:
+        base_message += f' Resolution: {resolution_message}'
+    
+    return base_message
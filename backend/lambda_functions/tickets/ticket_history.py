@@ -0,0 +1,268 @@
+import json
+import boto3
+import os
+import base64
+import logging
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+
+# Environment variables
+TICKET_EVENTS_TABLE = os.environ.get('TICKET_EVENTS_TABLE', 'ticket-events-dev')
+COMPACTION_THRESHOLD = int(os.environ.get('COMPACTION_THRESHOLD', '20'))
+
+EVENT_PREFIX = 'EVENT#'
+SNAPSHOT_KEY = 'SNAPSHOT'
+
+def lambda_handler(event, context):
+    """
+    Page through a ticket's history (view=events, default) or get the state
+    folded from it (view=state). Also invoked directly with
+    {"action": "COMPACT", "ticketIds": [...]} to refresh snapshots.
+    """
+    if event.get('action') == 'COMPACT':
+        return compact_tickets(event.get('ticketIds', []))
+
+    try:
+        ticket_id = event['pathParameters']['ticketId']
+
+        # Get user info from JWT
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("claims", {})
+        user_id = claims.get("sub")
+        user_type = claims.get("custom:userType", "")
+
+        if not user_id:
+            return response(401, {'error': 'Authentication required'})
+
+        # Ticket history is an admin audit view
+        if user_type.upper() != 'ADMIN':
+            return response(403, {
+                'error': 'FORBIDDEN',
+                'message': 'Admin access required'
+            })
+
+        query_params = event.get('queryStringParameters') or {}
+        view = query_params.get('view', 'events')
+        events_table = dynamodb.Table(TICKET_EVENTS_TABLE)
+
+        if view == 'state':
+            state, _ = get_current_state(events_table, ticket_id)
+            if state is None:
+                return response(404, {
+                    'error': 'TICKET_NOT_FOUND',
+                    'message': f'No history for ticket {ticket_id}'
+                })
+            return response(200, {'ticketId': ticket_id, 'state': state})
+
+        if view != 'events':
+            return response(400, {
+                'error': 'INVALID_VIEW',
+                'message': 'view must be one of: events, state'
+            })
+
+        try:
+            limit = min(int(query_params.get('limit', 25)), 100)  # Max 100 items
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            return response(400, {
+                'error': 'INVALID_LIMIT',
+                'message': 'limit must be a positive integer'
+            })
+        newest_first = query_params.get('order', 'desc') != 'asc'
+
+        query_kwargs = {
+            'KeyConditionExpression': Key('ticketId').eq(ticket_id) & Key('eventKey').begins_with(EVENT_PREFIX),
+            'ScanIndexForward': not newest_first,
+            'Limit': limit
+        }
+        if query_params.get('nextToken'):
+            try:
+                query_kwargs['ExclusiveStartKey'] = decode_next_token(query_params['nextToken'])
+            except ValueError:
+                return response(400, {
+                    'error': 'INVALID_NEXT_TOKEN',
+                    'message': 'nextToken is invalid'
+                })
+
+        result = events_table.query(**query_kwargs)
+        events = result.get('Items', [])
+        last_key = result.get('LastEvaluatedKey')
+
+        return response(200, {
+            'ticketId': ticket_id,
+            'events': events,
+            'count': len(events),
+            'nextToken': encode_next_token(last_key) if last_key else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting ticket history: {str(e)}")
+        return response(500, {
+            'error': 'INTERNAL_SERVER_ERROR',
+            'message': 'An unexpected error occurred'
+        })
+
+def apply_event(state, event):
+    """
+    Fold one history event into the ticket state
+    """
+    state['eventCount'] = state.get('eventCount', 0) + 1
+    event_counts = state.setdefault('eventCounts', {})
+    event_counts[event['eventType']] = event_counts.get(event['eventType'], 0) + 1
+
+    changed_at = event.get('changedAt')
+    if event['eventType'] == 'CREATED':
+        state['createdAt'] = changed_at
+
+    new_status = event.get('toStatus')
+    if new_status and new_status != state.get('status'):
+        # Accumulate how long the ticket spent in the status it is leaving
+        if state.get('status') and state.get('statusChangedAt') and changed_at:
+            elapsed = datetime.fromisoformat(changed_at) - datetime.fromisoformat(state['statusChangedAt'])
+            time_in_status = state.setdefault('timeInStatus', {})
+            time_in_status[state['status']] = int(time_in_status.get(state['status'], 0)) + max(int(elapsed.total_seconds()), 0)
+        state['status'] = new_status
+        state['statusChangedAt'] = changed_at
+
+    for field in ['assignedTo', 'operatorNotes', 'resolutionMessage', 'resolution']:
+        if event.get(field):
+            state[field] = event[field]
+
+    state['lastUpdatedBy'] = event.get('changedBy')
+    state['updatedAt'] = changed_at
+    state['lastEventKey'] = event['eventKey']
+    return state
+
+def get_current_state(events_table, ticket_id, compaction_threshold=COMPACTION_THRESHOLD):
+    """
+    Fold the events newer than the latest snapshot onto it, compacting when
+    at least compaction_threshold events have piled up since the snapshot.
+    Returns (state, events folded into a new snapshot).
+    """
+    snapshot = events_table.get_item(Key={'ticketId': ticket_id, 'eventKey': SNAPSHOT_KEY}).get('Item')
+    state = dict(snapshot['state']) if snapshot else {}
+    previous_last_event_key = snapshot['lastEventKey'] if snapshot else None
+
+    new_events = get_events_after(events_table, ticket_id, previous_last_event_key)
+    if not snapshot and not new_events:
+        return None, 0
+
+    for event in new_events:
+        apply_event(state, event)
+
+    if new_events and len(new_events) >= compaction_threshold:
+        if save_snapshot(events_table, ticket_id, state, previous_last_event_key):
+            return state, len(new_events)
+
+    return state, 0
+
+def get_events_after(events_table, ticket_id, last_event_key=None):
+    """
+    Get a ticket's events in order, optionally only those after last_event_key
+    """
+    if last_event_key:
+        key_condition = Key('ticketId').eq(ticket_id) & Key('eventKey').gt(last_event_key)
+    else:
+        key_condition = Key('ticketId').eq(ticket_id) & Key('eventKey').begins_with(EVENT_PREFIX)
+
+    query_kwargs = {'KeyConditionExpression': key_condition, 'ScanIndexForward': True}
+    events = []
+    while True:
+        result = events_table.query(**query_kwargs)
+        # The snapshot item sorts after the events, skip it
+        events.extend(item for item in result.get('Items', []) if item['eventKey'].startswith(EVENT_PREFIX))
+        if 'LastEvaluatedKey' not in result:
+            return events
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def save_snapshot(events_table, ticket_id, state, previous_last_event_key):
+    """
+    Store the folded state, unless another compaction got there first.
+    Events are kept, the snapshot only saves re-folding them.
+    """
+    condition = 'attribute_not_exists(eventKey)'
+    expression_values = {}
+    if previous_last_event_key:
+        condition = 'lastEventKey = :previous'
+        expression_values[':previous'] = previous_last_event_key
+
+    put_kwargs = {
+        'Item': {
+            'ticketId': ticket_id,
+            'eventKey': SNAPSHOT_KEY,
+            'state': state,
+            'lastEventKey': state['lastEventKey'],
+            'compactedAt': datetime.utcnow().isoformat()
+        },
+        'ConditionExpression': condition
+    }
+    if expression_values:
+        put_kwargs['ExpressionAttributeValues'] = expression_values
+
+    try:
+        events_table.put_item(**put_kwargs)
+        logger.info(f"Compacted history of ticket {ticket_id} up to {state['lastEventKey']}")
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info(f"Snapshot of ticket {ticket_id} was updated concurrently, skipping")
+            return False
+        raise
+
+def compact_tickets(ticket_ids):
+    """
+    Fold all pending events of the given tickets into their snapshots
+    """
+    events_table = dynamodb.Table(TICKET_EVENTS_TABLE)
+    compacted = 0
+    events_folded = 0
+
+    for ticket_id in ticket_ids:
+        _, folded = get_current_state(events_table, ticket_id, compaction_threshold=1)
+        if folded:
+            compacted += 1
+            events_folded += folded
+
+    logger.info(f"Compacted {compacted} of {len(ticket_ids)} tickets, folded {events_folded} events")
+    return {'statusCode': 200, 'body': json.dumps({'compacted': compacted, 'eventsFolded': events_folded})}
+
+def encode_next_token(last_evaluated_key):
+    """
+    Encode a LastEvaluatedKey as an opaque pagination token
+    """
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_next_token(token):
+    """
+    Decode a pagination token back into an ExclusiveStartKey
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid nextToken')
+    if not isinstance(key, dict) or set(key) != {'ticketId', 'eventKey'}:
+        raise ValueError('Invalid nextToken')
+    return key
+
+def response(status_code, body):
+    """
+    Create standardized response
+    """
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,OPTIONS'
+        },
+        'body': json.dumps(body, default=str)  # Handle Decimal serialization
+    }
@@ -0,0 +1,200 @@
+import boto3
+import os
+import re
+import logging
+from boto3.dynamodb.types import TypeDeserializer
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+deserializer = TypeDeserializer()
+
+# Environment variables
+SEARCH_INDEX_TABLE = os.environ.get('SEARCH_INDEX_TABLE', 'ticket-search-index-dev')
+TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
+
+# Searchable fields and their weight in the term frequency
+FIELD_WEIGHTS = {
+    'subject': 3,
+    'description': 1,
+    'resolutionMessage': 1,
+    'bookingReference': 5,
+    'bikeId': 5
+}
+
+# Identifier fields are also indexed as a single exact token (e.g. "bk-1a2b3c")
+IDENTIFIER_FIELDS = ['bookingReference', 'bikeId']
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has',
+    'have', 'i', 'in', 'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'so', 'that',
+    'the', 'this', 'to', 'was', 'we', 'were', 'with', 'you', 'your'
+}
+
+# Special items sharing the index table with the posting lists
+DF_SORT_KEY = '#DF'
+GLOBAL_STATS_KEY = {'term': '#GLOBAL', 'ticketId': '#STATS'}
+
+def lambda_handler(event, context):
+    """
+    Keep the ticket search index in sync with the tickets table (DynamoDB stream).
+
+    Each ticket contributes one posting (term, ticketId, tf, dl) per distinct
+    term. Only records whose searchable fields changed touch the index, so
+    status-only updates cost nothing here.
+    """
+    index_table = dynamodb.Table(SEARCH_INDEX_TABLE)
+
+    # Manual invocation to index tickets created before the index existed
+    if event.get('action') == 'BACKFILL':
+        return backfill(index_table)
+
+    batch_item_failures = []
+    postings_written = 0
+    postings_deleted = 0
+
+    for record in event['Records']:
+        try:
+            old_image = deserialize_image(record['dynamodb'].get('OldImage'))
+            new_image = deserialize_image(record['dynamodb'].get('NewImage'))
+            written, deleted = index_ticket_change(index_table, old_image, new_image)
+            postings_written += written
+            postings_deleted += deleted
+        except Exception as e:
+            logger.error(f"Error indexing record {record.get('eventID')}: {str(e)}")
+            batch_item_failures.append({'itemIdentifier': record['dynamodb']['SequenceNumber']})
+
+    logger.info(f"Indexed {len(event['Records'])} records: {postings_written} postings written, "
+                f"{postings_deleted} deleted, {len(batch_item_failures)} failed")
+
+    return {'batchItemFailures': batch_item_failures}
+
+def deserialize_image(image):
+    """
+    Convert a stream image from DynamoDB JSON into a plain dict
+    """
+    if not image:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+def tokenize(text):
+    """
+    Split text into index terms.
+
+    Must stay in sync with search_tickets.tokenize.
+    """
+    terms = []
+    for token in re.findall(r'[a-z0-9]+', str(text).lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        # Light plural folding so "brakes" matches "brake"
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+def ticket_terms(ticket):
+    """
+    Get the weighted term frequencies and document length for a ticket
+    """
+    term_frequencies = {}
+    if not ticket:
+        return term_frequencies, 0
+
+    for field, weight in FIELD_WEIGHTS.items():
+        value = ticket.get(field)
+        if not value:
+            continue
+        terms = tokenize(value)
+        if field in IDENTIFIER_FIELDS:
+            terms.append(str(value).strip().lower())
+        for term in terms:
+            term_frequencies[term] = term_frequencies.get(term, 0) + weight
+
+    return term_frequencies, sum(term_frequencies.values())
+
+def index_ticket_change(index_table, old_ticket, new_ticket):
+    """
+    Apply the difference between two versions of a ticket to the index
+    """
+    old_terms, old_length = ticket_terms(old_ticket)
+    new_terms, new_length = ticket_terms(new_ticket)
+
+    if old_terms == new_terms:
+        return 0, 0
+
+    ticket_id = (new_ticket or old_ticket)['ticketId']
+    removed_terms = [term for term in old_terms if term not in new_terms]
+    added_terms = [term for term in new_terms if term not in old_terms]
+
+    # The document length is stored on every posting, so when it changes all of
+    # the ticket's postings are rewritten, otherwise only the changed ones
+    if old_length != new_length:
+        changed_terms = list(new_terms)
+    else:
+        changed_terms = [term for term, tf in new_terms.items() if old_terms.get(term) != tf]
+
+    with index_table.batch_writer() as batch:
+        for term in removed_terms:
+            batch.delete_item(Key={'term': term, 'ticketId': ticket_id})
+        for term in changed_terms:
+            batch.put_item(Item={
+                'term': term,
+                'ticketId': ticket_id,
+                'tf': new_terms[term],
+                'dl': new_length
+            })
+
+    # Document frequencies and collection stats drive ranking only, so a
+    # retried record skewing them slightly is acceptable
+    for term in added_terms:
+        update_document_frequency(index_table, term, 1)
+    for term in removed_terms:
+        update_document_frequency(index_table, term, -1)
+
+    doc_count_delta = (1 if new_ticket and not old_ticket else 0) - (1 if old_ticket and not new_ticket else 0)
+    index_table.update_item(
+        Key=GLOBAL_STATS_KEY,
+        UpdateExpression='ADD docCount :docs, totalLength :length',
+        ExpressionAttributeValues={
+            ':docs': doc_count_delta,
+            ':length': new_length - old_length
+        }
+    )
+
+    return len(changed_terms), len(removed_terms)
+
+def update_document_frequency(index_table, term, delta):
+    """
+    Adjust the number of tickets containing a term
+    """
+    index_table.update_item(
+        Key={'term': term, 'ticketId': DF_SORT_KEY},
+        UpdateExpression='ADD df :delta',
+        ExpressionAttributeValues={':delta': delta}
+    )
+
+def backfill(index_table):
+    """
+    Index every existing ticket. Run once against an empty index - tickets
+    already in the index would have their document frequencies counted twice.
+    """
+    tickets_table = dynamodb.Table(TICKETS_TABLE)
+    scan_kwargs = {}
+    tickets_indexed = 0
+
+    while True:
+        result = tickets_table.scan(**scan_kwargs)
+        for ticket in result.get('Items', []):
+            index_ticket_change(index_table, None, ticket)
+            tickets_indexed += 1
+
+        if 'LastEvaluatedKey' not in result:
+            break
+        scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    logger.info(f"Backfilled search index with {tickets_indexed} tickets")
+    return {'statusCode': 200, 'body': f'Indexed {tickets_indexed} tickets'}
@@ -3,58 +3,104 @@ import boto3
 import os
 import logging
 import random
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
+from botocore.exceptions import ClientError
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+# boto3 clients are thread-safe, resources are not - each worker gets its own
 sns = boto3.client('sns')
+_thread_local = threading.local()
 
 # Environment variables
 TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
+TICKET_EVENTS_TABLE = os.environ.get('TICKET_EVENTS_TABLE', 'ticket-events-dev')
 USERS_TABLE = os.environ.get('USERS_TABLE', 'DALScooterUsers1')
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
 TICKET_SNS_ARN = os.environ.get('TICKET_SNS_ARN')
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', '8'))
+MAX_SLA_REASSIGNMENTS = int(os.environ.get('MAX_SLA_REASSIGNMENTS', '2'))
+
+# Seconds an assigned ticket may sit untouched, for tickets without a stored budget
+ASSIGNED_SLA_SECONDS = {'high': 3600, 'medium': 14400, 'low': 86400}
+
+# Created once per container so its worker threads, and the DynamoDB resource
+# each one caches, are reused by every warm invocation
+executor = ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY))
+
+def get_dynamodb():
+    """
+    Get the DynamoDB resource of the current worker thread, created on its
+    first record and kept for the life of the container
+    """
+    if not hasattr(_thread_local, 'dynamodb'):
+        _thread_local.dynamodb = boto3.session.Session().resource('dynamodb')
+    return _thread_local.dynamodb
 
 def lambda_handler(event, context):
     """
-    Process SQS messages for ticket assignment
+    Process SQS messages for ticket assignment.
+
+    Records are processed concurrently (bounded by MAX_CONCURRENCY) and only
+    the failed ones are reported back in batchItemFailures, so tickets that
+    were already assigned are not re-delivered with the rest of the batch.
     """
-    logger.info(f"Processing {len(event['Records'])} records")
+    records = event['Records']
+    logger.info(f"Processing {len(records)} records")
     
-    for record in event['Records']:
-        try:
-            # Parse the SQS message
-            message_body = json.loads(record['body'])
-            
-            # Handle SNS wrapped messages
-            if 'Message' in message_body:
-                actual_message = json.loads(message_body['Message'])
-            else:
-                actual_message = message_body
-            
-            logger.info(f"Processing message: {actual_message}")
-            
-            # Route based on action type
-            action = actual_message.get('action')
-            
-            if action == 'NEW_TICKET':
-                await_process_new_ticket(actual_message)
-            elif action == 'ASSIGNMENT_FAILED':
-                await_retry_assignment(actual_message)
-            else:
-                logger.warning(f"Unknown action: {action}")
-                
-        except Exception as e:
-            logger.error(f"Error processing record {record['messageId']}: {str(e)}")
-            # Let the message go to DLQ after retries
-            raise
+    batch_item_failures = []
+    results = list(executor.map(process_record, records))
+    
+    for record, succeeded in zip(records, results):
+        if not succeeded:
+            # Only this message goes back to the queue (and to the DLQ after retries)
+            batch_item_failures.append({'itemIdentifier': record['messageId']})
+    
+    logger.info(f"Processed {len(records)} records, {len(batch_item_failures)} failed")
     
-    return {'statusCode': 200, 'body': 'Processing complete'}
+    return {'batchItemFailures': batch_item_failures}
+
+def process_record(record):
+    """
+    Process a single SQS record, returning False if it should be retried
+    """
+    try:
+        # Parse the SQS message
+        message_body = json.loads(record['body'])
+        
+        # Handle SNS wrapped messages
+        if 'Message' in message_body:
+            actual_message = json.loads(message_body['Message'])
+        else:
+            actual_message = message_body
+        
+        logger.info(f"Processing message: {actual_message}")
+        
+        # Route based on action type
+        action = actual_message.get('action')
+        
+        if action == 'NEW_TICKET':
+            await_process_new_ticket(actual_message)
+        elif action == 'ASSIGNMENT_FAILED':
+            await_retry_assignment(actual_message)
+        elif action == 'SLA_BREACH':
+            await_process_sla_breach(actual_message)
+        else:
+            logger.warning(f"Unknown action: {action}")
+        
+        return True
+            
+    except Exception as e:
+        logger.error(f"Error processing record {record['messageId']}: {str(e)}")
+        return False
 
 def await_process_new_ticket(message):
     """
@@ -69,7 +115,7 @@ def await_process_new_ticket(message):
         logger.info(f"Processing new ticket: {ticket_id}")
         
         # Get ticket details
-        tickets_table = dynamodb.Table(TICKETS_TABLE)
+        tickets_table = get_dynamodb().Table(TICKETS_TABLE)
         ticket_response = tickets_table.get_item(Key={'ticketId': ticket_id})
         
         if 'Item' not in ticket_response:
@@ -84,17 +130,7 @@ def await_process_new_ticket(message):
             return
         
         # Get all admin users for random assignment
-        users_table = dynamodb.Table(USERS_TABLE)
-        
-        # Scan for admin users
-        response = users_table.scan(
-            FilterExpression='userType = :userType',
-            ExpressionAttributeValues={
-                ':userType': 'admin'
-            }
-        )
-        
-        admin_operators = response.get('Items', [])
+        admin_operators = get_admin_operators()
         logger.info(f"Found {len(admin_operators)} admin users for assignment")
         
         if not admin_operators:
@@ -110,56 +146,33 @@ def await_process_new_ticket(message):
         
         logger.info(f"Assigning ticket {ticket_id} to admin operator {operator_email}")
         
-        # Update ticket status
+        # Update ticket status - conditional so that duplicate deliveries of the
+        # same ticket processed concurrently cannot both assign it
         current_time = datetime.now().isoformat()
-        tickets_table.update_item(
+        assigned = update_ticket_with_event(
+            history_event(ticket_id, 'ASSIGNED', current_time, toStatus='assigned', assignedTo=operator_email),
             Key={'ticketId': ticket_id},
-            UpdateExpression='SET #status = :status, assignedTo = :operator, assignedToEmail = :email, updatedAt = :updated, assignedAt = :assigned',
+            UpdateExpression='SET #status = :status, assignedTo = :operator, assignedToEmail = :email, updatedAt = :updated, assignedAt = :assigned, slaDueAt = :slaDue',
+            ConditionExpression='#status = :open',
             ExpressionAttributeNames={
                 '#status': 'status'
             },
             ExpressionAttributeValues={
                 ':status': 'assigned',
+                ':open': 'open',
                 ':operator': operator_email,  # Store the email as assignedTo
                 ':email': operator_email,     # Also store in assignedToEmail for clarity
                 ':updated': current_time,
-                ':assigned': current_time
+                ':assigned': current_time,
+                ':slaDue': assigned_sla_due_at(ticket)
             }
         )
+        if not assigned:
+            logger.info(f"Ticket {ticket_id} was assigned by another worker, skipping")
+            return
         
         # Notify the assigned operator
-        if SNS_TOPIC_ARN:
-            try:
-                notification_message = {
-                    'userId': operator_email,
-                    'type': 'NEW_TICKET_ASSIGNED',
-                    'ticketId': ticket_id,
-                    'subject': ticket.get('subject', 'No subject'),
-                    'priority': ticket.get('priority', 'medium'),
-                    'category': ticket.get('category', 'general'),
-                    'customerName': ticket.get('username', 'Unknown'),
-                    'createdAt': ticket.get('createdAt'),
-                    'message': f"New ticket {ticket_id} has been assigned to you"
-                }
-                
-                sns.publish(
-                    TopicArn=SNS_TOPIC_ARN,
-                    Message=json.dumps(notification_message),
-                    Subject=f'New Ticket Assignment: {ticket_id}',
-                    MessageAttributes={
-                        'userId': {
-                            'DataType': 'String',
-                            'StringValue': operator_email
-                        },
-                        'notificationType': {
-                            'DataType': 'String',
-                            'StringValue': 'TICKET_ASSIGNMENT'
-                        }
-                    }
-                )
-                logger.info(f"Sent assignment notification to operator {operator_email}")
-            except Exception as e:
-                logger.error(f"Failed to send notification: {str(e)}")
+        notify_assigned_operator(operator_email, ticket)
         
         # Also notify the customer
         if SNS_TOPIC_ARN and ticket.get('userId'):
@@ -195,6 +208,124 @@ def await_process_new_ticket(message):
         logger.error(f"Error processing new ticket: {str(e)}")
         raise
 
+def get_admin_operators():
+    """
+    Get all admin users that tickets can be assigned to
+    """
+    users_table = get_dynamodb().Table(USERS_TABLE)
+    
+    # Scan for admin users
+    response = users_table.scan(
+        FilterExpression='userType = :userType',
+        ExpressionAttributeValues={
+            ':userType': 'admin'
+        }
+    )
+    
+    return response.get('Items', [])
+
+def assigned_sla_due_at(ticket):
+    """
+    Get the SLA deadline (epoch seconds) for a ticket assigned now
+    """
+    default_budget = ASSIGNED_SLA_SECONDS.get(ticket.get('priority'), ASSIGNED_SLA_SECONDS['medium'])
+    return int(time.time()) + int(ticket.get('slaAssignedSeconds', default_budget))
+
+def notify_assigned_operator(operator_email, ticket):
+    """
+    Notify an admin operator that a ticket has been assigned to them
+    """
+    if not SNS_TOPIC_ARN:
+        return
+    
+    ticket_id = ticket['ticketId']
+    try:
+        notification_message = {
+            'userId': operator_email,
+            'type': 'NEW_TICKET_ASSIGNED',
+            'ticketId': ticket_id,
+            'subject': ticket.get('subject', 'No subject'),
+            'priority': ticket.get('priority', 'medium'),
+            'category': ticket.get('category', 'general'),
+            'customerName': ticket.get('username', 'Unknown'),
+            'createdAt': ticket.get('createdAt'),
+            'message': f"New ticket {ticket_id} has been assigned to you"
+        }
+        
+        sns.publish(
+            TopicArn=SNS_TOPIC_ARN,
+            Message=json.dumps(notification_message),
+            Subject=f'New Ticket Assignment: {ticket_id}',
+            MessageAttributes={
+                'userId': {
+                    'DataType': 'String',
+                    'StringValue': operator_email
+                },
+                'notificationType': {
+                    'DataType': 'String',
+                    'StringValue': 'TICKET_ASSIGNMENT'
+                }
+            }
+        )
+        logger.info(f"Sent assignment notification to operator {operator_email}")
+    except Exception as e:
+        logger.error(f"Failed to send notification: {str(e)}")
+
+def history_event(ticket_id, event_type, changed_at, **fields):
+    """
+    Build a history item for the ticket-events table
+    """
+    event = {
+        'ticketId': ticket_id,
+        'eventKey': f"EVENT#{datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')}#{uuid.uuid4().hex[:8]}",
+        'eventType': event_type,
+        'changedBy': 'system',
+        'changedByType': 'SYSTEM',
+        'changedAt': changed_at
+    }
+    event.update({k: v for k, v in fields.items() if v is not None})
+    return event
+
+def update_ticket_with_event(event, **update_kwargs):
+    """
+    Apply an update_item style change to a ticket and append its history
+    event in one transaction. Returns False if the update's condition failed.
+    """
+    # The resource's client serializes plain Python values itself
+    update = {
+        'TableName': TICKETS_TABLE,
+        'Key': update_kwargs['Key'],
+        'UpdateExpression': update_kwargs['UpdateExpression'],
+        'ExpressionAttributeValues': update_kwargs['ExpressionAttributeValues']
+    }
+    if 'ConditionExpression' in update_kwargs:
+        update['ConditionExpression'] = update_kwargs['ConditionExpression']
+    if 'ExpressionAttributeNames' in update_kwargs:
+        update['ExpressionAttributeNames'] = update_kwargs['ExpressionAttributeNames']
+    
+    try:
+        get_dynamodb().meta.client.transact_write_items(
+            TransactItems=[
+                {'Update': update},
+                {
+                    'Put': {
+                        'TableName': TICKET_EVENTS_TABLE,
+                        'Item': event,
+                        'ConditionExpression': 'attribute_not_exists(eventKey)'
+                    }
+                }
+            ]
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons', [])
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return False
+        raise
+    
+    return True
+
 def handle_no_operators(ticket_id, retry_count=0):
     """
     Handle the case when no admin users are available - escalate immediately
@@ -215,6 +346,149 @@ def await_retry_assignment(message):
     message['action'] = 'NEW_TICKET'
     await_process_new_ticket(message)
 
+def await_process_sla_breach(message):
+    """
+    Act on a ticket the SLA scheduler found past its deadline.
+
+    Open tickets get another assignment attempt, assigned tickets are handed
+    to a different admin (up to MAX_SLA_REASSIGNMENTS times) and everything
+    else is escalated.
+    """
+    ticket_id = message.get('ticketId')
+    if not ticket_id:
+        logger.error("No ticketId in message")
+        return
+    
+    tickets_table = get_dynamodb().Table(TICKETS_TABLE)
+    ticket_response = tickets_table.get_item(Key={'ticketId': ticket_id})
+    
+    if 'Item' not in ticket_response:
+        logger.error(f"Ticket {ticket_id} not found")
+        return
+    
+    ticket = ticket_response['Item']
+    status = ticket.get('status', '').lower()
+    sla_due_at = ticket.get('slaDueAt')
+    
+    # The ticket may have moved on since the scheduler read the index (idempotency)
+    if sla_due_at is None or int(sla_due_at) > int(time.time()) or status != message.get('status'):
+        logger.info(f"Ticket {ticket_id} no longer breaching SLA (status: {status}), skipping")
+        return
+    
+    logger.warning(f"Ticket {ticket_id} breached its {status} SLA (due {sla_due_at})")
+    
+    if status == 'open':
+        await_process_new_ticket(message)
+    elif status == 'assigned' and int(ticket.get('slaReassignCount', 0)) < MAX_SLA_REASSIGNMENTS:
+        reassign_ticket(ticket)
+    else:
+        escalate_sla_breach(ticket)
+
+def reassign_ticket(ticket):
+    """
+    Hand an assigned ticket that breached its SLA to a different admin
+    """
+    ticket_id = ticket['ticketId']
+    current_operator = ticket.get('assignedTo')
+    
+    candidates = [
+        admin for admin in get_admin_operators()
+        if admin['userId'] != current_operator
+    ]
+    if not candidates:
+        logger.warning(f"No other admin available to take ticket {ticket_id}")
+        escalate_sla_breach(ticket)
+        return
+    
+    operator_email = random.choice(candidates)['userId']
+    logger.info(f"Reassigning ticket {ticket_id} from {current_operator} to {operator_email}")
+    
+    current_time = datetime.now().isoformat()
+    reassigned = update_ticket_with_event(
+        history_event(ticket_id, 'REASSIGNED', current_time, assignedTo=operator_email, previousAssignee=current_operator),
+        Key={'ticketId': ticket_id},
+        UpdateExpression='SET assignedTo = :operator, assignedToEmail = :email, updatedAt = :updated, assignedAt = :assigned, slaDueAt = :slaDue, slaReassignCount = if_not_exists(slaReassignCount, :zero) + :one',
+        ConditionExpression='#status = :assignedStatus AND slaDueAt = :previousDue',
+        ExpressionAttributeNames={
+            '#status': 'status'
+        },
+        ExpressionAttributeValues={
+            ':operator': operator_email,
+            ':email': operator_email,
+            ':updated': current_time,
+            ':assigned': current_time,
+            ':slaDue': assigned_sla_due_at(ticket),
+            ':zero': 0,
+            ':one': 1,
+            ':assignedStatus': 'assigned',
+            ':previousDue': ticket['slaDueAt']
+        }
+    )
+    if not reassigned:
+        logger.info(f"Ticket {ticket_id} changed before reassignment, skipping")
+        return
+    
+    notify_assigned_operator(operator_email, ticket)
+
+def escalate_sla_breach(ticket):
+    """
+    Flag a ticket that breached its SLA and alert the admins.
+
+    slaDueAt is removed so the ticket drops out of the SLA index until an
+    admin moves it to a new status.
+    """
+    ticket_id = ticket['ticketId']
+    current_time = datetime.now().isoformat()
+    
+    escalated = update_ticket_with_event(
+        history_event(ticket_id, 'SLA_BREACHED', current_time, status=ticket.get('status'), slaDueAt=ticket['slaDueAt']),
+        Key={'ticketId': ticket_id},
+        UpdateExpression='SET updatedAt = :updated, escalatedAt = :escalated, slaBreachedAt = :breached REMOVE slaDueAt',
+        ConditionExpression='slaDueAt = :previousDue',
+        ExpressionAttributeValues={
+            ':updated': current_time,
+            ':escalated': current_time,
+            ':breached': ticket['slaDueAt'],
+            ':previousDue': ticket['slaDueAt']
+        }
+    )
+    if not escalated:
+        logger.info(f"Ticket {ticket_id} changed before escalation, skipping")
+        return
+    
+    if SNS_TOPIC_ARN:
+        try:
+            admin_alert = {
+                'type': 'ADMIN_ALERT',
+                'alertType': 'TICKET_SLA_BREACHED',
+                'ticketId': ticket_id,
+                'status': ticket.get('status'),
+                'priority': ticket.get('priority', 'medium'),
+                'assignedTo': ticket.get('assignedTo'),
+                'message': f"Ticket {ticket_id} breached its {ticket.get('status')} SLA",
+                'timestamp': current_time,
+                'severity': 'HIGH'
+            }
+            
+            sns.publish(
+                TopicArn=SNS_TOPIC_ARN,
+                Message=json.dumps(admin_alert),
+                Subject=f'ALERT: Ticket SLA Breached - {ticket_id}',
+                MessageAttributes={
+                    'alertType': {
+                        'DataType': 'String',
+                        'StringValue': 'TICKET_SLA_BREACHED'
+                    },
+                    'severity': {
+                        'DataType': 'String',
+                        'StringValue': 'HIGH'
+                    }
+                }
+            )
+            logger.info(f"Sent SLA breach alert for ticket {ticket_id}")
+        except Exception as e:
+            logger.error(f"Failed to send SLA breach alert: {str(e)}")
+
 def escalate_ticket(ticket_id):
     """
     Escalate ticket when assignment fails repeatedly
@@ -223,12 +497,12 @@ def escalate_ticket(ticket_id):
     
     try:
         # Update ticket status to unassigned
-        tickets_table = dynamodb.Table(TICKETS_TABLE)
         current_time = datetime.now().isoformat()
         
-        tickets_table.update_item(
+        update_ticket_with_event(
+            history_event(ticket_id, 'ESCALATED', current_time, toStatus='unassigned'),
             Key={'ticketId': ticket_id},
-            UpdateExpression='SET #status = :status, updatedAt = :updated, escalatedAt = :escalated',
+            UpdateExpression='SET #status = :status, updatedAt = :updated, escalatedAt = :escalated REMOVE slaDueAt',
             ExpressionAttributeNames={
                 '#status': 'status'
             },
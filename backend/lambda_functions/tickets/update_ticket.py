@@ -2,19 +2,30 @@ import json
 import boto3
 import os
 import logging
+import time
+import uuid
 from datetime import datetime
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
+dynamodb = boto3.client('dynamodb')
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
 
 # Environment variables
 TICKETS_TABLE = os.environ.get('TICKETS_TABLE', 'tickets-table-dev')
-SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+TICKET_EVENTS_TABLE = os.environ.get('TICKET_EVENTS_TABLE', 'ticket-events-dev')
+
+# SLA budget per status, used for tickets created before budgets were stored on the ticket
+DEFAULT_SLA_SECONDS = {
+    'assigned': ('slaAssignedSeconds', 14400),
+    'in_progress': ('slaInProgressSeconds', 86400)
+}
 
 def lambda_handler(event, context):
     """
@@ -54,18 +65,6 @@ def lambda_handler(event, context):
         if not user_id:
             return response(401, {'error': 'Authentication required'})
         
-        # Get current ticket
-        tickets_table = dynamodb.Table(TICKETS_TABLE)
-        ticket_response = tickets_table.get_item(Key={'ticketId': ticket_id})
-        
-        if 'Item' not in ticket_response:
-            return response(404, {
-                'error': 'TICKET_NOT_FOUND',
-                'message': f'Ticket {ticket_id} not found'
-            })
-        
-        ticket = ticket_response['Item']
-        
         # Authorization checks
         if user_type.upper() == 'CUSTOMER':
             # Customers cannot update ticket status
@@ -79,47 +78,33 @@ def lambda_handler(event, context):
                 'message': 'Only admins can update ticket status'
             })
         
-        # For admins, check if they are authorized to update this ticket
-        assigned_to_email = ticket.get('assignedTo', '')
-        
-        # Admin can update if:
-        # 1. They are the assigned admin (email matches), OR
-        # 2. Ticket is not assigned to anyone yet, OR  
-        # 3. Any admin can take over (but log for audit)
-        if assigned_to_email and assigned_to_email != user_id:
-            # Allow any admin to update, but log for audit
-            logger.warning(f"Admin {user_id} updating ticket {ticket_id} that was assigned to {assigned_to_email}")
-        
         logger.info(f"Admin {user_id} authorized to update ticket {ticket_id}")
         
-        # Additional validation for resolving tickets
         if new_status == 'resolved':
-            # Double-check: only admins can resolve
-            if user_type.upper() != 'ADMIN':
-                return response(403, {
-                    'error': 'FORBIDDEN',
-                    'message': 'Only admins can resolve tickets'
-                })
-            
             logger.info(f"Admin {user_id} resolving ticket {ticket_id} with message: {message}")
         
-        # Validate status transitions
-        current_status = ticket.get('status', '').lower()
-        if not is_valid_status_transition(current_status, new_status):
-            return response(400, {
-                'error': 'INVALID_STATUS_TRANSITION',
-                'message': f'Cannot transition from {current_status} to {new_status}'
-            })
+        # Optional optimistic concurrency check - the version the client last read
+        expected_version = body.get('version')
+        if expected_version is not None:
+            try:
+                expected_version = int(expected_version)
+            except (TypeError, ValueError):
+                return response(400, {
+                    'error': 'INVALID_VERSION',
+                    'message': 'Version must be an integer'
+                })
         
         # Prepare update
         current_time = datetime.now().isoformat()
-        update_expression = 'SET #status = :status, updatedAt = :updated, lastUpdatedBy = :updater'
+        update_expression = 'SET #status = :status, updatedAt = :updated, lastUpdatedBy = :updater, #version = if_not_exists(#version, :zero) + :one'
         expression_values = {
             ':status': new_status,
             ':updated': current_time,
-            ':updater': user_id
+            ':updater': user_id,
+            ':zero': 0,
+            ':one': 1
         }
-        expression_names = {'#status': 'status'}
+        expression_names = {'#status': 'status', '#version': 'version'}
         
         # Add resolution if provided and status is resolved/closed
         if new_status in ['resolved', 'closed'] and resolution:
@@ -137,27 +122,84 @@ def lambda_handler(event, context):
             update_expression += ', operatorNotes = :notes'
             expression_values[':notes'] = operator_notes
         
-        # Add in_progress timestamp
-        if new_status == 'in_progress' and current_status != 'in_progress':
+        # Add in_progress timestamp (in_progress -> in_progress is not a valid transition)
+        if new_status == 'in_progress':
             update_expression += ', inProgressAt = :inProgress'
             expression_values[':inProgress'] = current_time
         
-        # Update the ticket
-        tickets_table.update_item(
-            Key={'ticketId': ticket_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_names,
-            ExpressionAttributeValues=expression_values
-        )
+        # Restart the SLA clock for active statuses, resolved/closed tickets leave the SLA index
+        if new_status in DEFAULT_SLA_SECONDS:
+            budget_attribute, default_budget = DEFAULT_SLA_SECONDS[new_status]
+            update_expression += f', slaDueAt = :now + if_not_exists({budget_attribute}, :defaultBudget)'
+            expression_values[':now'] = int(time.time())
+            expression_values[':defaultBudget'] = default_budget
+        else:
+            update_expression += ' REMOVE slaDueAt'
         
-        logger.info(f"Updated ticket {ticket_id} status to {new_status} by {user_id}")
+        # The status transition rules are enforced by DynamoDB as part of the write
+        condition_expression, condition_values = build_transition_condition(new_status, expected_version)
+        expression_values.update(condition_values)
         
-        # Send notifications
-        send_status_update_notifications(ticket, new_status, resolution, user_id, user_type, message)
+        # Append the transition to the ticket's history in the same transaction
+        history_event = {
+            'ticketId': ticket_id,
+            'eventKey': f"EVENT#{datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')}#{uuid.uuid4().hex[:8]}",
+            'eventType': 'STATUS_UPDATED',
+            'toStatus': new_status,
+            'changedBy': user_id,
+            'changedByType': user_type,
+            'changedAt': current_time
+        }
+        if operator_notes:
+            history_event['operatorNotes'] = operator_notes
+        if message:
+            history_event['resolutionMessage'] = message
+        if resolution:
+            history_event['resolution'] = resolution
+        
+        # Update the ticket and write the event in a single round trip
+        try:
+            dynamodb.transact_write_items(
+                TransactItems=[
+                    {
+                        'Update': {
+                            'TableName': TICKETS_TABLE,
+                            'Key': {'ticketId': {'S': ticket_id}},
+                            'UpdateExpression': update_expression,
+                            'ConditionExpression': condition_expression,
+                            'ExpressionAttributeNames': expression_names,
+                            'ExpressionAttributeValues': serialize(expression_values),
+                            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                        }
+                    },
+                    {
+                        'Put': {
+                            'TableName': TICKET_EVENTS_TABLE,
+                            'Item': serialize(history_event),
+                            'ConditionExpression': 'attribute_not_exists(eventKey)'
+                        }
+                    }
+                ]
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            ticket_reason = reasons[0] if reasons else {}
+            if ticket_reason.get('Code') == 'ConditionalCheckFailed':
+                return condition_failure_response(ticket_id, new_status, expected_version, ticket_reason.get('Item'))
+            # Another transaction touched the ticket at the same time
+            return response(409, {
+                'error': 'CONFLICT',
+                'message': f'Ticket {ticket_id} was modified by another update'
+            })
         
-        # Get updated ticket for response
-        updated_response = tickets_table.get_item(Key={'ticketId': ticket_id})
-        updated_ticket = updated_response['Item']
+        # Customer/operator notifications are sent from the history stream (ticket_event_notifier)
+        logger.info(f"Updated ticket {ticket_id} status to {new_status} by {user_id}")
+        
+        # A transaction cannot return the new item, so the new version is only
+        # known when the client sent the one it read
+        version = expected_version + 1 if expected_version is not None else None
         
         return response(200, {
             'message': 'Ticket updated successfully',
@@ -167,7 +209,8 @@ def lambda_handler(event, context):
                 'updatedAt': current_time,
                 'lastUpdatedBy': user_id,
                 'resolutionMessage': message if message else None,
-                'resolution': resolution if resolution else None
+                'resolution': resolution if resolution else None,
+                'version': version
             }
         })
         
@@ -184,98 +227,89 @@ def lambda_handler(event, context):
             'message': 'An unexpected error occurred'
         })
 
+# Allowed transitions, current status -> new statuses
+VALID_TRANSITIONS = {
+    'open': ['assigned', 'closed'],
+    'assigned': ['in_progress', 'resolved', 'closed'],
+    'in_progress': ['resolved', 'assigned', 'closed'],
+    'resolved': ['closed', 'in_progress'],  # Allow reopening
+    'closed': ['in_progress']  # Allow reopening
+}
+
 def is_valid_status_transition(current_status, new_status):
     """
     Validate that the status transition is allowed
     """
-    valid_transitions = {
-        'open': ['assigned', 'closed'],
-        'assigned': ['in_progress', 'resolved', 'closed'],
-        'in_progress': ['resolved', 'assigned', 'closed'],
-        'resolved': ['closed', 'in_progress'],  # Allow reopening
-        'closed': ['in_progress']  # Allow reopening
-    }
-    
-    return new_status in valid_transitions.get(current_status, [])
+    return new_status in VALID_TRANSITIONS.get(current_status, [])
 
-def send_status_update_notifications(ticket, new_status, resolution, updated_by, updater_type, resolution_message=None):
+def build_transition_condition(new_status, expected_version=None):
     """
-    Send notifications about status updates
+    Compile the transition rules for new_status into a condition expression
     """
-    if not SNS_TOPIC_ARN:
-        return
+    source_statuses = [
+        status for status, targets in VALID_TRANSITIONS.items()
+        if new_status in targets
+    ]
     
-    try:
-        ticket_id = ticket['ticketId']
-        customer_id = ticket.get('userId')
-        assigned_to = ticket.get('assignedTo')
-        
-        # Notify customer
-        if customer_id and customer_id != updated_by:
-            customer_message = {
-                'userId': customer_id,
-                'type': 'TICKET_STATUS_UPDATE',
-                'ticketId': ticket_id,
-                'newStatus': new_status,
-                'updatedBy': updater_type,
-                'message': create_customer_message(new_status, resolution, resolution_message),
-                'resolutionMessage': resolution_message if resolution_message else None
-            }
-            
-            sns.publish(
-                TopicArn=SNS_TOPIC_ARN,
-                Message=json.dumps(customer_message),
-                Subject=f'Ticket Update: {ticket_id}',
-                MessageAttributes={
-                    'userId': {'DataType': 'String', 'StringValue': customer_id},
-                    'notificationType': {'DataType': 'String', 'StringValue': 'TICKET_UPDATE'}
-                }
-            )
-        
-        # Notify assigned operator (if different from updater)
-        if assigned_to and assigned_to != updated_by:
-            operator_message = {
-                'userId': assigned_to,
-                'type': 'TICKET_STATUS_UPDATE',
-                'ticketId': ticket_id,
-                'newStatus': new_status,
-                'updatedBy': updater_type,
-                'message': f'Ticket {ticket_id} status updated to {new_status}'
-            }
-            
-            sns.publish(
-                TopicArn=SNS_TOPIC_ARN,
-                Message=json.dumps(operator_message),
-                Subject=f'Ticket Update: {ticket_id}',
-                MessageAttributes={
-                    'userId': {'DataType': 'String', 'StringValue': assigned_to},
-                    'notificationType': {'DataType': 'String', 'StringValue': 'TICKET_UPDATE'}
-                }
-            )
-        
-        logger.info(f"Sent status update notifications for ticket {ticket_id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send notifications: {str(e)}")
+    placeholders = []
+    condition_values = {}
+    for i, status in enumerate(source_statuses):
+        placeholders.append(f':from{i}')
+        condition_values[f':from{i}'] = status
+    
+    condition_expression = f"attribute_exists(ticketId) AND #status IN ({', '.join(placeholders)})"
+    
+    if expected_version is not None:
+        if expected_version == 0:
+            # Tickets written before versioning was added have no version attribute
+            condition_expression += ' AND (attribute_not_exists(#version) OR #version = :expectedVersion)'
+        else:
+            condition_expression += ' AND #version = :expectedVersion'
+        condition_values[':expectedVersion'] = expected_version
+    
+    return condition_expression, condition_values
 
-def create_customer_message(status, resolution, resolution_message=None):
+def condition_failure_response(ticket_id, new_status, expected_version, old_item):
     """
-    Create customer-friendly message based on status
+    Work out why the conditional update was rejected from the returned item
     """
-    messages = {
-        'assigned': 'Your ticket has been assigned to a support agent.',
-        'in_progress': 'Your ticket is being worked on by our support team.',
-        'resolved': f'Your ticket has been resolved. {resolution}' if resolution else 'Your ticket has been resolved.',
-        'closed': 'Your ticket has been closed.'
-    }
+    if not old_item:
+        return response(404, {
+            'error': 'TICKET_NOT_FOUND',
+            'message': f'Ticket {ticket_id} not found'
+        })
     
-    base_message = messages.get(status, f'Your ticket status has been updated to {status}.')
+    ticket = {k: deserializer.deserialize(v) for k, v in old_item.items()}
+    current_status = ticket.get('status', '').lower()
+    current_version = int(ticket.get('version', 0))
     
-    # Add resolution message for resolved tickets
-    if status == 'resolved' and resolution_message:
-        base_message += f' Resolution: {resolution_message}'
+    if expected_version is not None and current_version != expected_version:
+        return response(409, {
+            'error': 'CONFLICT',
+            'message': f'Ticket {ticket_id} was modified by another update',
+            'currentStatus': current_status,
+            'currentVersion': current_version
+        })
     
-    return base_message
+    if not is_valid_status_transition(current_status, new_status):
+        return response(400, {
+            'error': 'INVALID_STATUS_TRANSITION',
+            'message': f'Cannot transition from {current_status} to {new_status}'
+        })
+    
+    # The ticket changed between the write and this check
+    return response(409, {
+        'error': 'CONFLICT',
+        'message': f'Ticket {ticket_id} was modified by another update',
+        'currentStatus': current_status,
+        'currentVersion': current_version
+    })
+
+def serialize(values):
+    """
+    Convert plain values into DynamoDB attribute values
+    """
+    return {k: serializer.serialize(v) for k, v in values.items()}
 
 def response(status_code, body):
     """
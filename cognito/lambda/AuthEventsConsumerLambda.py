@@ -0,0 +1,80 @@
+import json
+import boto3
+import os
+
+sns_client = boto3.client('sns', region_name='ca-central-1')
+cognito_client = boto3.client('cognito-idp')
+
+# PublishBatch takes at most 10 messages
+PUBLISH_BATCH_SIZE = 10
+
+MESSAGES = {
+    'POST_AUTHENTICATION': "Successful login to DALScooter for {email}.",
+    'POST_CONFIRMATION': "Welcome to DALScooter, {email}! Your registration is complete."
+}
+
+def lambda_handler(event, context):
+    """
+    Process the events queued by PostConfirmationLambda and
+    PostAuthenticationLambda (SQS, batched).
+
+    New users are added to their group first, and only get their welcome
+    notification once that worked. Every event gets its own notification,
+    sent through SNS PublishBatch ten at a time. Failed messages are
+    returned as batchItemFailures to be retried.
+    """
+    failures = set()
+    notifications = []
+
+    for record in event['Records']:
+        try:
+            message = json.loads(record['body'])
+            if message['type'] == 'POST_CONFIRMATION':
+                # Idempotent, a retried message just finds the user in the group
+                cognito_client.admin_add_user_to_group(
+                    UserPoolId=message['userPoolId'],
+                    Username=message['userName'],
+                    GroupName=message['groupName']
+                )
+            elif message['type'] not in MESSAGES:
+                print(f"Skipping unknown auth event type {message['type']}")
+                continue
+            if message.get('email'):
+                notifications.append((record['messageId'], message['type'], message['email']))
+        except Exception as e:
+            print(f"Error processing auth event {record['messageId']}: {str(e)}")
+            failures.add(record['messageId'])
+
+    for start in range(0, len(notifications), PUBLISH_BATCH_SIZE):
+        chunk = notifications[start:start + PUBLISH_BATCH_SIZE]
+        try:
+            result = sns_client.publish_batch(
+                TopicArn=os.environ['SNS_TOPIC_ARN'],
+                PublishBatchRequestEntries=[
+                    {
+                        'Id': str(i),
+                        'Message': MESSAGES[event_type].format(email=email),
+                        'MessageAttributes': {
+                            'email': {
+                                'DataType': 'String',
+                                'StringValue': email
+                            }
+                        }
+                    }
+                    for i, (_, event_type, email) in enumerate(chunk)
+                ]
+            )
+            for failed in result.get('Failed', []):
+                print(f"Notification failed: {failed.get('Code')} {failed.get('Message')}")
+                failures.add(chunk[int(failed['Id'])][0])
+        except Exception as e:
+            print(f"Error publishing notifications: {str(e)}")
+            failures.update(message_id for message_id, _, _ in chunk)
+
+    print(json.dumps({
+        'trigger': 'AuthEventsConsumer',
+        'messages': len(event['Records']),
+        'notifications': len(notifications),
+        'failed': len(failures)
+    }))
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failures)]}
@@ -3,12 +3,28 @@ import json
 import boto3
 import random
 import os
-import hashlib
+import time
 
-dynamodb = boto3.client('dynamodb')
-TABLE_NAME = "DALScooterUsers1" 
+TABLE_NAME = os.environ.get('USERS_TABLE', 'DALScooterUsers1')
 PHRASES = ['HELLO', 'WORLD', 'PYTHON', 'LAMBDA', 'SECURE', 'SYSTEM']
 
+# Share of invocations that log a summary line, errors are always logged
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.05'))
+
+# Created on first use, the Caesar step never needs it
+dynamodb = None
+
+def get_dynamodb():
+    global dynamodb
+    if dynamodb is None:
+        dynamodb = boto3.client('dynamodb')
+    return dynamodb
+
+def log(fields, sampled=True):
+    """One compact JSON line, for a sample of invocations unless sampled is False"""
+    if not sampled or random.random() < LOG_SAMPLE_RATE:
+        print(json.dumps(fields, separators=(',', ':')))
+
 def encrypt_caesar(phrase, shift):
     """Encrypts a phrase using a Caesar cipher."""
     encrypted = ''
@@ -21,74 +37,79 @@ def encrypt_caesar(phrase, shift):
             encrypted += char
     return encrypted
 
+def get_questions(username):
+    """The user's three security questions and answers, reading only the questions map"""
+    db_response = get_dynamodb().get_item(
+        TableName=TABLE_NAME,
+        Key={'userId': {'S': username}},
+        ProjectionExpression='questions'
+    )
+    if 'Item' not in db_response:
+        raise Exception("No user found")
+    questions_map = db_response['Item']['questions']['M']
+    return [
+        {
+            "question": questions_map[f'q{i}']['S'],
+            "answer": questions_map[f'a{i}']['S']
+        }
+        for i in (1, 2, 3)
+    ]
+
 def lambda_handler(event, context):
     """
     Creates the content for the custom challenges based on the current step.
+
+    Logs one structured line for a sample of invocations (LOG_SAMPLE_RATE)
+    and for every failure. Questions, answers and clues are never logged.
     """
+    start = time.perf_counter()
+    step = None
     try:
         session = event.get('request', {}).get('session', [])
         response_params = event['response']
-        print(f"CreateAuthChallenge event: {json.dumps(event, indent=2)}")
 
         # Step 1: Create the Security Question Challenge
         if len(session) == 2:
-            print(f"CreateAuthChallenge session: {json.dumps(session, indent=2)}")
+            step = 'QUESTION_CHALLENGE'
             username = event['request']['userAttributes']['email']
-            print(f"CreateAuthChallenge username: {username}")
-            db_response = dynamodb.get_item(
-                TableName=TABLE_NAME,
-                Key={'userId': {'S': username}}
-            )
-            
-            print(f"CreateAuthChallenge DDB response: {json.dumps(db_response, indent=2)}")
-            if 'Item' not in db_response:
-                raise Exception(f"No user found for {username}")
-            questions_map = db_response['Item']['questions']['M']
-
-            questions = [
-                {
-                    "question": questions_map['q1']['S'],
-                    "answer": questions_map['a1']['S']
-                },
-                {
-                    "question": questions_map['q2']['S'],
-                    "answer": questions_map['a2']['S']
-                },
-                {
-                    "question": questions_map['q3']['S'],
-                    "answer": questions_map['a3']['S']
-                }
-            ]
-
-            
-            question_data = random.choice(questions)
-
-            print(f"CreateAuthChallenge selected question: {json.dumps(question_data, indent=2)}")
-            
+            question_data = random.choice(get_questions(username))
+
             answer_hash = question_data['answer']
-            
+
             response_params['publicChallengeParameters'] = {'question': question_data['question']}
             response_params['privateChallengeParameters'] = {'answerHash': answer_hash}
             response_params['challengeMetadata'] = 'QUESTION_CHALLENGE'
 
         # Step 2: Create the Caesar Cipher Challenge
         elif len(session) == 3:
+            step = 'CAESAR_CHALLENGE'
             phrase = random.choice(PHRASES)
             shift = random.randint(1, 5)
             clue = encrypt_caesar(phrase, shift)
-            print(f"CreateAuthChallenge Caesar Cipher phrase: {phrase}, shift: {shift}, clue: {clue}")
-           
+
             response_params['publicChallengeParameters'] = {'clue': clue, 'shift': str(shift)}
             response_params['privateChallengeParameters'] = {'answer': phrase, 'clue': clue, 'shift': str(shift)}
             response_params['challengeMetadata'] = 'CAESAR_CHALLENGE'
-        
+
         else:
              raise Exception("Invalid state for CreateAuthChallenge")
 
-        print(f"CreateAuthChallenge response: {json.dumps(event['response'], indent=2)}")
+        log({
+            'trigger': 'CreateAuthChallenge',
+            'user': event.get('userName'),
+            'step': step,
+            'durationMs': round((time.perf_counter() - start) * 1000, 2)
+        })
         return event
 
     except Exception as e:
-        print(f"Error in CreateAuthChallenge: {str(e)}")
+        log({
+            'trigger': 'CreateAuthChallenge',
+            'user': event.get('userName'),
+            'step': step,
+            'sessionLength': len(event.get('request', {}).get('session', [])),
+            'error': str(e),
+            'durationMs': round((time.perf_counter() - start) * 1000, 2)
+        }, sampled=False)
         event['response']['failAuthentication'] = True
-        return event
\ No newline at end of file
+        return event
@@ -1,25 +1,135 @@
 import json
+import boto3
+import random
+import os
+import time
+
+COUNTERS_TABLE = os.environ.get('AUTH_FAILURE_COUNTERS_TABLE', 'auth-failure-counters-dev')
+AUTH_OUTCOMES_QUEUE_URL = os.environ.get('AUTH_OUTCOMES_QUEUE_URL')
+
+# Must stay in sync with security/lambda/AuthOutcomeConsumerLambda.py
+WINDOW_SECONDS = int(os.environ.get('FAILURE_WINDOW_SECONDS', '900'))
+USER_FAILURE_LIMIT = int(os.environ.get('USER_FAILURE_LIMIT', '5'))
+
+# How long a warm container remembers a subject it found over its limit
+BLOCK_CACHE_SECONDS = 60
+
+# Share of invocations that log a summary line, failures are always logged
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.05'))
+
+# Created on first use
+dynamodb = None
+sqs = None
+
+# User subject -> time until which it is known to be over its limit
+blocked_until = {}
+
+def get_dynamodb():
+    global dynamodb
+    if dynamodb is None:
+        dynamodb = boto3.client('dynamodb')
+    return dynamodb
+
+def get_sqs():
+    global sqs
+    if sqs is None:
+        sqs = boto3.client('sqs')
+    return sqs
+
+def log(fields, sampled=True):
+    """One compact JSON line, for a sample of invocations unless sampled is False"""
+    if not sampled or random.random() < LOG_SAMPLE_RATE:
+        print(json.dumps(fields, separators=(',', ':')))
+
+def emit(outcome, event, **fields):
+    """
+    Queue a compact auth outcome for AuthOutcomeConsumerLambda. A failed
+    send is logged and never fails the login.
+    """
+    # Must stay in sync with VerifyAuthChallengeResponseLambda
+    if not AUTH_OUTCOMES_QUEUE_URL:
+        return
+    body = dict({'outcome': outcome, 'user': event.get('userName'), 'at': round(time.time(), 3)}, **fields)
+    try:
+        get_sqs().send_message(QueueUrl=AUTH_OUTCOMES_QUEUE_URL, MessageBody=json.dumps(body, separators=(',', ':')))
+    except Exception as e:
+        log({'trigger': 'DefineAuthChallenge', 'user': event.get('userName'), 'error': f"Could not queue auth outcome: {str(e)}"}, sampled=False)
+
+def over_limit(event):
+    """
+    The subject (user#<name>) if the user is over its failure limit, or
+    None. Reads the current and previous window of the counter in one
+    BatchGetItem and weighs the previous window by how much of it still
+    overlaps the sliding window.
+
+    Limits are per user only. The trigger has no trusted client address,
+    clientMetadata is whatever the client sends, so a per-source limit
+    keyed on it could be dodged by forging or omitting it.
+    """
+    now = time.time()
+    subject = f"user#{event['userName']}"
+    if blocked_until.get(subject, 0) > now:
+        return subject
+
+    bucket = int(now // WINDOW_SECONDS) * WINDOW_SECONDS
+    keys = [f"{subject}#{start}" for start in (bucket, bucket - WINDOW_SECONDS)]
+    result = get_dynamodb().batch_get_item(RequestItems={
+        COUNTERS_TABLE: {
+            'Keys': [{'counterKey': {'S': key}} for key in keys],
+            'ProjectionExpression': 'counterKey, failures'
+        }
+    })
+    counts = {
+        item['counterKey']['S']: int(item['failures']['N'])
+        for item in result.get('Responses', {}).get(COUNTERS_TABLE, [])
+    }
+
+    overlap = 1 - (now - bucket) / WINDOW_SECONDS
+    failures = counts.get(f"{subject}#{bucket}", 0) + counts.get(f"{subject}#{bucket - WINDOW_SECONDS}", 0) * overlap
+    if failures >= USER_FAILURE_LIMIT:
+        blocked_until[subject] = now + BLOCK_CACHE_SECONDS
+        return subject
+    return None
 
 def lambda_handler(event, context):
     """
     Controls the sequence of authentication challenges.
     Flow: SRP/Password -> Question Challenge -> Caesar Challenge -> Success
+
+    Before the password check a user with too many recent failures (see security/lambda/AuthOutcomeConsumerLambda.py) is failed
+    right away. The counters are read fail-open. Password failures and
+    issued tokens are queued as auth outcomes, wrong answers are queued
+    by VerifyAuthChallengeResponseLambda.
     """
     try:
         session = event.get('request', {}).get('session', [])
-        print(f"DefineAuthChallenge event: {json.dumps(event, indent=2)}")
 
         response = {
             'issueTokens': False,
             'failAuthentication': False
         }
+        outcome = None
 
+        failed = next((s for s in session if not s.get('challengeResult', False)), None)
         # Check if any previous challenge failed. If so, end the flow.
-        if any(not s.get('challengeResult', False) for s in session):
+        if failed:
             response['failAuthentication'] = True
+            outcome = 'FAILURE'
+            if failed.get('challengeName') != 'CUSTOM_CHALLENGE':
+                emit('FAILURE', event, step=failed.get('challengeName'))
         # After successful SRP (Secure Remote Password) verification, start password check.
         elif len(session) == 1 and session[0]['challengeName'] == 'SRP_A':
-            response['challengeName'] = 'PASSWORD_VERIFIER'
+            try:
+                subject = over_limit(event)
+            except Exception as e:
+                subject = None
+                log({'trigger': 'DefineAuthChallenge', 'user': event.get('userName'), 'error': f"Could not read failure counters: {str(e)}"}, sampled=False)
+            if subject:
+                response['failAuthentication'] = True
+                outcome = 'BLOCKED'
+                emit('BLOCKED', event, subject=subject)
+            else:
+                response['challengeName'] = 'PASSWORD_VERIFIER'
         # After successful password check, issue the first custom challenge (Question).
         elif len(session) == 2 and session[1]['challengeName'] == 'PASSWORD_VERIFIER':
             response['challengeName'] = 'CUSTOM_CHALLENGE'
@@ -29,15 +139,24 @@ def lambda_handler(event, context):
         # After successful Caesar challenge, authentication is complete. Issue tokens.
         elif len(session) == 4 and session[3]['challengeName'] == 'CUSTOM_CHALLENGE':
             response['issueTokens'] = True
+            outcome = 'SUCCESS'
+            emit('SUCCESS', event)
         # If the flow reaches an unexpected state, fail authentication.
         else:
             response['failAuthentication'] = True
+            outcome = 'INVALID_STATE'
 
         event['response'] = response
-        print(f"DefineAuthChallenge response: {json.dumps(event['response'], indent=2)}")
+        log({
+            'trigger': 'DefineAuthChallenge',
+            'user': event.get('userName'),
+            'sessionLength': len(session),
+            'challenge': response.get('challengeName'),
+            'outcome': outcome
+        }, sampled=outcome in (None, 'SUCCESS'))
         return event
 
     except Exception as e:
-        print(f"Error in DefineAuthChallenge: {e}")
+        log({'trigger': 'DefineAuthChallenge', 'user': event.get('userName'), 'error': str(e)}, sampled=False)
         event['response'] = {'issueTokens': False, 'failAuthentication': True}
-        return event
\ No newline at end of file
+        return event
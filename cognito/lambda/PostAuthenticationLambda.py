@@ -1,25 +1,28 @@
 import json
 import boto3
 import os
+from datetime import datetime
 from botocore.exceptions import ClientError
 
-sns_client = boto3.client('sns', region_name='ca-central-1')
+sqs_client = boto3.client('sqs', region_name='ca-central-1')
 
 def lambda_handler(event, context):
+    """
+    Queue the login notification for AuthEventsConsumerLambda instead of
+    publishing it here, so a login only waits on one enqueue. A failed
+    enqueue is logged and does not fail the login.
+    """
     try:
         email = event['request']['userAttributes']['email']
-        sns_client.publish(
-            TopicArn=os.environ['SNS_TOPIC_ARN'],
-            Message=f"Successful login to DALScooter for {email}.",
-            MessageAttributes={
-                'email': {
-                    'DataType': 'String',
-                    'StringValue': email
-                }
-            }
+        sqs_client.send_message(
+            QueueUrl=os.environ['AUTH_EVENTS_QUEUE_URL'],
+            MessageBody=json.dumps({
+                'type': 'POST_AUTHENTICATION',
+                'email': email,
+                'userName': event['userName'],
+                'occurredAt': datetime.utcnow().isoformat() + 'Z'
+            })
         )
-        return event
-
-    except ClientError as e:
-        print(f"Error: {str(e)}")
-        raise e
\ No newline at end of file
+    except (ClientError, KeyError) as e:
+        print(f"Error queueing login notification: {str(e)}")
+    return event
@@ -1,45 +1,51 @@
 import json
 import boto3
 import os
+from datetime import datetime
 
-sns_client = boto3.client('sns', region_name='ca-central-1')
+sqs_client = boto3.client('sqs', region_name='ca-central-1')
 cognito_client = boto3.client('cognito-idp')
 
+def group_for(user_attributes):
+    """Cognito group of a new user, by its userType"""
+    # Get userType from userAttributes (adjust if you store elsewhere)
+    user_type = user_attributes.get('custom:userType') or user_attributes.get('userType')
+    if user_type == 'franchise_operator':
+        return "FranchiseOperators"
+    # Default group
+    return "Customers"
+
 def lambda_handler(event, context):
+    """
+    Queue the group assignment and welcome notification for
+    AuthEventsConsumerLambda. If the queue cannot be reached the user is
+    still added to their group here, only the welcome message is skipped.
+    """
     try:
         user_attributes = event['request']['userAttributes']
         email = user_attributes.get('email')
         username = event['userName']
         user_pool_id = event['userPoolId']
 
-        # Get userType from userAttributes (adjust if you store elsewhere)
-        user_type = user_attributes.get('custom:userType') or user_attributes.get('userType')
-
-        # Decide the group based on userType
-        if user_type == 'franchise_operator':
-            group_name = "FranchiseOperators"
-        else:
-            # Default group
-            group_name = "Customers"
-
-        # Add user to the group dynamically
-        cognito_client.admin_add_user_to_group(
-            UserPoolId=user_pool_id,
-            Username=username,
-            GroupName=group_name
-        )
-
-        # Send welcome notification
-        sns_client.publish(
-            TopicArn=os.environ['SNS_TOPIC_ARN'],
-            Message=f"Welcome to DALScooter, {email}! Your registration is complete.",
-            MessageAttributes={
-                'email': {
-                    'DataType': 'String',
-                    'StringValue': email
-                }
-            }
-        )
+        try:
+            sqs_client.send_message(
+                QueueUrl=os.environ['AUTH_EVENTS_QUEUE_URL'],
+                MessageBody=json.dumps({
+                    'type': 'POST_CONFIRMATION',
+                    'email': email,
+                    'userName': username,
+                    'userPoolId': user_pool_id,
+                    'groupName': group_for(user_attributes),
+                    'occurredAt': datetime.utcnow().isoformat() + 'Z'
+                })
+            )
+        except Exception as e:
+            print(f"Error queueing PostConfirmation event, adding to group directly: {str(e)}")
+            cognito_client.admin_add_user_to_group(
+                UserPoolId=user_pool_id,
+                Username=username,
+                GroupName=group_for(user_attributes)
+            )
 
         return event
 
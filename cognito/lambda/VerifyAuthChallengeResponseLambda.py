@@ -1,6 +1,42 @@
-     
 import json
+import boto3
 import hashlib
+import random
+import os
+import time
+
+AUTH_OUTCOMES_QUEUE_URL = os.environ.get('AUTH_OUTCOMES_QUEUE_URL')
+
+# Share of invocations that log a summary line, wrong answers are always logged
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.05'))
+
+# Created on first use, a correct answer never needs it
+sqs = None
+
+def get_sqs():
+    global sqs
+    if sqs is None:
+        sqs = boto3.client('sqs')
+    return sqs
+
+def log(fields, sampled=True):
+    """One compact JSON line, for a sample of invocations unless sampled is False"""
+    if not sampled or random.random() < LOG_SAMPLE_RATE:
+        print(json.dumps(fields, separators=(',', ':')))
+
+def emit(outcome, event, **fields):
+    """
+    Queue a compact auth outcome for AuthOutcomeConsumerLambda. A failed
+    send is logged and never fails the login.
+    """
+    # Must stay in sync with DefineAuthChallengeLambda
+    if not AUTH_OUTCOMES_QUEUE_URL:
+        return
+    body = dict({'outcome': outcome, 'user': event.get('userName'), 'at': round(time.time(), 3)}, **fields)
+    try:
+        get_sqs().send_message(QueueUrl=AUTH_OUTCOMES_QUEUE_URL, MessageBody=json.dumps(body, separators=(',', ':')))
+    except Exception as e:
+        log({'trigger': 'VerifyAuthChallengeResponse', 'user': event.get('userName'), 'error': f"Could not queue auth outcome: {str(e)}"}, sampled=False)
 
 def caesar_decrypt(ciphertext, shift):
     decrypted = ''
@@ -11,24 +47,36 @@ def caesar_decrypt(ciphertext, shift):
         else:
             decrypted += char
     return decrypted
- 
+
 def lambda_handler(event, context):
-    print(event)
+    """
+    Checks the answer to the current custom challenge. A wrong answer is
+    queued as a FAILURE auth outcome for the failure counters. Answers and
+    challenge parameters are never logged.
+    """
     response_answer = event['request']['challengeAnswer']
     private_params = event['request']['privateChallengeParameters']
 
     if "answerHash" in private_params:
+        step = 'QUESTION_CHALLENGE'
         expected_hash = hashlib.sha256(private_params['answerHash'].encode()).hexdigest()
         provided_hash = hashlib.sha256(response_answer.encode()).hexdigest()
-        print("expected_hash", expected_hash)
-        print("provided_hash", provided_hash)
         event['response']['answerCorrect'] = expected_hash == provided_hash
     else:
-        print("private params", private_params)
+        step = 'CAESAR_CHALLENGE'
         expected_shift = int(private_params['shift'])
         provided_answer = response_answer
         clue = private_params['clue']
         expected_answer = caesar_decrypt(clue, expected_shift)
         event['response']['answerCorrect'] = expected_answer == provided_answer
 
-    return event
\ No newline at end of file
+    correct = event['response']['answerCorrect']
+    if not correct:
+        emit('FAILURE', event, step=step)
+    log({
+        'trigger': 'VerifyAuthChallengeResponse',
+        'user': event.get('userName'),
+        'step': step,
+        'answerCorrect': correct
+    }, sampled=correct)
+    return event
@@ -12,6 +12,14 @@ provider "aws" {
   region = var.aws_region
 }
 
+# Shared with the BigQuery tables in infrastructure/gcp
+locals {
+  export_schemas = {
+    for table in ["users", "feedback", "bikes"] :
+    table => jsondecode(file("${path.module}/../../../../monitoring/schemas/${table}.json"))
+  }
+}
+
 module "export_s3" {
   source      = "../../modules/s3"
   bucket_name = var.export_bucket_name
@@ -33,6 +41,10 @@ module "dynamodb_export_lambda_DBScooterUsers1" {
   dynamodb_table_arn  = var.dynamodb_table_arn_DALScooterUsers1
   s3_bucket_name      = module.export_s3.bucket_name
   s3_bucket_arn       = "arn:aws:s3:::${module.export_s3.bucket_name}"
+  export_mode         = "incremental"
+  export_format       = "ndjson.gz"
+  export_schema       = local.export_schemas.users
+  watermark_attributes = "createdAt"
   schedule_expression = var.schedule_expression
   lambda_timeout      = var.lambda_timeout
   environment = var.environment
@@ -47,6 +59,10 @@ module "dynamodb_export_lambda_feedback-table-dev" {
   dynamodb_table_arn  = var.dynamodb_table_arn_feedback-table-dev
   s3_bucket_name      = module.export_s3.bucket_name
   s3_bucket_arn       = "arn:aws:s3:::${module.export_s3.bucket_name}"
+  export_mode         = "incremental"
+  export_format       = "ndjson.gz"
+  export_schema       = local.export_schemas.feedback
+  watermark_attributes = "updatedAt,submittedAt"
   schedule_expression = var.schedule_expression
   lambda_timeout      = var.lambda_timeout
   environment = var.environment
@@ -61,6 +77,10 @@ module "dynamodb_export_lambda_bikes-table-dev" {
   dynamodb_table_arn  = var.dynamodb_table_arn_bikes_table-dev
   s3_bucket_name      = module.export_s3.bucket_name
   s3_bucket_arn       = "arn:aws:s3:::${module.export_s3.bucket_name}"
+  export_mode         = "incremental"
+  export_format       = "ndjson.gz"
+  export_schema       = local.export_schemas.bikes
+  watermark_attributes = "updatedAt"
   schedule_expression = var.schedule_expression
   lambda_timeout      = var.lambda_timeout
   environment = var.environment
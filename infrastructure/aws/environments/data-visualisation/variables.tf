@@ -58,9 +58,9 @@ variable "dynamodb_table_arn_bikes_table-dev" {
   default     = "arn:aws:dynamodb:ca-central-1:796973501829:table/bikes-table-dev"
 }
 variable "schedule_expression" {
-  description = "Schedule for the export Lambda (rate or cron expression)"
+  description = "Schedule for the export Lambda (rate or cron expression), each run exports a delta"
   type        = string
-  default     = "rate(7 days)" 
+  default     = "rate(1 day)"
 }
 
 variable "lambda_timeout" {
@@ -43,6 +43,12 @@ module "lex" {
   sns_topic_arn       = module.sns.sns_topic_arn
   bookings_table_arn  = module.dynamodb.bookings_table_arn
 }
+module "security" {
+  source        = "../../modules/security"
+  region        = "ca-central-1"
+  project_name  = var.project_name
+  environment   = var.environment
+}
 module "cognito" {
   source            = "../../modules/cognito"
   region            = "ca-central-1"
@@ -51,6 +57,10 @@ module "cognito" {
   project_name      = var.project_name
   environment       = var.environment
   bookings_table_arn = module.dynamodb.bookings_table_arn
+  auth_outcomes_queue_url          = module.security.auth_outcomes_queue_url
+  auth_outcomes_queue_arn          = module.security.auth_outcomes_queue_arn
+  auth_failure_counters_table_name = module.security.auth_failure_counters_table_name
+  auth_failure_counters_table_arn  = module.security.auth_failure_counters_table_arn
 }
 
 module "api_gateway" {
@@ -65,6 +75,14 @@ module "api_gateway" {
   booking_requests_queue_arn    = module.sns.booking_requests_queue_arn
   ticket_assignment_sns_topic_arn = module.sns.ticket_assignment_sns_topic_arn
   ticket_processing_queue_arn     = module.sns.ticket_processing_queue_arn
+  feedback_sentiment_queue_url    = module.sns.feedback_sentiment_queue_url
+  feedback_sentiment_queue_arn    = module.sns.feedback_sentiment_queue_arn
+  image_derivatives_queue_url     = module.sns.image_derivatives_queue_url
+  image_derivatives_queue_arn     = module.sns.image_derivatives_queue_arn
+  bike_cleanup_queue_url          = module.sns.bike_cleanup_queue_url
+  bike_cleanup_queue_arn          = module.sns.bike_cleanup_queue_arn
+  stream_failures_dlq_arn         = module.sns.stream_failures_dlq_arn
+  pillow_layer_arn                = var.pillow_layer_arn
 }
 
 
@@ -26,4 +26,9 @@ variable "user_pool_name" {
 variable "sns_topic_name" {
   description = "Name of the SNS Topic"
   default     = "DALScooterNotifications"
-}
\ No newline at end of file
+}
+variable "pillow_layer_arn" {
+  description = "Pillow layer for the image derivatives lambda, the public Klayers build for python3.9 in ca-central-1"
+  type        = string
+  default     = "arn:aws:lambda:ca-central-1:770693421928:layer:Klayers-p39-pillow:1"
+}
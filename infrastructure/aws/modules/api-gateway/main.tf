@@ -25,10 +25,30 @@ data "aws_dynamodb_table" "feedback_table" {
   name = "feedback-table-${var.environment}"
 }
 
+data "aws_dynamodb_table" "bike_rating_rollups_table" {
+  name = "bike-rating-rollups-${var.environment}"
+}
+
+data "aws_dynamodb_table" "sentiment_cache_table" {
+  name = "sentiment-cache-${var.environment}"
+}
+
+data "aws_dynamodb_table" "feedback_daily_stats_table" {
+  name = "feedback-daily-stats-${var.environment}"
+}
+
 data "aws_dynamodb_table" "tickets_table" {
   name = "tickets-table-${var.environment}"
 }
 
+data "aws_dynamodb_table" "ticket_search_index_table" {
+  name = "ticket-search-index-${var.environment}"
+}
+
+data "aws_dynamodb_table" "ticket_events_table" {
+  name = "ticket-events-${var.environment}"
+}
+
 data "aws_dynamodb_table" "availability_table" {
   name = "${var.environment}-availability-table"
 }
@@ -69,6 +89,31 @@ resource "aws_s3_bucket_policy" "bike_images_policy" {
   })
 }
 
+# Browsers upload bike images straight to the bucket with presigned POSTs
+resource "aws_s3_bucket_cors_configuration" "bike_images" {
+  bucket = aws_s3_bucket.bike_images.id
+
+  cors_rule {
+    allowed_methods = ["POST"]
+    allowed_origins = ["*"]
+    allowed_headers = ["*"]
+    max_age_seconds = 3000
+  }
+}
+
+# Uploaded images are validated once they land
+resource "aws_s3_bucket_notification" "bike_images" {
+  bucket = aws_s3_bucket.bike_images.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.image-upload-validator.arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_prefix       = "uploads/"
+  }
+
+  depends_on = [aws_lambda_permission.image_upload_validator_s3]
+}
+
 # IAM Roles and Policies
 resource "aws_iam_role" "lambda_execution_role" {
   name = "DALScooterLambdaInvocationRole-${var.environment}"
@@ -108,7 +153,9 @@ resource "aws_iam_policy" "lambda_policy" {
           "dynamodb:Query",
           "dynamodb:Scan", 
           "dynamodb:UpdateItem",
-          "dynamodb:DeleteItem"
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           data.aws_dynamodb_table.bikes_table.arn,
@@ -117,14 +164,35 @@ resource "aws_iam_policy" "lambda_policy" {
           "${data.aws_dynamodb_table.bookings_table.arn}/index/*",
           data.aws_dynamodb_table.feedback_table.arn,
           "${data.aws_dynamodb_table.feedback_table.arn}/index/*",
+          data.aws_dynamodb_table.bike_rating_rollups_table.arn,
+          "${data.aws_dynamodb_table.bike_rating_rollups_table.arn}/index/*",
+          data.aws_dynamodb_table.sentiment_cache_table.arn,
+          data.aws_dynamodb_table.feedback_daily_stats_table.arn,
           data.aws_dynamodb_table.tickets_table.arn,
           "${data.aws_dynamodb_table.tickets_table.arn}/index/*",
+          data.aws_dynamodb_table.ticket_search_index_table.arn,
+          data.aws_dynamodb_table.ticket_events_table.arn,
           data.aws_dynamodb_table.availability_table.arn,
           "${data.aws_dynamodb_table.availability_table.arn}/index/*",
           data.aws_dynamodb_table.users_table.arn,
           "${data.aws_dynamodb_table.users_table.arn}/index/*"
         ]
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:DescribeStream",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [
+          "${data.aws_dynamodb_table.tickets_table.arn}/stream/*",
+          "${data.aws_dynamodb_table.ticket_events_table.arn}/stream/*",
+          "${data.aws_dynamodb_table.bikes_table.arn}/stream/*",
+          "${data.aws_dynamodb_table.bike_rating_rollups_table.arn}/stream/*"
+        ]
+      },
       {
         Effect = "Allow"
         Action = [
@@ -137,12 +205,25 @@ resource "aws_iam_policy" "lambda_policy" {
         Action = [
           "s3:PutObject",
           "s3:PutObjectAcl",
-          "s3:GetObject"
+          "s3:GetObject",
+          "s3:DeleteObject",
+          "s3:GetObjectTagging",
+          "s3:PutObjectTagging"
         ]
         Resource = [
           "arn:aws:s3:::dalscooter-bike-images-${var.environment}/*"
         ]
       },
+      {
+        # Lets a missing catalog snapshot read as 404 rather than 403
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = [
+          "arn:aws:s3:::dalscooter-bike-images-${var.environment}"
+        ]
+      },
       {
         Effect = "Allow"
         Action = [
@@ -153,6 +234,14 @@ resource "aws_iam_policy" "lambda_policy" {
           var.ticket_assignment_sns_topic_arn
         ]
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "comprehend:DetectSentiment",
+          "comprehend:BatchDetectSentiment"
+        ]
+        Resource = "*"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -189,39 +278,185 @@ locals {
 # ===========================
 # Lambda Functions for Bike Management
 # ===========================
+# Zipped with the shared bike_images module
+data "archive_file" "create_bike" {
+  type        = "zip"
+  output_path = "${path.module}/create_bike.py.zip"
+  source {
+    content  = file("${path.module}/../../../../backend/lambda_functions/bikes/create_bike.py")
+    filename = "create_bike.py"
+  }
+  source {
+    content  = file("${path.module}/../../../../backend/lambda_functions/bikes/bike_images.py")
+    filename = "bike_images.py"
+  }
+}
+
 resource "aws_lambda_function" "create-bike" {
-  filename      = "../../../../backend/lambda_functions/bikes/create_bike.py.zip"
+  filename      = data.archive_file.create_bike.output_path
   function_name = "create-bike-${var.environment}"
   role          = aws_iam_role.lambda_execution_role.arn
   handler       = "create_bike.lambda_handler"
   runtime       = "python3.9"
-  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/create_bike.py.zip")
+  source_code_hash = data.archive_file.create_bike.output_base64sha256
   environment {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}"
       BIKE_IMAGES_BUCKET = aws_s3_bucket.bike_images.bucket
       AVAILABILITY_TABLE = "${var.environment}-availability-table"
+      DERIVATIVES_QUEUE_URL = var.image_derivatives_queue_url
     }
   }
   tags = local.common_tags
 }
 
+# Zipped with the shared bike_images module
+data "archive_file" "update_bike" {
+  type        = "zip"
+  output_path = "${path.module}/update_bike.py.zip"
+  source {
+    content  = file("${path.module}/../../../../backend/lambda_functions/bikes/update_bike.py")
+    filename = "update_bike.py"
+  }
+  source {
+    content  = file("${path.module}/../../../../backend/lambda_functions/bikes/bike_images.py")
+    filename = "bike_images.py"
+  }
+}
+
 resource "aws_lambda_function" "update-bike" {
-  filename      = "../../../../backend/lambda_functions/bikes/update_bike.py.zip"
+  filename      = data.archive_file.update_bike.output_path
   function_name = "update-bike-${var.environment}"
   role          = aws_iam_role.lambda_execution_role.arn
   handler       = "update_bike.lambda_handler"
   runtime       = "python3.9"
-  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/update_bike.py.zip")
+  source_code_hash = data.archive_file.update_bike.output_base64sha256
   environment {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}"
       BIKE_IMAGES_BUCKET = aws_s3_bucket.bike_images.bucket
+      DERIVATIVES_QUEUE_URL = var.image_derivatives_queue_url
     }
   }
   tags = local.common_tags
 }
 
+# A franchise's own bikes with today's slots and ratings
+resource "aws_lambda_function" "get-franchise-fleet" {
+  filename         = "../../../../backend/lambda_functions/bikes/get_franchise_fleet.py.zip"
+  function_name    = "get-franchise-fleet-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "get_franchise_fleet.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/get_franchise_fleet.py.zip")
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      BIKES_FRANCHISE_INDEX = "franchiseId-bikeId-index"
+      AVAILABILITY_TABLE = "${var.environment}-availability-table"
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}"
+    }
+  }
+  tags = local.common_tags
+}
+
+# Imports a CSV/NDJSON manifest of bikes with batched reads and writes
+resource "aws_lambda_function" "import-bikes" {
+  filename         = "../../../../backend/lambda_functions/bikes/import_bikes.py.zip"
+  function_name    = "import-bikes-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "import_bikes.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/import_bikes.py.zip")
+  timeout          = 60
+  memory_size      = 512
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      AVAILABILITY_TABLE = "${var.environment}-availability-table"
+      MAX_IMPORT_ROWS = "1000"
+    }
+  }
+  tags = local.common_tags
+}
+
+# Issues presigned POSTs for direct image uploads
+resource "aws_lambda_function" "create-image-upload" {
+  filename         = "../../../../backend/lambda_functions/bikes/create_image_upload.py.zip"
+  function_name    = "create-image-upload-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "create_image_upload.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/create_image_upload.py.zip")
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      BIKE_IMAGES_BUCKET = aws_s3_bucket.bike_images.bucket
+      MAX_IMAGE_BYTES = "10485760"
+      UPLOAD_URL_EXPIRY_SECONDS = "900"
+    }
+  }
+  tags = local.common_tags
+}
+
+# Checks uploads/ objects and marks the bike's image READY or REJECTED
+resource "aws_lambda_function" "image-upload-validator" {
+  filename         = "../../../../backend/lambda_functions/bikes/image_upload_validator.py.zip"
+  function_name    = "image-upload-validator-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "image_upload_validator.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/image_upload_validator.py.zip")
+  timeout          = 30
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      MAX_IMAGE_BYTES = "10485760"
+      DERIVATIVES_QUEUE_URL = var.image_derivatives_queue_url
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_permission" "image_upload_validator_s3" {
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.image-upload-validator.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.bike_images.arn
+}
+
+# Generates thumbnail and medium WebP derivatives of bike images, Pillow comes from a layer
+resource "aws_lambda_function" "image-derivatives" {
+  filename         = "../../../../backend/lambda_functions/bikes/image_derivatives.py.zip"
+  function_name    = "image-derivatives-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "image_derivatives.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/image_derivatives.py.zip")
+  timeout          = 60
+  memory_size      = 1024
+  layers           = [var.pillow_layer_arn]
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      BIKE_IMAGES_BUCKET = aws_s3_bucket.bike_images.bucket
+      DERIVATIVE_FORMAT = "webp"
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_event_source_mapping" "image_derivatives_sqs" {
+  event_source_arn = var.image_derivatives_queue_arn
+  function_name    = aws_lambda_function.image-derivatives.function_name
+  batch_size       = 10
+  maximum_batching_window_in_seconds = 5
+  enabled          = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
 resource "aws_lambda_function" "get-bike" {
   filename         = "../../../../backend/lambda_functions/bikes/get_bike.py.zip"
   function_name    = "get-bike-${var.environment}"
@@ -232,6 +467,7 @@ resource "aws_lambda_function" "get-bike" {
   environment {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}"
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}"
     }
   }
   tags = local.common_tags
@@ -247,10 +483,75 @@ resource "aws_lambda_function" "get-all-bikes" {
   environment {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}"
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}"
+      BIKES_FRANCHISE_INDEX = "franchiseId-bikeId-index"
+      BIKES_TYPE_INDEX = "type-hourlyRate-index"
+      CATALOG_BUCKET = aws_s3_bucket.bike_images.bucket
+      CATALOG_KEY = "catalog/bikes.json"
+      CATALOG_CACHE_SECONDS = "30"
     }
   }
   tags = local.common_tags
 }
+
+# Applies bike and rating rollup changes to the catalog snapshot served by get-all-bikes
+resource "aws_lambda_function" "bike-catalog-snapshot" {
+  filename         = "../../../../backend/lambda_functions/bikes/catalog_snapshot.py.zip"
+  function_name    = "bike-catalog-snapshot-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "catalog_snapshot.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/catalog_snapshot.py.zip")
+  timeout          = 120
+  memory_size      = 512
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}"
+      CATALOG_BUCKET = aws_s3_bucket.bike_images.bucket
+      CATALOG_KEY = "catalog/bikes.json"
+    }
+  }
+  tags = local.common_tags
+}
+
+# One snapshot write per batch, rating changes arrive in bursts so wait for more of them
+resource "aws_lambda_event_source_mapping" "bike_catalog_bikes_stream" {
+  event_source_arn  = data.aws_dynamodb_table.bikes_table.stream_arn
+  function_name     = aws_lambda_function.bike-catalog-snapshot.function_name
+  starting_position = "LATEST"
+  batch_size        = 100
+  enabled           = true
+
+  # Retry a failing batch a few times, halving it to isolate the bad record,
+  # then record it in the DLQ and move on instead of blocking the shard
+  maximum_retry_attempts         = 5
+  bisect_batch_on_function_error = true
+  destination_config {
+    on_failure {
+      destination_arn = var.stream_failures_dlq_arn
+    }
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "bike_catalog_rollups_stream" {
+  event_source_arn                   = data.aws_dynamodb_table.bike_rating_rollups_table.stream_arn
+  function_name                      = aws_lambda_function.bike-catalog-snapshot.function_name
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 30
+  enabled                            = true
+
+  # Retry a failing batch a few times, halving it to isolate the bad record,
+  # then record it in the DLQ and move on instead of blocking the shard
+  maximum_retry_attempts         = 5
+  bisect_batch_on_function_error = true
+  destination_config {
+    on_failure {
+      destination_arn = var.stream_failures_dlq_arn
+    }
+  }
+}
 resource "aws_lambda_function" "delete-bike" {
   filename         = "../../../../backend/lambda_functions/bikes/delete_bike.py.zip"
   function_name    = "delete-bike-${var.environment}"
@@ -261,11 +562,44 @@ resource "aws_lambda_function" "delete-bike" {
   environment {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}"
+      BIKE_CLEANUP_QUEUE_URL = var.bike_cleanup_queue_url
     }
   }
   tags = local.common_tags
 }
 
+# Cancels a deleted bike's bookings and removes its availability rows and images
+resource "aws_lambda_function" "delete-bike-cascade" {
+  filename         = "../../../../backend/lambda_functions/bikes/delete_bike_cascade.py.zip"
+  function_name    = "delete-bike-cascade-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "delete_bike_cascade.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/bikes/delete_bike_cascade.py.zip")
+  timeout          = 300
+  environment {
+    variables = {
+      BIKES_TABLE = "bikes-table-${var.environment}"
+      BOOKINGS_TABLE = "bookings-table-${var.environment}"
+      BOOKINGS_BIKE_INDEX = "bikeId-bookingDate-index"
+      AVAILABILITY_TABLE = "${var.environment}-availability-table"
+      AVAILABILITY_BIKE_INDEX = "originalBikeId-index"
+      BIKE_IMAGES_BUCKET = aws_s3_bucket.bike_images.bucket
+      SNS_TOPIC_ARN = var.sns_topic_arn
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_event_source_mapping" "delete_bike_cascade_sqs" {
+  event_source_arn = var.bike_cleanup_queue_arn
+  function_name    = aws_lambda_function.delete-bike-cascade.function_name
+  batch_size       = 1
+  enabled          = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
 # Lambda Functions for Booking/Availability
 resource "aws_lambda_function" "get-availability" {
   filename         = "../../../../backend/lambda_functions/availability/get_availability.py.zip"
@@ -420,11 +754,47 @@ resource "aws_lambda_function" "submit-feedback" {
     variables = {
       BIKES_TABLE = "bikes-table-${var.environment}",
       FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}",
+      SENTIMENT_QUEUE_URL = var.feedback_sentiment_queue_url,
+      SENTIMENT_CACHE_TABLE = "sentiment-cache-${var.environment}",
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+    }
+  }
+  tags = local.common_tags
+}
+
+# Scores feedback comments queued by submit-feedback in batches
+resource "aws_lambda_function" "feedback-sentiment-processor" {
+  filename         = "../../../../backend/lambda_functions/feedback/sentiment_processor.py.zip"
+  function_name    = "feedback-sentiment-processor-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "sentiment_processor.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/feedback/sentiment_processor.py.zip")
+  timeout          = 60
+  environment {
+    variables = {
+      FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      SENTIMENT_CACHE_TABLE = "sentiment-cache-${var.environment}",
+      SENTIMENT_CACHE_TTL_DAYS = "30",
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+      SENTIMENT_BACKEND = "comprehend"
     }
   }
   tags = local.common_tags
 }
 
+resource "aws_lambda_event_source_mapping" "feedback_sentiment_sqs" {
+  event_source_arn = var.feedback_sentiment_queue_arn
+  function_name    = aws_lambda_function.feedback-sentiment-processor.function_name
+  # Collect up to four full BatchDetectSentiment calls per invocation
+  batch_size       = 100
+  maximum_batching_window_in_seconds = 10
+  enabled          = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
 resource "aws_lambda_function" "get-bike-feedback" {
   filename         = "../../../../backend/lambda_functions/feedback/get_feedback_by_bike.py.zip"
   function_name    = "getBikeFeedbackLambda-${var.environment}"
@@ -435,6 +805,8 @@ resource "aws_lambda_function" "get-bike-feedback" {
   environment {
     variables = {
       FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}",
+      FEEDBACK_BIKE_INDEX = "bikeId-submittedAt-index",
     }
   }
   tags = local.common_tags
@@ -450,6 +822,8 @@ resource "aws_lambda_function" "get-franchise-feedback" {
   environment {
     variables = {
       FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}",
+      ROLLUP_FRANCHISE_INDEX = "franchiseId-bikeId-index",
     }
   }
   tags = local.common_tags
@@ -465,6 +839,126 @@ resource "aws_lambda_function" "update-feedback" {
   environment {
     variables = {
       FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}",
+      SENTIMENT_QUEUE_URL = var.feedback_sentiment_queue_url,
+      SENTIMENT_CACHE_TABLE = "sentiment-cache-${var.environment}",
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_function" "get-feedback-stats" {
+  filename         = "../../../../backend/lambda_functions/feedback/get_feedback_stats.py.zip"
+  function_name    = "get-feedback-stats-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "get_feedback_stats.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/feedback/get_feedback_stats.py.zip")
+  environment {
+    variables = {
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+    }
+  }
+  tags = local.common_tags
+}
+
+# Daily job folding old day stats into weeks and old weeks into months
+resource "aws_lambda_function" "compact-feedback-stats" {
+  filename         = "../../../../backend/lambda_functions/feedback/compact_feedback_stats.py.zip"
+  function_name    = "compact-feedback-stats-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "compact_feedback_stats.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/feedback/compact_feedback_stats.py.zip")
+  timeout          = 300
+  environment {
+    variables = {
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+      DAY_RETENTION_DAYS = "90",
+      WEEK_RETENTION_DAYS = "365"
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_cloudwatch_event_rule" "compact_feedback_stats_schedule" {
+  name                = "compact-feedback-stats-${var.environment}-schedule"
+  schedule_expression = "rate(1 day)"
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "compact_feedback_stats_schedule" {
+  rule      = aws_cloudwatch_event_rule.compact_feedback_stats_schedule.name
+  target_id = "compact-feedback-stats-${var.environment}-target"
+  arn       = aws_lambda_function.compact-feedback-stats.arn
+}
+
+resource "aws_lambda_permission" "compact_feedback_stats_schedule" {
+  statement_id  = "AllowExecutionFromCloudWatchEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.compact-feedback-stats.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.compact_feedback_stats_schedule.arn
+}
+
+# Scheduled job that queues sentiment again for feedback left PENDING
+resource "aws_lambda_function" "feedback-sentiment-sweeper" {
+  filename         = "../../../../backend/lambda_functions/feedback/sentiment_sweeper.py.zip"
+  function_name    = "feedback-sentiment-sweeper-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "sentiment_sweeper.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/feedback/sentiment_sweeper.py.zip")
+  timeout          = 120
+  environment {
+    variables = {
+      FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      FEEDBACK_DAILY_STATS_TABLE = "feedback-daily-stats-${var.environment}",
+      SENTIMENT_QUEUE_URL = var.feedback_sentiment_queue_url,
+      PENDING_INDEX_NAME = "sentiment-pendingSince-index",
+      SWEEP_AFTER_MINUTES = "15"
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_cloudwatch_event_rule" "feedback_sentiment_sweeper_schedule" {
+  name                = "feedback-sentiment-sweeper-${var.environment}-schedule"
+  schedule_expression = "rate(15 minutes)"
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "feedback_sentiment_sweeper_schedule" {
+  rule      = aws_cloudwatch_event_rule.feedback_sentiment_sweeper_schedule.name
+  target_id = "feedback-sentiment-sweeper-${var.environment}-target"
+  arn       = aws_lambda_function.feedback-sentiment-sweeper.arn
+}
+
+resource "aws_lambda_permission" "feedback_sentiment_sweeper_schedule" {
+  statement_id  = "AllowExecutionFromCloudWatchEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.feedback-sentiment-sweeper.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.feedback_sentiment_sweeper_schedule.arn
+}
+
+# Manually invoked job that rebuilds the rating rollups from existing feedback
+resource "aws_lambda_function" "backfill-rating-rollups" {
+  filename         = "../../../../backend/lambda_functions/feedback/backfill_rating_rollups.py.zip"
+  function_name    = "backfill-rating-rollups-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "backfill_rating_rollups.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/feedback/backfill_rating_rollups.py.zip")
+  timeout          = 900
+  memory_size      = 512
+  environment {
+    variables = {
+      FEEDBACK_TABLE = "feedback-table-${var.environment}",
+      BIKES_TABLE = "bikes-table-${var.environment}",
+      RATING_ROLLUPS_TABLE = "bike-rating-rollups-${var.environment}",
+      SCAN_SEGMENTS = "8"
     }
   }
   tags = local.common_tags
@@ -481,6 +975,7 @@ resource "aws_lambda_function" "create-ticket" {
   environment {
     variables = {
       TICKETS_TABLE = "tickets-table-${var.environment}",
+      TICKET_EVENTS_TABLE = "ticket-events-${var.environment}",
       TICKET_SNS_TOPIC_ARN = var.ticket_assignment_sns_topic_arn
     }
   }
@@ -514,7 +1009,10 @@ resource "aws_lambda_function" "ticket-processor" {
   environment {
     variables = {
       TICKETS_TABLE = "tickets-table-${var.environment}",
-      USERS_TABLE = "DALScooterUsers1"
+      TICKET_EVENTS_TABLE = "ticket-events-${var.environment}",
+      USERS_TABLE = "DALScooterUsers1",
+      MAX_CONCURRENCY = "8",
+      MAX_SLA_REASSIGNMENTS = "2"
     }
   }
   tags = local.common_tags
@@ -524,8 +1022,106 @@ resource "aws_lambda_function" "ticket-processor" {
 resource "aws_lambda_event_source_mapping" "ticket_processor_sqs" {
   event_source_arn = var.ticket_processing_queue_arn
   function_name    = aws_lambda_function.ticket-processor.function_name
-  batch_size       = 1
+  batch_size       = 10
+  maximum_batching_window_in_seconds = 5
   enabled          = true
+
+  # Only failed records are retried, see batchItemFailures in ticket_processor
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+# Scheduled SLA check that hands overdue tickets back to the ticket processor
+resource "aws_lambda_function" "ticket-sla-scheduler" {
+  filename         = "../../../../backend/lambda_functions/tickets/sla_scheduler.py.zip"
+  function_name    = "ticket-sla-scheduler-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "sla_scheduler.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/sla_scheduler.py.zip")
+  timeout          = 60
+  environment {
+    variables = {
+      TICKETS_TABLE        = "tickets-table-${var.environment}",
+      TICKET_SNS_TOPIC_ARN = var.ticket_assignment_sns_topic_arn,
+      SLA_INDEX_NAME       = "priority-slaDueAt-index"
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_cloudwatch_event_rule" "ticket_sla_schedule" {
+  name                = "ticket-sla-scheduler-${var.environment}-schedule"
+  schedule_expression = "rate(5 minutes)"
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "ticket_sla_schedule" {
+  rule      = aws_cloudwatch_event_rule.ticket_sla_schedule.name
+  target_id = "ticket-sla-scheduler-${var.environment}-target"
+  arn       = aws_lambda_function.ticket-sla-scheduler.arn
+}
+
+resource "aws_lambda_permission" "ticket_sla_schedule" {
+  statement_id  = "AllowExecutionFromCloudWatchEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ticket-sla-scheduler.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.ticket_sla_schedule.arn
+}
+
+# Ticket search - stream-fed inverted index and the search endpoint
+resource "aws_lambda_function" "ticket-indexer" {
+  filename         = "../../../../backend/lambda_functions/tickets/ticket_indexer.py.zip"
+  function_name    = "ticket-indexer-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "ticket_indexer.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/ticket_indexer.py.zip")
+  timeout          = 60
+  environment {
+    variables = {
+      TICKETS_TABLE      = "tickets-table-${var.environment}",
+      SEARCH_INDEX_TABLE = "ticket-search-index-${var.environment}"
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_event_source_mapping" "ticket_indexer_stream" {
+  event_source_arn  = data.aws_dynamodb_table.tickets_table.stream_arn
+  function_name     = aws_lambda_function.ticket-indexer.function_name
+  starting_position = "LATEST"
+  batch_size        = 100
+  enabled           = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Retry a failing batch a few times, halving it to isolate the bad record,
+  # then record it in the DLQ and move on instead of blocking the shard
+  maximum_retry_attempts         = 5
+  bisect_batch_on_function_error = true
+  destination_config {
+    on_failure {
+      destination_arn = var.stream_failures_dlq_arn
+    }
+  }
+}
+
+resource "aws_lambda_function" "search-tickets" {
+  filename         = "../../../../backend/lambda_functions/tickets/search_tickets.py.zip"
+  function_name    = "search-tickets-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "search_tickets.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/search_tickets.py.zip")
+  timeout          = 30
+  environment {
+    variables = {
+      TICKETS_TABLE      = "tickets-table-${var.environment}",
+      SEARCH_INDEX_TABLE = "ticket-search-index-${var.environment}"
+    }
+  }
+  tags = local.common_tags
 }
 
 # Lambda Function for Ticket Updates (for franchise operators to respond)
@@ -538,12 +1134,70 @@ resource "aws_lambda_function" "update-ticket" {
   source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/update_ticket.py.zip")
   environment {
     variables = {
-      TICKETS_TABLE = "tickets-table-${var.environment}"
+      TICKETS_TABLE       = "tickets-table-${var.environment}",
+      TICKET_EVENTS_TABLE = "ticket-events-${var.environment}"
     }
   }
   tags = local.common_tags
 }
 
+# Ticket history - append-only events written with each transition
+resource "aws_lambda_function" "ticket-history" {
+  filename         = "../../../../backend/lambda_functions/tickets/ticket_history.py.zip"
+  function_name    = "ticket-history-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "ticket_history.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/ticket_history.py.zip")
+  timeout          = 30
+  environment {
+    variables = {
+      TICKET_EVENTS_TABLE  = "ticket-events-${var.environment}",
+      COMPACTION_THRESHOLD = "20"
+    }
+  }
+  tags = local.common_tags
+}
+
+# Sends the status update notifications for new history events
+resource "aws_lambda_function" "ticket-event-notifier" {
+  filename         = "../../../../backend/lambda_functions/tickets/ticket_event_notifier.py.zip"
+  function_name    = "ticket-event-notifier-${var.environment}"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "ticket_event_notifier.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = filebase64sha256("../../../../backend/lambda_functions/tickets/ticket_event_notifier.py.zip")
+  timeout          = 30
+  environment {
+    variables = {
+      TICKETS_TABLE = "tickets-table-${var.environment}",
+      TICKET_EVENTS_TABLE = "ticket-events-${var.environment}",
+      SNS_TOPIC_ARN = var.sns_topic_arn
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_event_source_mapping" "ticket_event_notifier_stream" {
+  event_source_arn  = data.aws_dynamodb_table.ticket_events_table.stream_arn
+  function_name     = aws_lambda_function.ticket-event-notifier.function_name
+  starting_position = "LATEST"
+  batch_size        = 100
+  enabled           = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Retry a failing batch a few times, halving it to isolate the bad record,
+  # then record it in the DLQ and move on instead of blocking the shard
+  maximum_retry_attempts         = 5
+  bisect_batch_on_function_error = true
+  destination_config {
+    on_failure {
+      destination_arn = var.stream_failures_dlq_arn
+    }
+  }
+}
+
 resource "aws_lambda_function" "get-user-tickets" {
   filename         = "../../../../backend/lambda_functions/tickets/get_user_tickets.py.zip"
   function_name    = "get-user-tickets-${var.environment}"
@@ -760,29 +1414,259 @@ resource "aws_api_gateway_method" "bike_id_get" {
   }
 }
 
-resource "aws_api_gateway_integration" "bike_id_get" {
-  rest_api_id             = aws_api_gateway_rest_api.this.id
-  resource_id             = aws_api_gateway_resource.bike_id.id
-  http_method             = aws_api_gateway_method.bike_id_get.http_method
-  integration_http_method = "POST"
-  type                    = "AWS_PROXY"
-  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-bike-${var.environment}/invocations"
+resource "aws_api_gateway_integration" "bike_id_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.bike_id.id
+  http_method             = aws_api_gateway_method.bike_id_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-bike-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "bike_id_get" {
+  statement_id  = "AllowAPIGatewayInvokeGetBike"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get-bike.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/bikes/*"
+}
+# ===========================
+# /bikes/{bikeId} (DELETE) Endpoint
+# ===========================
+resource "aws_api_gateway_method" "bike_id_delete" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bike_id.id
+  http_method   = "DELETE"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+  request_parameters = {
+    "method.request.path.bikeId" = true
+  }
+}
+
+resource "aws_api_gateway_integration" "bike_id_delete" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.bike_id.id
+  http_method             = aws_api_gateway_method.bike_id_delete.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:delete-bike-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "bike_id_delete" {
+  statement_id  = "AllowAPIGatewayInvokeDeleteBike"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.delete-bike.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/DELETE/bikes/*"
+}
+
+# ===========================
+# /bikes (GET all bikes) Endpoint
+# ===========================
+# GET method for /bikes
+resource "aws_api_gateway_method" "bikes_get" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bikes.id
+  http_method   = "GET"
+  authorization = "NONE" # Or "COGNITO_USER_POOLS" if you want to protect it
+}
+
+resource "aws_api_gateway_integration" "bikes_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.bikes.id
+  http_method             = aws_api_gateway_method.bikes_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-all-bikes-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "bikes_get" {
+  statement_id  = "AllowAPIGatewayInvokeGetAllBikes"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get-all-bikes.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/bikes"
+}
+
+resource "aws_api_gateway_authorizer" "cognito" {
+  name                   = "CognitoAuthorizer"
+  rest_api_id            = aws_api_gateway_rest_api.this.id
+  type                   = "COGNITO_USER_POOLS"
+  provider_arns          = [var.cognito_user_pool_arn] // Reference your Cognito user pool
+  identity_source        = "method.request.header.Authorization"
+}
+
+# ===========================
+# /bikes/fleet (GET) Endpoint
+# ===========================
+
+resource "aws_api_gateway_resource" "bikes_fleet" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.bikes.id
+  path_part   = "fleet"
+}
+
+resource "aws_api_gateway_method" "bikes_fleet_get" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bikes_fleet.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "bikes_fleet_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.bikes_fleet.id
+  http_method             = aws_api_gateway_method.bikes_fleet_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-franchise-fleet-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "bikes_fleet_get" {
+  statement_id  = "AllowAPIGatewayInvokeGetFranchiseFleet"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get-franchise-fleet.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/bikes/fleet"
+}
+
+# CORS for /bikes/fleet
+resource "aws_api_gateway_method" "bikes_fleet_options" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bikes_fleet.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "bikes_fleet_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_fleet.id
+  http_method = aws_api_gateway_method.bikes_fleet_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "bikes_fleet_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_fleet.id
+  http_method = aws_api_gateway_method.bikes_fleet_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "bikes_fleet_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_fleet.id
+  http_method = aws_api_gateway_method.bikes_fleet_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.bikes_fleet_options]
+}
+
+# ===========================
+# /bikes/import (POST) Endpoint
+# ===========================
+
+resource "aws_api_gateway_resource" "bikes_import" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.bikes.id
+  path_part   = "import"
+}
+
+resource "aws_api_gateway_method" "bikes_import_post" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bikes_import.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "bikes_import_post" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.bikes_import.id
+  http_method             = aws_api_gateway_method.bikes_import_post.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:import-bikes-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "bikes_import_post" {
+  statement_id  = "AllowAPIGatewayInvokeImportBikes"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.import-bikes.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/POST/bikes/import"
+}
+
+# CORS for /bikes/import
+resource "aws_api_gateway_method" "bikes_import_options" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.bikes_import.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "bikes_import_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_import.id
+  http_method = aws_api_gateway_method.bikes_import_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "bikes_import_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_import.id
+  http_method = aws_api_gateway_method.bikes_import_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "bikes_import_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bikes_import.id
+  http_method = aws_api_gateway_method.bikes_import_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.bikes_import_options]
 }
 
-resource "aws_lambda_permission" "bike_id_get" {
-  statement_id  = "AllowAPIGatewayInvokeGetBike"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.get-bike.function_name
-  principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/bikes/*"
-}
 # ===========================
-# /bikes/{bikeId} (DELETE) Endpoint
+# /bikes/{bikeId}/image-upload (POST) Endpoint
 # ===========================
-resource "aws_api_gateway_method" "bike_id_delete" {
+
+resource "aws_api_gateway_resource" "bike_id_image_upload" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.bike_id.id
+  path_part   = "image-upload"
+}
+
+resource "aws_api_gateway_method" "bike_id_image_upload_post" {
   rest_api_id   = aws_api_gateway_rest_api.this.id
-  resource_id   = aws_api_gateway_resource.bike_id.id
-  http_method   = "DELETE"
+  resource_id   = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method   = "POST"
   authorization = "COGNITO_USER_POOLS"
   authorizer_id = aws_api_gateway_authorizer.cognito.id
   request_parameters = {
@@ -790,57 +1674,64 @@ resource "aws_api_gateway_method" "bike_id_delete" {
   }
 }
 
-resource "aws_api_gateway_integration" "bike_id_delete" {
+resource "aws_api_gateway_integration" "bike_id_image_upload_post" {
   rest_api_id             = aws_api_gateway_rest_api.this.id
-  resource_id             = aws_api_gateway_resource.bike_id.id
-  http_method             = aws_api_gateway_method.bike_id_delete.http_method
+  resource_id             = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method             = aws_api_gateway_method.bike_id_image_upload_post.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:delete-bike-${var.environment}/invocations"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:create-image-upload-${var.environment}/invocations"
 }
 
-resource "aws_lambda_permission" "bike_id_delete" {
-  statement_id  = "AllowAPIGatewayInvokeDeleteBike"
+resource "aws_lambda_permission" "bike_id_image_upload_post" {
+  statement_id  = "AllowAPIGatewayInvokeCreateImageUpload"
   action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.delete-bike.function_name
+  function_name = aws_lambda_function.create-image-upload.function_name
   principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/DELETE/bikes/*"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/POST/bikes/*/image-upload"
 }
 
-# ===========================
-# /bikes (GET all bikes) Endpoint
-# ===========================
-# GET method for /bikes
-resource "aws_api_gateway_method" "bikes_get" {
+# CORS for /bikes/{bikeId}/image-upload
+resource "aws_api_gateway_method" "bike_id_image_upload_options" {
   rest_api_id   = aws_api_gateway_rest_api.this.id
-  resource_id   = aws_api_gateway_resource.bikes.id
-  http_method   = "GET"
-  authorization = "NONE" # Or "COGNITO_USER_POOLS" if you want to protect it
+  resource_id   = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
 }
 
-resource "aws_api_gateway_integration" "bikes_get" {
-  rest_api_id             = aws_api_gateway_rest_api.this.id
-  resource_id             = aws_api_gateway_resource.bikes.id
-  http_method             = aws_api_gateway_method.bikes_get.http_method
-  integration_http_method = "POST"
-  type                    = "AWS_PROXY"
-  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-all-bikes-${var.environment}/invocations"
+resource "aws_api_gateway_integration" "bike_id_image_upload_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method = aws_api_gateway_method.bike_id_image_upload_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
 }
 
-resource "aws_lambda_permission" "bikes_get" {
-  statement_id  = "AllowAPIGatewayInvokeGetAllBikes"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.get-all-bikes.function_name
-  principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/bikes"
+resource "aws_api_gateway_method_response" "bike_id_image_upload_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method = aws_api_gateway_method.bike_id_image_upload_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
 }
 
-resource "aws_api_gateway_authorizer" "cognito" {
-  name                   = "CognitoAuthorizer"
-  rest_api_id            = aws_api_gateway_rest_api.this.id
-  type                   = "COGNITO_USER_POOLS"
-  provider_arns          = [var.cognito_user_pool_arn] // Reference your Cognito user pool
-  identity_source        = "method.request.header.Authorization"
+resource "aws_api_gateway_integration_response" "bike_id_image_upload_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.bike_id_image_upload.id
+  http_method = aws_api_gateway_method.bike_id_image_upload_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.bike_id_image_upload_options]
 }
 
 # ===========================
@@ -1560,6 +2451,90 @@ resource "aws_api_gateway_integration_response" "feedback_franchise_id_options_2
   depends_on = [aws_api_gateway_integration.feedback_franchise_id_options]
 }
 
+# ===========================
+# /feedback/stats (GET) Endpoint
+# ===========================
+
+resource "aws_api_gateway_resource" "feedback_stats" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.feedback.id
+  path_part   = "stats"
+}
+
+resource "aws_api_gateway_method" "feedback_stats_get" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.feedback_stats.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+  request_parameters = {
+    "method.request.querystring.bikeId"      = false
+    "method.request.querystring.franchiseId" = false
+    "method.request.querystring.from"        = false
+    "method.request.querystring.to"          = false
+  }
+}
+
+resource "aws_api_gateway_integration" "feedback_stats_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.feedback_stats.id
+  http_method             = aws_api_gateway_method.feedback_stats_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:get-feedback-stats-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "feedback_stats_get" {
+  statement_id  = "AllowAPIGatewayInvokeGetFeedbackStats"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get-feedback-stats.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/feedback/stats"
+}
+
+# CORS for /feedback/stats
+resource "aws_api_gateway_method" "feedback_stats_options" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.feedback_stats.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "feedback_stats_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.feedback_stats.id
+  http_method = aws_api_gateway_method.feedback_stats_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "feedback_stats_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.feedback_stats.id
+  http_method = aws_api_gateway_method.feedback_stats_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "feedback_stats_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.feedback_stats.id
+  http_method = aws_api_gateway_method.feedback_stats_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.feedback_stats_options]
+}
+
 # ===========================
 # /feedback/{feedback-id} (PUT) Endpoint
 # ===========================
@@ -1797,6 +2772,84 @@ resource "aws_api_gateway_integration_response" "tickets_admin_options_200" {
   depends_on = [aws_api_gateway_integration.tickets_admin_options]
 }
 
+# ===========================
+# /tickets/search (GET) Endpoint
+# ===========================
+
+resource "aws_api_gateway_resource" "tickets_search" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.tickets.id
+  path_part   = "search"
+}
+
+resource "aws_api_gateway_method" "tickets_search_get" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.tickets_search.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "tickets_search_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.tickets_search.id
+  http_method             = aws_api_gateway_method.tickets_search_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:search-tickets-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "tickets_search_get" {
+  statement_id  = "AllowAPIGatewayInvokeSearchTickets"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.search-tickets.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/tickets/search"
+}
+
+# CORS for /tickets/search
+resource "aws_api_gateway_method" "tickets_search_options" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.tickets_search.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "tickets_search_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_search.id
+  http_method = aws_api_gateway_method.tickets_search_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "tickets_search_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_search.id
+  http_method = aws_api_gateway_method.tickets_search_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "tickets_search_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_search.id
+  http_method = aws_api_gateway_method.tickets_search_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.tickets_search_options]
+}
+
 # ===========================
 # /tickets/user (GET) Endpoint
 # ===========================
@@ -1988,6 +3041,87 @@ resource "aws_lambda_permission" "tickets_id_put" {
   source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/PUT/tickets/*"
 }
 
+# ===========================
+# /tickets/{ticketId}/history (GET) Endpoint
+# ===========================
+
+resource "aws_api_gateway_resource" "tickets_id_history" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  parent_id   = aws_api_gateway_resource.tickets_id.id
+  path_part   = "history"
+}
+
+resource "aws_api_gateway_method" "tickets_id_history_get" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.tickets_id_history.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+  request_parameters = {
+    "method.request.path.ticketId" = true
+  }
+}
+
+resource "aws_api_gateway_integration" "tickets_id_history_get" {
+  rest_api_id             = aws_api_gateway_rest_api.this.id
+  resource_id             = aws_api_gateway_resource.tickets_id_history.id
+  http_method             = aws_api_gateway_method.tickets_id_history_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = "arn:aws:apigateway:${var.region}:lambda:path/2015-03-31/functions/arn:aws:lambda:${var.region}:${data.aws_caller_identity.current.account_id}:function:ticket-history-${var.environment}/invocations"
+}
+
+resource "aws_lambda_permission" "tickets_id_history_get" {
+  statement_id  = "AllowAPIGatewayInvokeTicketHistory"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ticket-history.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.this.execution_arn}/*/GET/tickets/*/history"
+}
+
+# CORS for /tickets/{ticketId}/history
+resource "aws_api_gateway_method" "tickets_id_history_options" {
+  rest_api_id   = aws_api_gateway_rest_api.this.id
+  resource_id   = aws_api_gateway_resource.tickets_id_history.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "tickets_id_history_options" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_id_history.id
+  http_method = aws_api_gateway_method.tickets_id_history_options.http_method
+  type        = "MOCK"
+  request_templates = {
+    "application/json" = jsonencode({ statusCode = 200 })
+  }
+}
+
+resource "aws_api_gateway_method_response" "tickets_id_history_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_id_history.id
+  http_method = aws_api_gateway_method.tickets_id_history_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "tickets_id_history_options_200" {
+  rest_api_id = aws_api_gateway_rest_api.this.id
+  resource_id = aws_api_gateway_resource.tickets_id_history.id
+  http_method = aws_api_gateway_method.tickets_id_history_options.http_method
+  status_code = "200"
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+  }
+  depends_on = [aws_api_gateway_integration.tickets_id_history_options]
+}
+
 # --- Deployment ---
 resource "aws_api_gateway_deployment" "this" {
   depends_on = [
@@ -2003,6 +3137,16 @@ resource "aws_api_gateway_deployment" "this" {
     aws_api_gateway_integration.update_bike_options,
     aws_api_gateway_integration_response.update_bike_options_200,
     
+    aws_api_gateway_integration.bike_id_image_upload_post,
+    aws_api_gateway_integration.bike_id_image_upload_options,
+    aws_api_gateway_integration_response.bike_id_image_upload_options_200,
+    aws_api_gateway_integration.bikes_import_post,
+    aws_api_gateway_integration.bikes_import_options,
+    aws_api_gateway_integration_response.bikes_import_options_200,
+    aws_api_gateway_integration.bikes_fleet_get,
+    aws_api_gateway_integration.bikes_fleet_options,
+    aws_api_gateway_integration_response.bikes_fleet_options_200,
+    
     # Availability endpoints
     aws_api_gateway_integration.availability_bike_id_get,
     aws_api_gateway_integration.availability_bike_id_put,
@@ -2040,6 +3184,10 @@ resource "aws_api_gateway_deployment" "this" {
     aws_api_gateway_integration.feedback_franchise_id_options,
     aws_api_gateway_integration_response.feedback_franchise_id_options_200,
     
+    aws_api_gateway_integration.feedback_stats_get,
+    aws_api_gateway_integration.feedback_stats_options,
+    aws_api_gateway_integration_response.feedback_stats_options_200,
+    
     aws_api_gateway_integration.feedback_id_put,
     aws_api_gateway_integration.feedback_id_options,
     aws_api_gateway_integration_response.feedback_id_options_200,
@@ -2053,6 +3201,10 @@ resource "aws_api_gateway_deployment" "this" {
     aws_api_gateway_integration.tickets_admin_options,
     aws_api_gateway_integration_response.tickets_admin_options_200,
     
+    aws_api_gateway_integration.tickets_search_get,
+    aws_api_gateway_integration.tickets_search_options,
+    aws_api_gateway_integration_response.tickets_search_options_200,
+    
     aws_api_gateway_integration.tickets_user_get,
     aws_api_gateway_integration.tickets_user_options,
     aws_api_gateway_integration_response.tickets_user_options_200,
@@ -2061,6 +3213,10 @@ resource "aws_api_gateway_deployment" "this" {
     aws_api_gateway_integration.tickets_id_put,
     aws_api_gateway_integration.tickets_id_options,
     aws_api_gateway_integration_response.tickets_id_options_200,
+    
+    aws_api_gateway_integration.tickets_id_history_get,
+    aws_api_gateway_integration.tickets_id_history_options,
+    aws_api_gateway_integration_response.tickets_id_history_options_200,
   ]
   rest_api_id = aws_api_gateway_rest_api.this.id
 
@@ -2077,6 +3233,12 @@ resource "aws_api_gateway_deployment" "this" {
       aws_api_gateway_integration.tickets_post.id,
       aws_api_gateway_integration.tickets_id_put.id,
       aws_api_gateway_integration.booking_reference_code_put.id,
+      aws_api_gateway_integration.tickets_search_get.id,
+      aws_api_gateway_integration.tickets_id_history_get.id,
+      aws_api_gateway_integration.feedback_stats_get.id,
+      aws_api_gateway_integration.bike_id_image_upload_post.id,
+      aws_api_gateway_integration.bikes_import_post.id,
+      aws_api_gateway_integration.bikes_fleet_get.id,
     ]))
   }
 }
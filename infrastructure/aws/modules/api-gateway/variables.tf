@@ -47,4 +47,44 @@ variable "ticket_assignment_sns_topic_arn" {
 variable "ticket_processing_queue_arn" {
   description = "ARN of the SQS queue for ticket processing"
   type        = string
-}
\ No newline at end of file
+}
+
+variable "feedback_sentiment_queue_url" {
+  description = "URL of the SQS queue for feedback sentiment analysis"
+  type        = string
+}
+
+variable "feedback_sentiment_queue_arn" {
+  description = "ARN of the SQS queue for feedback sentiment analysis"
+  type        = string
+}
+
+variable "image_derivatives_queue_url" {
+  description = "URL of the SQS queue for bike image derivatives"
+  type        = string
+}
+
+variable "image_derivatives_queue_arn" {
+  description = "ARN of the SQS queue for bike image derivatives"
+  type        = string
+}
+
+variable "bike_cleanup_queue_url" {
+  description = "URL of the SQS queue for the cleanup of deleted bikes"
+  type        = string
+}
+
+variable "bike_cleanup_queue_arn" {
+  description = "ARN of the SQS queue for the cleanup of deleted bikes"
+  type        = string
+}
+
+variable "stream_failures_dlq_arn" {
+  description = "ARN of the SQS queue for failed DynamoDB stream batches"
+  type        = string
+}
+
+variable "pillow_layer_arn" {
+  description = "ARN of a Lambda layer providing Pillow (python3.9) for image_derivatives, which imports it at load time"
+  type        = string
+}
@@ -38,6 +38,37 @@ resource "aws_sns_topic" "dalscooter_notifications" {
   }
 }
 
+# Login and signup events, queued by the Cognito triggers and handled off
+# the login path by the auth events consumer
+resource "aws_sqs_queue" "auth_events_dlq" {
+  name                      = "dalscooter-auth-events-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue" "auth_events" {
+  name                       = "dalscooter-auth-events-${var.environment}"
+  visibility_timeout_seconds = 60
+  message_retention_seconds  = 86400
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue_redrive_policy" "auth_events" {
+  queue_url = aws_sqs_queue.auth_events.id
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.auth_events_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
 # IAM Role for Lambda
 resource "aws_iam_role" "lambda_role" {
   name = "DALScooterLambdaRole-${var.environment}"
@@ -94,6 +125,26 @@ resource "aws_iam_policy" "lambda_policy" {
         Effect = "Allow"
         Action = "sns:Publish"
         Resource = aws_sns_topic.dalscooter_notifications.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.auth_events.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "sqs:SendMessage"
+        Resource = var.auth_outcomes_queue_arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "dynamodb:BatchGetItem"
+        Resource = var.auth_failure_counters_table_arn
       }
     ]
   })
@@ -131,7 +182,7 @@ resource "aws_lambda_function" "post_confirmation" {
   source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/PostConfirmationLambda.py.zip")
   environment {
     variables = {
-      SNS_TOPIC_ARN = aws_sns_topic.dalscooter_notifications.arn
+      AUTH_EVENTS_QUEUE_URL = aws_sqs_queue.auth_events.url
     }
   }
   tags = local.common_tags
@@ -144,7 +195,13 @@ resource "aws_lambda_function" "define_auth_challenge" {
   handler          = "DefineAuthChallengeLambda.lambda_handler"
   runtime          = "python3.9"
   source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/DefineAuthChallengeLambda.py.zip")
-  tags             = local.common_tags
+  environment {
+    variables = {
+      AUTH_OUTCOMES_QUEUE_URL     = var.auth_outcomes_queue_url
+      AUTH_FAILURE_COUNTERS_TABLE = var.auth_failure_counters_table_name
+    }
+  }
+  tags = local.common_tags
 }
 
 resource "aws_lambda_function" "create_auth_challenge" {
@@ -154,7 +211,13 @@ resource "aws_lambda_function" "create_auth_challenge" {
   handler          = "CreateAuthChallengeLambda.lambda_handler"
   runtime          = "python3.9"
   source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/CreateAuthChallengeLambda.py.zip")
-  tags             = local.common_tags
+  environment {
+    variables = {
+      USERS_TABLE     = aws_dynamodb_table.dalscooter_users.name
+      LOG_SAMPLE_RATE = "0.05"
+    }
+  }
+  tags = local.common_tags
 }
 
 resource "aws_lambda_function" "verify_auth_challenge" {
@@ -164,7 +227,12 @@ resource "aws_lambda_function" "verify_auth_challenge" {
   handler          = "VerifyAuthChallengeResponseLambda.lambda_handler"
   runtime          = "python3.9"
   source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/VerifyAuthChallengeResponseLambda.py.zip")
-  tags             = local.common_tags
+  environment {
+    variables = {
+      AUTH_OUTCOMES_QUEUE_URL = var.auth_outcomes_queue_url
+    }
+  }
+  tags = local.common_tags
 }
 
 resource "aws_lambda_function" "post_authentication" {
@@ -174,6 +242,22 @@ resource "aws_lambda_function" "post_authentication" {
   handler          = "PostAuthenticationLambda.lambda_handler"
   runtime          = "python3.9"
   source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/PostAuthenticationLambda.py.zip")
+  environment {
+    variables = {
+      AUTH_EVENTS_QUEUE_URL = aws_sqs_queue.auth_events.url
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_function" "auth_events_consumer" {
+  filename         = "../../../../cognito/lambda_zip/AuthEventsConsumerLambda.py.zip"
+  function_name    = "AuthEventsConsumerLambda-${var.environment}"
+  role             = aws_iam_role.lambda_role.arn
+  handler          = "AuthEventsConsumerLambda.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 30
+  source_code_hash = filebase64sha256("../../../../cognito/lambda_zip/AuthEventsConsumerLambda.py.zip")
   environment {
     variables = {
       SNS_TOPIC_ARN = aws_sns_topic.dalscooter_notifications.arn
@@ -182,6 +266,14 @@ resource "aws_lambda_function" "post_authentication" {
   tags = local.common_tags
 }
 
+resource "aws_lambda_event_source_mapping" "auth_events_consumer" {
+  event_source_arn                   = aws_sqs_queue.auth_events.arn
+  function_name                      = aws_lambda_function.auth_events_consumer.arn
+  batch_size                         = 50
+  maximum_batching_window_in_seconds = 5
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
 # Cognito User Pool
 resource "aws_cognito_user_pool" "dalscooter_user_pool" {
   name                     = "${var.user_pool_name}-${var.environment}"
@@ -25,4 +25,23 @@ variable "environment" {
 variable "bookings_table_arn" {
   description = "ARN of the bookings DynamoDB table"
   type        = string
-}
\ No newline at end of file
+}
+variable "auth_outcomes_queue_url" {
+  description = "URL of the auth outcomes queue of the security module"
+  type        = string
+}
+
+variable "auth_outcomes_queue_arn" {
+  description = "ARN of the auth outcomes queue of the security module"
+  type        = string
+}
+
+variable "auth_failure_counters_table_name" {
+  description = "Name of the auth failure counters table of the security module"
+  type        = string
+}
+
+variable "auth_failure_counters_table_arn" {
+  description = "ARN of the auth failure counters table of the security module"
+  type        = string
+}
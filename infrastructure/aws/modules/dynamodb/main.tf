@@ -20,6 +20,25 @@ resource "aws_dynamodb_table" "bookings_table" {
     name = "bookingId"
     type = "S"
   }
+
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "bookingDate"
+    type = "S"
+  }
+
+  # A bike's bookings by date, e.g. to cancel the upcoming ones when the bike is deleted
+  global_secondary_index {
+    name               = "bikeId-bookingDate-index"
+    hash_key           = "bikeId"
+    range_key          = "bookingDate"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["slotTime", "status", "userId", "email", "referenceCode"]
+  }
  
   tags = {
     Project     = "dal-scooter-team-6"
@@ -32,11 +51,48 @@ resource "aws_dynamodb_table" "bikes_table" {
   name         = "bikes-table-${var.environment}"
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "bikeId"
+
+  # Keeps the bike catalog snapshot up to date
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
  
   attribute {
     name = "bikeId"
     type = "S"
   }
+
+  attribute {
+    name = "franchiseId"
+    type = "S"
+  }
+
+  attribute {
+    name = "type"
+    type = "S"
+  }
+
+  attribute {
+    name = "hourlyRate"
+    type = "N"
+  }
+
+  # Catalog filtered by franchise, projects the attributes get-all-bikes returns
+  global_secondary_index {
+    name               = "franchiseId-bikeId-index"
+    hash_key           = "franchiseId"
+    range_key          = "bikeId"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["type", "hourlyRate", "features", "imageUrl", "thumbnailUrl", "status", "discountCode", "imageStatus"]
+  }
+
+  # Catalog filtered by type, with the hourly rate range as a key condition
+  global_secondary_index {
+    name               = "type-hourlyRate-index"
+    hash_key           = "type"
+    range_key          = "hourlyRate"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["franchiseId", "features", "imageUrl", "thumbnailUrl", "status"]
+  }
  
   tags = {
     Project     = "dal-scooter-team-6"
@@ -54,6 +110,44 @@ resource "aws_dynamodb_table" "feedback_table" {
     name = "feedbackId"
     type = "S"
   }
+
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "submittedAt"
+    type = "S"
+  }
+
+  attribute {
+    name = "sentiment"
+    type = "S"
+  }
+
+  attribute {
+    name = "pendingSince"
+    type = "S"
+  }
+
+  # A bike's feedback, newest first
+  global_secondary_index {
+    name            = "bikeId-submittedAt-index"
+    hash_key        = "bikeId"
+    range_key       = "submittedAt"
+    projection_type = "ALL"
+  }
+
+  # Sparse index of feedback waiting for sentiment (only PENDING feedback has
+  # pendingSince), read by the sentiment sweeper
+  global_secondary_index {
+    name               = "sentiment-pendingSince-index"
+    hash_key           = "sentiment"
+    range_key          = "pendingSince"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["comment", "bikeId", "franchiseId", "submittedAt"]
+  }
  
   tags = {
     Project     = "dal-scooter-team-6"
@@ -61,19 +155,216 @@ resource "aws_dynamodb_table" "feedback_table" {
   }
 }
  
+# Per-bike rating count/sum/histogram, maintained by the feedback lambdas
+resource "aws_dynamodb_table" "bike_rating_rollups_table" {
+  name         = "bike-rating-rollups-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "bikeId"
+
+  # Keeps the ratings in the bike catalog snapshot up to date
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "franchiseId"
+    type = "S"
+  }
+
+  # A franchise's per-bike rollups in one query
+  global_secondary_index {
+    name               = "franchiseId-bikeId-index"
+    hash_key           = "franchiseId"
+    range_key          = "bikeId"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["ratingCount", "ratingSum"]
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
+
+# Comment sentiment keyed by a hash of the normalized text
+resource "aws_dynamodb_table" "sentiment_cache_table" {
+  name         = "sentiment-cache-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "textHash"
+
+  attribute {
+    name = "textHash"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
+
+# Per-day rating histogram and sentiment counts per bike (BIKE#<id>) and
+# franchise (FRANCHISE#<id>). periodKey is DAY#YYYY-MM-DD, older days are
+# compacted into WEEK#<monday> and then MONTH#YYYY-MM items
+resource "aws_dynamodb_table" "feedback_daily_stats_table" {
+  name         = "feedback-daily-stats-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "statsId"
+  range_key    = "periodKey"
+
+  attribute {
+    name = "statsId"
+    type = "S"
+  }
+
+  attribute {
+    name = "periodKey"
+    type = "S"
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
+
+# One item per bike, day and time slot, keyed <bikeId>#<date>#<slot>. Was
+# created by hand before, an existing table is imported with
+#   terraform import module.dynamodb.aws_dynamodb_table.availability_table <environment>-availability-table
+resource "aws_dynamodb_table" "availability_table" {
+  name         = "${var.environment}-availability-table"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "bikeId"
+
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "originalBikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "date"
+    type = "S"
+  }
+
+  # A bike's slots by date, e.g. to delete them when the bike is deleted
+  global_secondary_index {
+    name            = "originalBikeId-index"
+    hash_key        = "originalBikeId"
+    range_key       = "date"
+    projection_type = "KEYS_ONLY"
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
+
 # Tickets Table
 resource "aws_dynamodb_table" "tickets_table" {
   name         = "tickets-table-${var.environment}"
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "ticketId"
+
+  # Feeds the ticket search indexer
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
  
   attribute {
     name = "ticketId"
     type = "S"
   }
+
+  attribute {
+    name = "priority"
+    type = "S"
+  }
+
+  attribute {
+    name = "slaDueAt"
+    type = "N"
+  }
+
+  # Sparse index of active tickets ordered by SLA deadline, read by the SLA scheduler
+  global_secondary_index {
+    name               = "priority-slaDueAt-index"
+    hash_key           = "priority"
+    range_key          = "slaDueAt"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["status"]
+  }
  
   tags = {
     Project     = "dal-scooter-team-6"
     Environment = var.environment
   }
-}
\ No newline at end of file
+}
+
+# Ticket Search Index Table - posting lists (term, ticketId) plus term/collection stats
+resource "aws_dynamodb_table" "ticket_search_index_table" {
+  name         = "ticket-search-index-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "term"
+  range_key    = "ticketId"
+
+  attribute {
+    name = "term"
+    type = "S"
+  }
+
+  attribute {
+    name = "ticketId"
+    type = "S"
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
+
+resource "aws_dynamodb_table" "ticket_events_table" {
+  name         = "ticket-events-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "ticketId"
+  range_key    = "eventKey"
+
+  # Drives customer/operator notifications for status updates
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
+  attribute {
+    name = "ticketId"
+    type = "S"
+  }
+
+  attribute {
+    name = "eventKey"
+    type = "S"
+  }
+
+  # Expires the notifier's sent markers, history events have no expiresAt
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = {
+    Project     = "dal-scooter-team-6"
+    Environment = var.environment
+  }
+}
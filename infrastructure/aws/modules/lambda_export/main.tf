@@ -29,11 +29,19 @@ data "aws_iam_policy_document" "lambda_policy_doc" {
 
   statement {
     sid       = "AllowS3Put"
-    actions   = ["s3:PutObject", "s3:PutObjectAcl"]
+    actions   = ["s3:PutObject", "s3:PutObjectAcl", "s3:AbortMultipartUpload", "s3:GetObject", "s3:DeleteObject"]
     effect    = "Allow"
     resources = ["${coalesce(var.s3_bucket_arn, local.s3_bucket_arn_constructed)}/*"]
   }
 
+  # Lets a missing state/<table>.json read as 404 rather than 403
+  statement {
+    sid       = "AllowS3List"
+    actions   = ["s3:ListBucket"]
+    effect    = "Allow"
+    resources = [coalesce(var.s3_bucket_arn, local.s3_bucket_arn_constructed)]
+  }
+
   statement {
     sid       = "AllowLogs"
     actions   = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"]
@@ -65,11 +73,21 @@ resource "aws_lambda_function" "this" {
   filename         = data.archive_file.lambda_zip.output_path
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
   timeout          = var.lambda_timeout
+  memory_size      = var.lambda_memory_size
+  layers           = var.layers
 
   environment {
     variables = {
-      DYNAMODB_TABLE = var.dynamodb_table_name
-      S3_BUCKET      = var.s3_bucket_name
+      DYNAMODB_TABLE               = var.dynamodb_table_name
+      S3_BUCKET                    = var.s3_bucket_name
+      EXPORT_COLUMNS               = var.export_columns
+      EXPORT_FORMAT                = var.export_format
+      EXPORT_SCHEMA                = length(var.export_schema) > 0 ? jsonencode(var.export_schema) : ""
+      SCAN_SEGMENTS                = tostring(var.scan_segments)
+      MAX_READ_CAPACITY_PER_SECOND = tostring(var.max_read_capacity_per_second)
+      EXPORT_MODE                  = var.export_mode
+      WATERMARK_ATTRIBUTES         = var.watermark_attributes
+      COMPACTION_INTERVAL_HOURS    = tostring(var.compaction_interval_hours)
     }
   }
 
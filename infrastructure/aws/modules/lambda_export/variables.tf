@@ -29,6 +29,60 @@ variable "s3_bucket_arn" {
   default     = null
 }
 
+variable "export_columns" {
+  description = "Comma separated CSV header of the export, sampled from the first scan page when empty"
+  type        = string
+  default     = ""
+}
+
+variable "export_mode" {
+  description = "full (the whole table each run) or incremental (date-partitioned deltas and periodic snapshots)"
+  type        = string
+  default     = "full"
+}
+
+variable "export_format" {
+  description = "Format of the export files: csv, ndjson.gz or parquet (needs a pyarrow layer)"
+  type        = string
+  default     = "csv"
+}
+
+variable "export_schema" {
+  description = "BigQuery style schema ([{name, type}]) the export's columns and values follow, overrides export_columns"
+  type        = any
+  default     = []
+}
+
+variable "layers" {
+  description = "Lambda layer ARNs, e.g. one with pyarrow for parquet exports"
+  type        = list(string)
+  default     = []
+}
+
+variable "watermark_attributes" {
+  description = "Comma separated timestamp attributes that mark an item changed, for incremental exports"
+  type        = string
+  default     = "updatedAt"
+}
+
+variable "compaction_interval_hours" {
+  description = "Hours between full snapshots of an incremental export"
+  type        = number
+  default     = 168
+}
+
+variable "scan_segments" {
+  description = "Number of parallel scan segments of the export"
+  type        = number
+  default     = 4
+}
+
+variable "max_read_capacity_per_second" {
+  description = "Read capacity units per second all scan segments may consume together (0 for no limit)"
+  type        = number
+  default     = 200
+}
+
 variable "schedule_expression" {
   description = "Cron or rate expression for the EventBridge rule"
   type        = string
@@ -41,6 +95,12 @@ variable "lambda_timeout" {
   default     = 300
 }
 
+variable "lambda_memory_size" {
+  description = "Lambda memory (MB), every scan segment buffers up to one part"
+  type        = number
+  default     = 512
+}
+
 variable "region" {
   description = "AWS region"
   default     = "ca-central-1"
@@ -0,0 +1,148 @@
+terraform {
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+  }
+}
+
+provider "aws" {
+  region = var.region
+}
+
+locals {
+  common_tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+# Sliding-window failure counters per user, one item per subject and
+# window (user#<name>#<windowStart>), expired by TTL
+resource "aws_dynamodb_table" "auth_failure_counters" {
+  name         = "auth-failure-counters-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "counterKey"
+
+  attribute {
+    name = "counterKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = local.common_tags
+}
+
+# Auth outcomes queued by the Define and Verify auth challenge triggers
+resource "aws_sqs_queue" "auth_outcomes_dlq" {
+  name                      = "dalscooter-auth-outcomes-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = local.common_tags
+}
+
+resource "aws_sqs_queue" "auth_outcomes" {
+  name                       = "dalscooter-auth-outcomes-${var.environment}"
+  visibility_timeout_seconds = 60
+  message_retention_seconds  = 3600
+
+  tags = local.common_tags
+}
+
+resource "aws_sqs_queue_redrive_policy" "auth_outcomes" {
+  queue_url = aws_sqs_queue.auth_outcomes.id
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.auth_outcomes_dlq.arn
+    maxReceiveCount     = 3
+  })
+}
+
+resource "aws_iam_role" "auth_outcome_consumer" {
+  name = "DALScooterAuthOutcomeConsumerRole-${var.environment}"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Action = "sts:AssumeRole"
+      Effect = "Allow"
+      Principal = {
+        Service = "lambda.amazonaws.com"
+      }
+    }]
+  })
+
+  tags = local.common_tags
+}
+
+resource "aws_iam_role_policy" "auth_outcome_consumer" {
+  name = "DALScooterAuthOutcomeConsumerPolicy-${var.environment}"
+  role = aws_iam_role.auth_outcome_consumer.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ]
+        Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.auth_failure_counters.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.auth_outcomes.arn
+      }
+    ]
+  })
+}
+
+data "archive_file" "auth_outcome_consumer" {
+  type        = "zip"
+  source_file = "${path.module}/../../../../security/lambda/AuthOutcomeConsumerLambda.py"
+  output_path = "${path.module}/AuthOutcomeConsumerLambda.py.zip"
+}
+
+resource "aws_lambda_function" "auth_outcome_consumer" {
+  filename         = data.archive_file.auth_outcome_consumer.output_path
+  function_name    = "AuthOutcomeConsumerLambda-${var.environment}"
+  role             = aws_iam_role.auth_outcome_consumer.arn
+  handler          = "AuthOutcomeConsumerLambda.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 30
+  source_code_hash = data.archive_file.auth_outcome_consumer.output_base64sha256
+  environment {
+    variables = {
+      AUTH_FAILURE_COUNTERS_TABLE = aws_dynamodb_table.auth_failure_counters.name
+    }
+  }
+  tags = local.common_tags
+}
+
+resource "aws_lambda_event_source_mapping" "auth_outcome_consumer" {
+  event_source_arn                   = aws_sqs_queue.auth_outcomes.arn
+  function_name                      = aws_lambda_function.auth_outcome_consumer.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 2
+  function_response_types            = ["ReportBatchItemFailures"]
+}
@@ -0,0 +1,19 @@
+output "auth_outcomes_queue_url" {
+  description = "URL of the queue the auth challenge triggers send auth outcomes to"
+  value       = aws_sqs_queue.auth_outcomes.url
+}
+
+output "auth_outcomes_queue_arn" {
+  description = "ARN of the auth outcomes queue"
+  value       = aws_sqs_queue.auth_outcomes.arn
+}
+
+output "auth_failure_counters_table_name" {
+  description = "Name of the auth failure counters table"
+  value       = aws_dynamodb_table.auth_failure_counters.name
+}
+
+output "auth_failure_counters_table_arn" {
+  description = "ARN of the auth failure counters table"
+  value       = aws_dynamodb_table.auth_failure_counters.arn
+}
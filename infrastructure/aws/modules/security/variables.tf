@@ -0,0 +1,14 @@
+variable "region" {
+  description = "AWS region"
+  default     = "ca-central-1"
+}
+
+variable "project_name" {
+  description = "Project name tag"
+  type        = string
+}
+
+variable "environment" {
+  description = "Environment name tag"
+  type        = string
+}
@@ -76,6 +76,104 @@ resource "aws_sqs_queue" "ticket_processing_dlq" {
   }
 }
 
+# SQS Queue for feedback comments awaiting sentiment analysis
+resource "aws_sqs_queue" "feedback_sentiment_queue" {
+  name                       = "DALScooterFeedbackSentiment-${var.environment}"
+  message_retention_seconds  = 1209600 # 14 days
+  visibility_timeout_seconds = 120
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue" "feedback_sentiment_dlq" {
+  name = "DALScooterFeedbackSentiment-DLQ-${var.environment}"
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue_redrive_policy" "feedback_sentiment_redrive" {
+  queue_url = aws_sqs_queue.feedback_sentiment_queue.id
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.feedback_sentiment_dlq.arn
+    maxReceiveCount     = 3
+  })
+}
+
+# SQS Queue for bike images awaiting thumbnail/medium derivatives
+resource "aws_sqs_queue" "image_derivatives_queue" {
+  name                       = "DALScooterImageDerivatives-${var.environment}"
+  message_retention_seconds  = 1209600 # 14 days
+  visibility_timeout_seconds = 360
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue" "image_derivatives_dlq" {
+  name = "DALScooterImageDerivatives-DLQ-${var.environment}"
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue_redrive_policy" "image_derivatives_redrive" {
+  queue_url = aws_sqs_queue.image_derivatives_queue.id
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.image_derivatives_dlq.arn
+    maxReceiveCount     = 3
+  })
+}
+
+# SQS Queue for the cleanup of deleted bikes (bookings, availability, images)
+resource "aws_sqs_queue" "bike_cleanup_queue" {
+  name                       = "DALScooterBikeCleanup-${var.environment}"
+  message_retention_seconds  = 1209600 # 14 days
+  visibility_timeout_seconds = 900
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue" "bike_cleanup_dlq" {
+  name = "DALScooterBikeCleanup-DLQ-${var.environment}"
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
+resource "aws_sqs_queue_redrive_policy" "bike_cleanup_redrive" {
+  queue_url = aws_sqs_queue.bike_cleanup_queue.id
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.bike_cleanup_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+# Where DynamoDB stream mappings send the location of batches they gave up on
+resource "aws_sqs_queue" "stream_failures_dlq" {
+  name                      = "DALScooterStreamFailures-DLQ-${var.environment}"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = {
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
 # SNS Topic for ticket assignment
 resource "aws_sns_topic" "ticket_assignment" {
   name = "DALScooterTicketAssignment-${var.environment}"
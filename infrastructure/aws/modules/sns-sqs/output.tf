@@ -26,4 +26,39 @@ output "ticket_processing_queue_arn" {
 output "ticket_processing_queue_url" {
   description = "URL of the SQS queue for ticket processing"
   value       = aws_sqs_queue.ticket_processing_queue.url
-}
\ No newline at end of file
+}
+
+output "feedback_sentiment_queue_arn" {
+  description = "ARN of the SQS queue for feedback sentiment analysis"
+  value       = aws_sqs_queue.feedback_sentiment_queue.arn
+}
+
+output "feedback_sentiment_queue_url" {
+  description = "URL of the SQS queue for feedback sentiment analysis"
+  value       = aws_sqs_queue.feedback_sentiment_queue.url
+}
+
+output "image_derivatives_queue_arn" {
+  description = "ARN of the SQS queue for bike image derivatives"
+  value       = aws_sqs_queue.image_derivatives_queue.arn
+}
+
+output "image_derivatives_queue_url" {
+  description = "URL of the SQS queue for bike image derivatives"
+  value       = aws_sqs_queue.image_derivatives_queue.url
+}
+
+output "bike_cleanup_queue_arn" {
+  description = "ARN of the SQS queue for the cleanup of deleted bikes"
+  value       = aws_sqs_queue.bike_cleanup_queue.arn
+}
+
+output "bike_cleanup_queue_url" {
+  description = "URL of the SQS queue for the cleanup of deleted bikes"
+  value       = aws_sqs_queue.bike_cleanup_queue.url
+}
+
+output "stream_failures_dlq_arn" {
+  description = "ARN of the SQS queue for failed DynamoDB stream batches"
+  value       = aws_sqs_queue.stream_failures_dlq.arn
+}
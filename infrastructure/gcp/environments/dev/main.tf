@@ -1,3 +1,11 @@
+# The schemas the AWS exports write their files with
+locals {
+  table_schemas = {
+    for table in ["users", "feedback", "bikes"] :
+    table => jsondecode(file("${path.module}/../../../../monitoring/schemas/${table}.json"))
+  }
+}
+
 module "bigquery_users" {
   source                 = "../../modules/big-query"
   project_id             = var.project_id
@@ -7,7 +15,15 @@ module "bigquery_users" {
   region                 = var.region
   environment            = var.environment
   table_id               = var.table_id_users
-  table_schema           = var.table_schema_users
+  table_schema           = local.table_schemas.users
+  partition_field        = "createdAt"
+  s3_data_path           = "s3://${var.export_bucket_name}/deltas/DALScooterUsers1/*"
+  s3_snapshot_path       = "s3://${var.export_bucket_name}/snapshots/DALScooterUsers1/latest/*"
+  key_field              = "userId"
+  watermark_fields       = ["createdAt"]
+  file_format            = "JSON"
+  aws_access_key_id      = var.aws_access_key_id
+  aws_secret_access_key  = var.aws_secret_access_key
 }
 
 module "bigquery_feedback" {
@@ -19,7 +35,15 @@ module "bigquery_feedback" {
   region                 = var.region
   environment            = var.environment
   table_id               = var.table_id_feedback
-  table_schema           = var.table_schema_feedback
+  table_schema           = local.table_schemas.feedback
+  partition_field        = "submittedAt"
+  s3_data_path           = "s3://${var.export_bucket_name}/deltas/feedback-table-dev/*"
+  s3_snapshot_path       = "s3://${var.export_bucket_name}/snapshots/feedback-table-dev/latest/*"
+  key_field              = "feedbackId"
+  watermark_fields       = ["updatedAt", "submittedAt"]
+  file_format            = "JSON"
+  aws_access_key_id      = var.aws_access_key_id
+  aws_secret_access_key  = var.aws_secret_access_key
   
 }
 
@@ -32,6 +56,14 @@ module "bigquery_bikes" {
   region                 = var.region
   environment            = var.environment
   table_id               = var.table_id_bikes
-  table_schema           = var.table_schema_bikes
+  table_schema           = local.table_schemas.bikes
+  partition_field        = "createdAt"
+  s3_data_path           = "s3://${var.export_bucket_name}/deltas/bikes-table-dev/*"
+  s3_snapshot_path       = "s3://${var.export_bucket_name}/snapshots/bikes-table-dev/latest/*"
+  key_field              = "bikeId"
+  watermark_fields       = ["updatedAt", "createdAt"]
+  file_format            = "JSON"
+  aws_access_key_id      = var.aws_access_key_id
+  aws_secret_access_key  = var.aws_secret_access_key
   
 }
\ No newline at end of file
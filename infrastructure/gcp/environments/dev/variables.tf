@@ -22,148 +22,27 @@ variable "environment" {
 variable "table_id_users" {
    default = "users" 
    }
-variable "table_schema_users" {
-  type = any
-  default = [
-    {
-      name = "createdAt"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "email"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "questions"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "userId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "userType"
-      type = "STRING"
-      mode = "REQUIRED"
-    }
-  ]
-}
 
 variable "table_id_feedback" {
    default = "feedback" 
    }
-variable "table_schema_feedback" {
-  type = any
-  default = [
-    {
-      name = "bikeId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "bikeType"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "comment"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "feedbackId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "rating"
-      type = "INTEGER"
-      mode = "REQUIRED"
-    },
-    {
-      name = "sentiment"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "submittedAt"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "userId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "username"
-      type = "STRING"
-      mode = "REQUIRED"
-    }
-  ]
-}
 
 variable "table_id_bikes" {
    default = "bikes" 
    }
-variable "table_schema_bikes" {
-  type = any
-  default = [
-    {
-      name = "bikeId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "createdAt"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "discountCode"
-      type = "STRING"
-      mode = "NULLABLE"
-    },
-    {
-      name = "features"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "franchiseId"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "hourlyRate"
-      type = "INTEGER"
-      mode = "REQUIRED"
-    },
-    {
-      name = "imageUrl"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "status"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "type"
-      type = "STRING"
-      mode = "REQUIRED"
-    },
-    {
-      name = "updatedAt"
-      type = "STRING"
-      mode = "REQUIRED"
-    }
-  ]
-}
 
 
+
+variable "export_bucket_name" {
+  description = "S3 bucket the DynamoDB exports are written to"
+  default     = "dal-scooter-team-6-data-visualization"
+}
+variable "aws_access_key_id" {
+  description = "AWS access key the BigQuery transfers read the export bucket with, no transfers when empty"
+  default     = ""
+}
+variable "aws_secret_access_key" {
+  description = "AWS secret key the BigQuery transfers read the export bucket with"
+  default     = ""
+  sensitive   = true
+}
@@ -23,9 +23,124 @@ resource "google_bigquery_table" "this" {
 
   schema = jsonencode(var.table_schema)
   deletion_protection = false
+
+  # Daily partitions, so date bounded queries only scan the days they need
+  dynamic "time_partitioning" {
+    for_each = var.partition_field != "" ? [var.partition_field] : []
+    content {
+      type  = "DAY"
+      field = time_partitioning.value
+    }
+  }
 }
 
 resource "google_project_service" "bigquery_dts" {
   project = var.project_id
   service = "bigquerydatatransfer.googleapis.com"
-}
\ No newline at end of file
+}
+
+locals {
+  transfers_enabled = var.s3_data_path != "" && var.aws_access_key_id != ""
+  snapshot_enabled  = local.transfers_enabled && var.s3_snapshot_path != "" && var.key_field != "" && length(var.watermark_fields) > 0
+
+  # file_format follows the export's: CSV for csv, JSON for ndjson.gz,
+  # PARQUET for parquet
+  format_params = merge({
+    access_key_id = var.aws_access_key_id
+    file_format   = var.file_format
+  }, var.file_format == "CSV" ? { skip_leading_rows = "1" } : {}, contains(["CSV", "JSON"], var.file_format) ? {
+    # The export's _extra column is not part of the schema
+    ignore_unknown_values = "true"
+  } : {})
+
+  watermark = "COALESCE(${join(", ", var.watermark_fields)})"
+}
+
+# Appends the incremental export's delta files from S3, only files changed
+# since the last run are loaded. Updated items arrive as further rows, read
+# the current view for one row per item.
+resource "google_bigquery_data_transfer_config" "s3_deltas" {
+  count                  = local.transfers_enabled ? 1 : 0
+  display_name           = "${var.table_id}-s3-deltas"
+  project                = var.project_id
+  location               = var.region
+  data_source_id         = "amazon_s3"
+  schedule               = var.transfer_schedule
+  destination_dataset_id = google_bigquery_dataset.this.dataset_id
+
+  params = merge(local.format_params, {
+    destination_table_name_template = google_bigquery_table.this.table_id
+    data_path                       = var.s3_data_path
+    write_disposition               = "APPEND"
+  })
+
+  sensitive_params {
+    secret_access_key = var.aws_secret_access_key
+  }
+
+  depends_on = [google_project_service.bigquery_dts]
+}
+
+# The latest snapshot of the table, replaced by every transfer, which is
+# where deleted items drop out
+resource "google_bigquery_table" "snapshot" {
+  count      = local.snapshot_enabled ? 1 : 0
+  dataset_id = google_bigquery_dataset.this.dataset_id
+  table_id   = "${var.table_id}_snapshot"
+  project    = var.project_id
+
+  schema = jsonencode(var.table_schema)
+  deletion_protection = false
+}
+
+resource "google_bigquery_data_transfer_config" "s3_snapshot" {
+  count                  = local.snapshot_enabled ? 1 : 0
+  display_name           = "${var.table_id}-s3-snapshot"
+  project                = var.project_id
+  location               = var.region
+  data_source_id         = "amazon_s3"
+  schedule               = var.transfer_schedule
+  destination_dataset_id = google_bigquery_dataset.this.dataset_id
+
+  params = merge(local.format_params, {
+    destination_table_name_template = google_bigquery_table.snapshot[0].table_id
+    data_path                       = var.s3_snapshot_path
+    write_disposition               = "MIRROR"
+  })
+
+  sensitive_params {
+    secret_access_key = var.aws_secret_access_key
+  }
+
+  depends_on = [google_project_service.bigquery_dts]
+}
+
+# One row per item: the latest snapshot, overlaid with the delta rows
+# changed after it, newest row per key first. Items deleted since the
+# snapshot are still listed until the next one.
+resource "google_bigquery_table" "current" {
+  count      = local.snapshot_enabled ? 1 : 0
+  dataset_id = google_bigquery_dataset.this.dataset_id
+  table_id   = "${var.table_id}_current"
+  project    = var.project_id
+
+  view {
+    use_legacy_sql = false
+    query          = <<-SQL
+      SELECT * EXCEPT (_source)
+      FROM (
+        SELECT *, 0 AS _source FROM `${var.project_id}.${google_bigquery_dataset.this.dataset_id}.${google_bigquery_table.snapshot[0].table_id}`
+        UNION ALL
+        SELECT *, 1 AS _source FROM `${var.project_id}.${google_bigquery_dataset.this.dataset_id}.${google_bigquery_table.this.table_id}`
+        WHERE ${local.watermark} > IFNULL(
+          (SELECT MAX(${local.watermark}) FROM `${var.project_id}.${google_bigquery_dataset.this.dataset_id}.${google_bigquery_table.snapshot[0].table_id}`),
+          TIMESTAMP '1970-01-01'
+        )
+      )
+      WHERE TRUE
+      QUALIFY ROW_NUMBER() OVER (PARTITION BY ${var.key_field} ORDER BY ${local.watermark} DESC, _source DESC) = 1
+    SQL
+  }
+
+  deletion_protection = false
+}
@@ -5,3 +5,7 @@ output "dataset_id" {
 output "table_id" {
   value = google_bigquery_table.this.table_id
 }
+
+output "current_view_id" {
+  value = length(google_bigquery_table.current) > 0 ? google_bigquery_table.current[0].table_id : null
+}
@@ -24,3 +24,43 @@ variable "table_schema" {
     type = any 
 }
 
+
+variable "partition_field" {
+  description = "TIMESTAMP or DATE column the table is partitioned by day on, not partitioned when empty"
+  default     = ""
+}
+
+variable "s3_data_path" {
+  description = "S3 URI of the delta files to load, e.g. s3://bucket/deltas/table/*, no transfer when empty"
+  default     = ""
+}
+variable "s3_snapshot_path" {
+  description = "S3 URI of the latest snapshot files, e.g. s3://bucket/snapshots/table/latest/*"
+  default     = ""
+}
+variable "key_field" {
+  description = "Column that identifies an item, rows are deduplicated on it"
+  default     = ""
+}
+variable "watermark_fields" {
+  description = "TIMESTAMP columns the export watermarks on, the first one set orders an item's rows"
+  type        = list(string)
+  default     = []
+}
+variable "aws_access_key_id" {
+  description = "AWS access key the transfer reads the export bucket with"
+  default     = ""
+}
+variable "aws_secret_access_key" {
+  description = "AWS secret key the transfer reads the export bucket with"
+  default     = ""
+  sensitive   = true
+}
+variable "transfer_schedule" {
+  description = "Schedule of the S3 delta transfer"
+  default     = "every 24 hours"
+}
+variable "file_format" {
+  description = "Format of the transferred files: CSV, JSON (newline delimited, may be gzip'd) or PARQUET"
+  default     = "CSV"
+}
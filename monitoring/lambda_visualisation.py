@@ -1,48 +1,653 @@
 import boto3
 import csv
+import gzip
+import io
+import json
 import os
-import tempfile
+import threading
+import time
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+# S3 parts must be at least 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_SIZE = max(int(os.environ.get("PART_SIZE_MB", "8")), 5) * 1024 * 1024
+# Largest object UploadPartCopy copies as a single part
+MAX_COPY_PART_SIZE = 5 * 1024 * 1024 * 1024
+
+# Undeclared attributes of an item end up in this column as JSON
+EXTRA_COLUMN = "_extra"
+
+# EXPORT_FORMAT -> (file extension, content type)
+FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "ndjson.gz": (".ndjson.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet")
+}
+
+# Rows a Parquet segment buffers per row group
+ROW_GROUP_ROWS = int(os.environ.get("ROW_GROUP_ROWS", "50000"))
 
 def lambda_handler(event, context):
+    """
+    Export a DynamoDB table to S3_BUCKET, in one of two modes (EXPORT_MODE,
+    or "mode" in the event):
+
+    full (default)
+        The whole table to <table>.<ext>, overwriting the previous export.
+    incremental
+        Only the items changed since the last run, to
+        deltas/<table>/dt=<date>/<table>-<time>.<ext>, found with a
+        filtered scan on the WATERMARK_ATTRIBUTES (default updatedAt) from
+        the watermark kept in state/<table>.json. Every
+        COMPACTION_INTERVAL_HOURS (default 168), and on the first run, the
+        whole table is compacted into
+        snapshots/<table>/dt=<date>/<table>.<ext> instead, and copied to
+        snapshots/<table>/latest/ for loads that mirror the latest
+        snapshot. "compact" in the event forces that.
+
+    EXPORT_FORMAT is csv (default), ndjson.gz (gzip'd JSON lines) or
+    parquet (needs pyarrow, from a layer). With EXPORT_SCHEMA, a BigQuery
+    style JSON schema ([{"name", "type"}], types STRING, INTEGER, FLOAT,
+    NUMERIC, BOOLEAN, TIMESTAMP and DATE), the columns and their types are
+    fixed and values are converted to them. A value that does not convert
+    is exported as an attribute outside the header instead.
+
+    The table is read as SCAN_SEGMENTS parallel scan segments (default 4)
+    by a pool of worker threads. Each segment writes CSV rows as its scan
+    pages arrive and streams them to its own object under <table>.parts/
+    with a multipart upload, so a segment holds at most one scan page and
+    one part in memory. A final compose step joins the segment objects
+    into the export, server side with UploadPartCopy where the part size
+    rules allow it, and deletes them.
+
+    All segments share a MAX_READ_CAPACITY_PER_SECOND budget (0 for no
+    limit) so an export does not starve production traffic. Rows/second
+    and consumed read capacity are reported per segment.
+
+    Without a schema the header comes from EXPORT_COLUMNS (comma
+    separated) or from the attributes of the first scan page (deltas reuse
+    the header of the last snapshot), untyped. Attributes outside the
+    header are kept as JSON in the _extra column, except in Parquet where
+    they are only counted. Nested values are written as JSON.
+    """
     table_name = os.environ.get("DYNAMODB_TABLE")
     bucket_name = os.environ.get("S3_BUCKET")
     if not table_name or not bucket_name:
         raise Exception("Environment variables DYNAMODB_TABLE and S3_BUCKET must be set")
 
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(table_name)
+    s3_client = boto3.client("s3")
+    if export_format() not in FORMATS:
+        raise Exception(f"Unknown export format {export_format()}")
+    mode = (event or {}).get("mode") or os.environ.get("EXPORT_MODE", "full")
+    if mode in ("incremental", "compact"):
+        return export_incremental(s3_client, table_name, bucket_name, compact=mode == "compact")
+    if mode != "full":
+        raise Exception(f"Unknown export mode {mode}")
 
-    # Scan the entire table, handling pagination
-    items = []
+    object_key = f"{table_name}{extension()}"  # Overwrites each time
+    schema = declared_schema() or sample_schema(boto3.resource("dynamodb").Table(table_name))
+    result = export_table(s3_client, table_name, bucket_name, object_key, schema) if schema else None
+    if not result:
+        raise Exception("No items found in DynamoDB table.")
+    return dict({"status": "success", "mode": mode}, **result)
+
+def export_format():
+    return os.environ.get("EXPORT_FORMAT", "csv")
+
+def extension():
+    return FORMATS[export_format()][0]
+
+def declared_schema():
+    """Columns ({"name", "type"}) of EXPORT_SCHEMA, or untyped ones of EXPORT_COLUMNS"""
+    if os.environ.get("EXPORT_SCHEMA"):
+        return [
+            {"name": column["name"], "type": (column.get("type") or "STRING").upper()}
+            for column in json.loads(os.environ["EXPORT_SCHEMA"])
+        ]
+    return [
+        {"name": column.strip(), "type": None}
+        for column in os.environ.get("EXPORT_COLUMNS", "").split(",") if column.strip()
+    ]
+
+def export_incremental(s3_client, table_name, bucket_name, compact=False):
+    """
+    Export the items changed since the watermark as a delta, or compact
+    the table into a snapshot when one is due, and move the watermark on.
+
+    The new watermark is the start of this run less WATERMARK_LAG_SECONDS
+    (default 300), so items written while a scan was passing by, or by a
+    writer with a slow clock, are exported again by the next run rather
+    than missed. Consumers keep the row with the latest watermark
+    attribute per key. Items without any watermark attribute, and deletes,
+    only show up in the next snapshot.
+    """
+    now = datetime.utcnow()
+    watermark = (now - timedelta(seconds=int(os.environ.get("WATERMARK_LAG_SECONDS", "300")))).isoformat()
+    day = now.strftime("%Y-%m-%d")
+    state = read_state(s3_client, bucket_name, table_name)
+    interval = timedelta(hours=float(os.environ.get("COMPACTION_INTERVAL_HOURS", "168")))
+
+    if compact or not state or now - datetime.fromisoformat(state["lastCompaction"]) >= interval:
+        kind = "snapshot"
+        object_key = f"snapshots/{table_name}/dt={day}/{table_name}{extension()}"
+        schema = declared_schema() or sample_schema(boto3.resource("dynamodb").Table(table_name))
+        result = export_table(s3_client, table_name, bucket_name, object_key, schema) if schema else None
+        if not result:
+            raise Exception("No items found in DynamoDB table.")
+        publish_latest(s3_client, bucket_name, f"snapshots/{table_name}/dt={day}/", f"snapshots/{table_name}/latest/")
+        state = {"watermark": watermark, "lastCompaction": watermark, "schema": schema}
+    else:
+        kind = "delta"
+        object_key = f"deltas/{table_name}/dt={day}/{table_name}-{now.strftime('%H%M%S')}{extension()}"
+        attributes = [name.strip() for name in os.environ.get("WATERMARK_ATTRIBUTES", "updatedAt").split(",") if name.strip()]
+        # The upper bound keeps values that are not ISO timestamps, which
+        # compare above any of them as strings, out of every delta
+        changed = Attr(attributes[0]).between(state["watermark"], "9999")
+        for name in attributes[1:]:
+            changed = changed | Attr(name).between(state["watermark"], "9999")
+        result = export_table(
+            s3_client, table_name, bucket_name, object_key,
+            declared_schema() or state_schema(state), FilterExpression=changed
+        )
+        print(f"Delta of {table_name} since {state['watermark']}: {result['records_exported'] if result else 0} items")
+        state = dict(state, watermark=watermark)
+
+    write_state(s3_client, bucket_name, table_name, state)
+    return dict({
+        "status": "success",
+        "mode": "incremental",
+        "kind": kind,
+        "watermark": watermark,
+        "records_exported": 0,
+        "s3_bucket": bucket_name,
+        "s3_key": None
+    }, **(result or {}))
+
+def publish_latest(s3_client, bucket_name, source_prefix, latest_prefix):
+    """
+    Copy the objects of a snapshot to latest_prefix, replacing the previous
+    snapshot there, so that loads can mirror the latest snapshot from a
+    fixed path. Copies first and removes leftovers after, so the prefix is
+    never empty.
+    """
+    def keys(prefix):
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix):
+            for entry in page.get("Contents", []):
+                yield entry["Key"]
+
+    published = set()
+    for key in keys(source_prefix):
+        target = latest_prefix + key[len(source_prefix):]
+        s3_client.copy({"Bucket": bucket_name, "Key": key}, bucket_name, target)
+        published.add(target)
+    stale = [{"Key": key} for key in keys(latest_prefix) if key not in published]
+    for start in range(0, len(stale), 1000):
+        s3_client.delete_objects(Bucket=bucket_name, Delete={"Objects": stale[start:start + 1000], "Quiet": True})
+
+def state_schema(state):
+    """Schema of the last snapshot, from states written before schemas as untyped columns"""
+    return state.get("schema") or [{"name": name, "type": None} for name in state["columns"]]
+
+def read_state(s3_client, bucket_name, table_name):
+    """Watermark, last compaction and snapshot header of a table, None before the first snapshot"""
+    try:
+        body = s3_client.get_object(Bucket=bucket_name, Key=f"state/{table_name}.json")["Body"].read()
+    except ClientError as e:
+        # Without s3:ListBucket a missing key is a 403 rather than a NoSuchKey,
+        # which should fail loudly rather than start over with a snapshot
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    return json.loads(body)
+
+def write_state(s3_client, bucket_name, table_name, state):
+    s3_client.put_object(
+        Bucket=bucket_name, Key=f"state/{table_name}.json",
+        Body=json.dumps(state).encode("utf-8"), ContentType="application/json"
+    )
+
+def export_table(s3_client, table_name, bucket_name, object_key, schema, **scan_kwargs):
+    """
+    Export the items a parallel scan with scan_kwargs finds to object_key.
+    Parquet files cannot be concatenated, so a Parquet export is one file
+    per segment, <stem>-<segment>.parquet, rather than a composed object.
+    Returns the export's stats, or None without writing anything when
+    there were no items.
+    """
+    start = time.time()
+    total_segments = max(int(os.environ.get("SCAN_SEGMENTS", "4")), 1)
+    limiter = RateLimiter(float(os.environ.get("MAX_READ_CAPACITY_PER_SECOND", "200")))
+
+    parquet = export_format() == "parquet"
+    stem = object_key[:-len(extension())]
+
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        segments = list(pool.map(
+            lambda segment: export_segment(
+                table_name, segment, total_segments, schema, s3_client, bucket_name,
+                f"{stem}-{segment:04d}.parquet" if parquet else f"{table_name}.parts/segment-{segment:04d}{extension()}",
+                limiter, **scan_kwargs
+            ),
+            range(total_segments)
+        ))
+
+    records = sum(segment["records"] for segment in segments)
+    if parquet:
+        unused = [segment for segment in segments if not segment["records"]]
+        composed = {"method": "none", "parts": len(segments) - len(unused), "bytes": sum(segment["bytes"] for segment in segments if segment["records"])}
+        object_key = f"{stem}-*.parquet"
+    else:
+        unused = segments
+    try:
+        if not records:
+            return None
+        if not parquet:
+            composed = compose(s3_client, bucket_name, object_key, segments)
+    finally:
+        if unused:
+            s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": segment["key"]} for segment in unused], "Quiet": True}
+            )
+
+    seconds = round(time.time() - start, 3)
+    drifted = sum(segment["itemsWithExtraAttributes"] for segment in segments)
+    print(f"Exported {records} items of {table_name} to {object_key} in {total_segments} segments and {seconds} s, "
+          f"{composed['bytes']} bytes composed by {composed['method']}, {drifted} items with attributes outside the header")
+    return {
+        "records_exported": records,
+        "s3_bucket": bucket_name,
+        "s3_key": object_key,
+        "parts": composed["parts"],
+        "bytes": composed["bytes"],
+        "compose": composed["method"],
+        "seconds": seconds,
+        "items_with_extra_attributes": drifted,
+        "segments": [{name: value for name, value in segment.items() if name != "key"} for segment in segments]
+    }
+
+def sample_schema(table):
+    """Untyped columns of the sorted attribute names of the first scan page, None for an empty table"""
     scan_kwargs = {}
+    page_size = os.environ.get("SCAN_PAGE_SIZE")
+    if page_size:
+        scan_kwargs["Limit"] = int(page_size)
+    while True:
+        response = table.scan(**scan_kwargs)
+        items = response.get("Items", [])
+        if items:
+            return [{"name": name, "type": None} for name in sorted({key for item in items for key in item.keys()})]
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return None
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+def scan_pages(table, stats, limiter, **scan_kwargs):
+    """
+    Yield the items of a table (or a scan segment) a scan page at a time,
+    adding up the consumed capacity in stats and pacing the pages with the
+    limiter
+    """
+    page_size = os.environ.get("SCAN_PAGE_SIZE")
+    if page_size:
+        scan_kwargs["Limit"] = int(page_size)
+    scan_kwargs["ReturnConsumedCapacity"] = "TOTAL"
     while True:
         response = table.scan(**scan_kwargs)
-        items.extend(response.get("Items", []))
+        capacity = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+        stats["consumedCapacity"] += capacity
+        stats["throttledSeconds"] += limiter.acquire(capacity)
+        yield response.get("Items", [])
         last_key = response.get("LastEvaluatedKey")
         if not last_key:
             break
         scan_kwargs["ExclusiveStartKey"] = last_key
 
-    if not items:
-        raise Exception("No items found in DynamoDB table.")
+def export_segment(table_name, segment, total_segments, schema, s3_client, bucket, key, limiter, **scan_kwargs):
+    """Stream one scan segment in the export format to its own object, returning the segment's stats"""
+    start = time.time()
+    # Resources are not thread safe, every worker builds its own
+    table = boto3.session.Session().resource("dynamodb").Table(table_name)
+    stats = {"segment": segment, "key": key, "consumedCapacity": 0, "throttledSeconds": 0}
+    upload = MultipartUpload(s3_client, bucket, key, FORMATS[export_format()][1])
+    pages = scan_pages(table, stats, limiter, Segment=segment, TotalSegments=total_segments, **scan_kwargs)
+    try:
+        if export_format() == "parquet":
+            records, drifted = write_parquet(pages, schema, upload)
+        elif export_format() == "ndjson.gz":
+            records, drifted = write_ndjson_gz(pages, schema, upload)
+        else:
+            records, drifted = write_csv(pages, schema, upload, header=segment == 0)
+        upload.complete()
+    except Exception:
+        upload.abort()
+        raise
 
-    # Write items to a temporary CSV file
-    fieldnames = sorted({key for item in items for key in item.keys()})
-    object_key = f"{table_name}.csv"  # Overwrites each time
+    seconds = time.time() - start
+    stats.update({
+        "records": records,
+        "bytes": upload.bytes_uploaded,
+        "itemsWithExtraAttributes": drifted,
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": round(records / seconds, 1) if seconds else None,
+        "consumedCapacity": round(stats["consumedCapacity"], 1),
+        "throttledSeconds": round(stats["throttledSeconds"], 3)
+    })
+    print("Export segment:", json.dumps({name: value for name, value in stats.items() if name != "key"}))
+    return stats
 
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, newline='', suffix=".csv") as tmp:
-        writer = csv.DictWriter(tmp, fieldnames=fieldnames)
+def write_csv(pages, schema, upload, header=True):
+    """
+    Write the pages as CSV rows to the upload, after a header row if
+    header is set. Returns the number of rows and of rows that had
+    attributes outside the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[column["name"] for column in schema] + [EXTRA_COLUMN])
+    if header:
         writer.writeheader()
-        writer.writerows(items)
-        tmp_path = tmp.name
+    records = 0
+    drifted = 0
+    for items in pages:
+        for item in items:
+            row, extra = typed_row(item, schema)
+            if extra:
+                drifted += 1
+                row[EXTRA_COLUMN] = json.dumps(extra, default=json_default, sort_keys=True)
+            writer.writerow({name: csv_text(value) for name, value in row.items()})
+        records += len(items)
+        upload.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    return records, drifted
 
-    # Upload the file to S3 (overwriting existing file)
-    s3_client = boto3.client("s3")
-    s3_client.upload_file(tmp_path, bucket_name, object_key)
+def compose(s3_client, bucket, key, segments):
+    """
+    Join the segment objects, in segment order, into one object. Copied
+    server side when every segment but the last is a valid part size,
+    otherwise streamed through in chunks.
+    """
+    sources = [segment for segment in segments if segment["bytes"]]
+    upload = MultipartUpload(s3_client, bucket, key, FORMATS[export_format()][1])
+    try:
+        if all(MIN_PART_SIZE <= source["bytes"] <= MAX_COPY_PART_SIZE for source in sources[:-1]) \
+                and sources[-1]["bytes"] <= MAX_COPY_PART_SIZE:
+            method = "copy"
+            for source in sources:
+                upload.copy_part(source["key"], source["bytes"])
+        else:
+            method = "stream"
+            for source in sources:
+                body = s3_client.get_object(Bucket=bucket, Key=source["key"])["Body"]
+                for chunk in body.iter_chunks(MIN_PART_SIZE):
+                    upload.write(chunk)
+        upload.complete()
+    except Exception:
+        upload.abort()
+        raise
+    return {"method": method, "parts": upload.part_number, "bytes": upload.bytes_uploaded}
 
-    return {
-        "status": "success",
-        "records_exported": len(items),
-        "s3_bucket": bucket_name,
-        "s3_key": object_key,
+def write_ndjson_gz(pages, schema, upload):
+    """
+    Write the pages as gzip'd JSON lines to the upload, as one gzip member,
+    so that composed segments still make a valid gzip stream. Returns the
+    number of rows and of rows that had attributes outside the schema.
+    """
+    buffer = io.BytesIO()
+    compressed = gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6, mtime=0)
+    records = 0
+    drifted = 0
+    for items in pages:
+        for item in items:
+            row, extra = typed_row(item, schema)
+            if extra:
+                drifted += 1
+                row[EXTRA_COLUMN] = json.dumps(extra, default=json_default, sort_keys=True)
+            compressed.write(json.dumps(row, default=typed_default, separators=(",", ":")).encode("utf-8") + b"\n")
+        records += len(items)
+        upload.write(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+    compressed.close()
+    upload.write(buffer.getvalue())
+    return records, drifted
+
+def write_parquet(pages, schema, upload):
+    """
+    Write the pages as a Parquet file (snappy) to the upload, a row group
+    per ROW_GROUP_ROWS rows. Attributes outside the schema are counted but
+    not written, a load would reject a column its table does not have.
+    """
+    # Only Parquet exports need pyarrow, it comes from a layer
+    import pyarrow
+    import pyarrow.parquet
+
+    arrow_types = {
+        "INTEGER": pyarrow.int64(), "INT64": pyarrow.int64(),
+        "FLOAT": pyarrow.float64(), "FLOAT64": pyarrow.float64(),
+        "NUMERIC": pyarrow.decimal128(38, 9),
+        "BOOLEAN": pyarrow.bool_(), "BOOL": pyarrow.bool_(),
+        "TIMESTAMP": pyarrow.timestamp("us", tz="UTC"),
+        "DATE": pyarrow.date32()
     }
+    arrow_schema = pyarrow.schema([(column["name"], arrow_types.get(column["type"], pyarrow.string())) for column in schema])
+    columns = {column["name"]: [] for column in schema}
+    writer = pyarrow.parquet.ParquetWriter(UploadFile(upload), arrow_schema, compression="snappy")
+
+    def flush():
+        writer.write_table(pyarrow.table(columns, schema=arrow_schema))
+        for values in columns.values():
+            values.clear()
+
+    records = 0
+    drifted = 0
+    buffered = 0
+    for items in pages:
+        for item in items:
+            row, extra = typed_row(item, schema)
+            if extra:
+                drifted += 1
+            for column in schema:
+                value = row.get(column["name"])
+                if column["type"] in ("STRING", None) and value is not None:
+                    value = str(value)
+                elif column["type"] == "NUMERIC" and value is not None:
+                    value = value.quantize(Decimal("1e-9"))
+                columns[column["name"]].append(value)
+        records += len(items)
+        buffered += len(items)
+        if buffered >= ROW_GROUP_ROWS:
+            flush()
+            buffered = 0
+    if buffered:
+        flush()
+    writer.close()
+    return records, drifted
+
+def typed_row(item, schema):
+    """
+    The values of an item's schema columns, converted to the column types,
+    and the item's other attributes, including values that did not convert
+    """
+    row = {}
+    extra = {}
+    names = set()
+    for column in schema:
+        name = column["name"]
+        names.add(name)
+        if item.get(name) is None:
+            continue
+        try:
+            row[name] = typed_value(item[name], column["type"])
+        except (TypeError, ValueError, ArithmeticError):
+            extra[name] = item[name]
+    for name, value in item.items():
+        if name not in names:
+            extra[name] = value
+    return row, extra
+
+def typed_value(value, field_type):
+    """A DynamoDB value as the given BigQuery type, as csv_value would write it when untyped"""
+    if field_type in ("INTEGER", "INT64"):
+        number = Decimal(str(value))
+        if number % 1 != 0:
+            raise ValueError(f"{value} is not an integer")
+        return int(number)
+    if field_type in ("FLOAT", "FLOAT64"):
+        return float(value)
+    if field_type == "NUMERIC":
+        return Decimal(str(value))
+    if field_type in ("BOOLEAN", "BOOL"):
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ("true", "false"):
+            return str(value).lower() == "true"
+        raise ValueError(f"{value} is not a boolean")
+    if field_type == "TIMESTAMP":
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    if field_type == "DATE":
+        return date.fromisoformat(str(value)[:10])
+    if field_type == "STRING":
+        return value if isinstance(value, str) else str(csv_value(value))
+    return csv_value(value)
+
+def typed_default(value):
+    """JSON for converted values: NUMERIC as an exact string, timestamps and dates in ISO 8601"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return iso_text(value)
+    return json_default(value)
+
+def csv_text(value):
+    if isinstance(value, (datetime, date)):
+        return iso_text(value)
+    return value
+
+def iso_text(value):
+    """ISO 8601, UTC timestamps with a Z as the application writes them"""
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+def csv_value(value):
+    if isinstance(value, (dict, list, set)):
+        return json.dumps(value, default=json_default, sort_keys=True)
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    return value
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    if isinstance(value, set):
+        return sorted(value, key=str)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class RateLimiter:
+    """
+    Shared read capacity budget of the scan workers, in capacity units per
+    second with up to one second of burst. Capacity is charged after a page
+    is read, and the worker that goes into debt waits it off.
+    """
+
+    def __init__(self, units_per_second):
+        self.rate = units_per_second
+        self.available = units_per_second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units):
+        """Charge units, returning the seconds waited"""
+        if self.rate <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.rate, self.available + (now - self.updated) * self.rate) - units
+            self.updated = now
+            wait = -self.available / self.rate if self.available < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class UploadFile:
+    """Write-only file object over a MultipartUpload, for pyarrow"""
+
+    def __init__(self, upload):
+        self.upload = upload
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.upload.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class MultipartUpload:
+    """S3 multipart upload fed with bytes, uploading a part whenever PART_SIZE is buffered"""
+
+    def __init__(self, s3_client, bucket, key, content_type="text/csv"):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+        self.buffer = bytearray()
+        self.parts = []
+        self.part_number = 0
+        self.bytes_uploaded = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        while len(self.buffer) >= PART_SIZE:
+            self.upload_part(bytes(self.buffer[:PART_SIZE]))
+            del self.buffer[:PART_SIZE]
+
+    def upload_part(self, body):
+        self.part_number += 1
+        result = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=self.part_number, Body=body
+        )
+        self.parts.append({"PartNumber": self.part_number, "ETag": result["ETag"]})
+        self.bytes_uploaded += len(body)
+
+    def copy_part(self, source_key, size):
+        """Add a whole object of the same bucket as the next part, copied server side"""
+        self.part_number += 1
+        result = self.s3_client.upload_part_copy(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=self.part_number, CopySource={"Bucket": self.bucket, "Key": source_key}
+        )
+        self.parts.append({"PartNumber": self.part_number, "ETag": result["CopyPartResult"]["ETag"]})
+        self.bytes_uploaded += size
+
+    def complete(self):
+        if self.buffer or not self.parts:
+            self.upload_part(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts}
+        )
+        self.upload_id = None
+
+    def abort(self):
+        if self.upload_id:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
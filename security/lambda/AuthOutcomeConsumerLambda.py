@@ -0,0 +1,167 @@
+import json
+import boto3
+import os
+import time
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.client('dynamodb', region_name='ca-central-1')
+
+COUNTERS_TABLE = os.environ.get('AUTH_FAILURE_COUNTERS_TABLE', 'auth-failure-counters-dev')
+
+# Must stay in sync with cognito/lambda/DefineAuthChallengeLambda.py
+WINDOW_SECONDS = int(os.environ.get('FAILURE_WINDOW_SECONDS', '900'))
+USER_FAILURE_LIMIT = int(os.environ.get('USER_FAILURE_LIMIT', '5'))
+
+# In-memory tier of a warm container: counterKey -> (failures, expiresAt)
+# of the windows it has written or read, so limit checks need no extra reads
+counters = {}
+MAX_CACHED_COUNTERS = 10000
+
+# Subjects already reported over their limit in a window, counterKey -> expiresAt
+reported = {}
+
+def lambda_handler(event, context):
+    """
+    Keep sliding-window failure counters per user from the auth outcomes queued by DefineAuthChallengeLambda and
+    VerifyAuthChallengeResponseLambda (SQS, batched).
+
+    Counters are fixed windows of FAILURE_WINDOW_SECONDS in the
+    AUTH_FAILURE_COUNTERS_TABLE (counterKey <subject>#<windowStart>, TTL
+    on expiresAt) that readers combine with the previous window into a
+    sliding count. Failures of a batch are summed in memory first, so
+    there is one atomic ADD per counter and window rather than per event.
+    A SUCCESS clears the user's counters. A user that crosses the limit
+    is logged once per window as AUTH_ANOMALY. There are no per-source
+    counters, the triggers have no trusted client address.
+    """
+    now = time.time()
+    prune(now)
+
+    outcomes = []
+    for record in event['Records']:
+        try:
+            outcome = json.loads(record['body'])
+            outcomes.append((float(outcome.get('at') or now), record['messageId'], outcome))
+        except (ValueError, TypeError) as e:
+            # Would never parse on a retry either
+            print(f"Skipping malformed auth outcome {record['messageId']}: {str(e)}")
+    outcomes.sort(key=lambda o: o[0])
+
+    # counterKey -> [failures, message ids], users whose counters a success cleared
+    increments = {}
+    resets = {}
+    for at, message_id, outcome in outcomes:
+        user = f"user#{outcome.get('user')}"
+        if outcome.get('outcome') == 'SUCCESS':
+            # Failures before the success in this batch no longer count either
+            for key in [key for key in increments if key.startswith(user + '#')]:
+                del increments[key]
+            resets.setdefault(user, []).append(message_id)
+        elif outcome.get('outcome') == 'FAILURE':
+            key = f"{user}#{window_start(at)}"
+            increment = increments.setdefault(key, [0, []])
+            increment[0] += 1
+            increment[1].append(message_id)
+
+    failures = set()
+    for user, message_ids in resets.items():
+        try:
+            clear_user(user, now)
+        except ClientError as e:
+            print(f"Error clearing counters of {user}: {str(e)}")
+            failures.update(message_ids)
+
+    for key, (count, message_ids) in increments.items():
+        try:
+            add_failures(key, count)
+        except ClientError as e:
+            print(f"Error updating counter {key}: {str(e)}")
+            failures.update(message_ids)
+
+    for key in increments:
+        try:
+            check_limit(key, now)
+        except ClientError as e:
+            print(f"Error checking counter {key}: {str(e)}")
+
+    print(json.dumps({
+        'trigger': 'AuthOutcomeConsumer',
+        'outcomes': len(outcomes),
+        'counters': len(increments),
+        'resets': len(resets),
+        'failed': len(failures),
+        'cached': len(counters)
+    }))
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failures)]}
+
+def window_start(at):
+    return int(at // WINDOW_SECONDS) * WINDOW_SECONDS
+
+def split_key(key):
+    """(subject, window start) of a counterKey"""
+    subject, start = key.rsplit('#', 1)
+    return subject, int(start)
+
+def add_failures(key, count):
+    """Atomically add failures to a window, which expires once it can no longer be read"""
+    _, start = split_key(key)
+    expires_at = start + 2 * WINDOW_SECONDS
+    result = dynamodb.update_item(
+        TableName=COUNTERS_TABLE,
+        Key={'counterKey': {'S': key}},
+        UpdateExpression='ADD failures :count SET expiresAt = :expires',
+        ExpressionAttributeValues={
+            ':count': {'N': str(count)},
+            ':expires': {'N': str(expires_at)}
+        },
+        ReturnValues='UPDATED_NEW'
+    )
+    counters[key] = (int(result['Attributes']['failures']['N']), expires_at)
+
+def clear_user(user, now):
+    """Delete the windows of a user that readers still combine"""
+    for start in (window_start(now), window_start(now) - WINDOW_SECONDS):
+        key = f"{user}#{start}"
+        dynamodb.delete_item(TableName=COUNTERS_TABLE, Key={'counterKey': {'S': key}})
+        counters.pop(key, None)
+        reported.pop(key, None)
+
+def failures_in(key):
+    """Failures of a window, from memory or read once and then kept"""
+    if key not in counters:
+        _, start = split_key(key)
+        item = dynamodb.get_item(
+            TableName=COUNTERS_TABLE,
+            Key={'counterKey': {'S': key}},
+            ProjectionExpression='failures'
+        ).get('Item')
+        counters[key] = (int(item['failures']['N']) if item else 0, start + 2 * WINDOW_SECONDS)
+    return counters[key][0]
+
+def check_limit(key, now):
+    """Log a subject whose sliding count crossed its limit, once per window"""
+    subject, start = split_key(key)
+    current = window_start(now)
+    if start != current or key in reported:
+        return
+    limit = USER_FAILURE_LIMIT
+    overlap = 1 - (now - current) / WINDOW_SECONDS
+    failures = failures_in(key) + failures_in(f"{subject}#{current - WINDOW_SECONDS}") * overlap
+    if failures >= limit:
+        reported[key] = current + WINDOW_SECONDS
+        print(json.dumps({
+            'event': 'AUTH_ANOMALY',
+            'subject': subject,
+            'failures': round(failures, 2),
+            'limit': limit,
+            'windowSeconds': WINDOW_SECONDS
+        }))
+
+def prune(now):
+    """Drop windows that have expired, and everything if the cache grew too large"""
+    for key in [key for key, (_, expires_at) in counters.items() if expires_at <= now]:
+        del counters[key]
+    for key in [key for key, expires_at in reported.items() if expires_at <= now]:
+        del reported[key]
+    if len(counters) > MAX_CACHED_COUNTERS:
+        counters.clear()